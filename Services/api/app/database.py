@@ -7,7 +7,8 @@ DATABASE_URL = "sqlite:///./eris.db"
 
 engine = create_engine(
     DATABASE_URL, 
-    echo=True, 
+    # echo logs every statement on the hot path; opt in with ERIS_DB_ECHO=1
+    echo=os.getenv("ERIS_DB_ECHO", "0") == "1", 
     connect_args={"check_same_thread": False}
 )
 
@@ -1,6 +1,7 @@
 from fastapi import FastAPI, Depends
 from sqlmodel import Session
 from pydantic import BaseModel
+from datetime import datetime
 from typing import List
 from contextlib import asynccontextmanager
 from .database import get_session, create_db_and_tables
@@ -23,8 +24,8 @@ class RiskResponse(BaseModel):
     factors: List[str]
     entity_name: str
     context: str | None = None
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: datetime
 
 app = FastAPI(
     title="Enterprise Risk Intelligence System",
@@ -42,8 +43,10 @@ async def lifespan(app: FastAPI):
 async def health_check():
     return {"status": "healthy"}
 
+# plain def: FastAPI runs it in the threadpool, so the blocking commit below no
+# longer stalls the event loop for every other request
 @app.post("/risk/score", response_model=RiskResponse)
-async def calculate_risk_score(request: RiskRequest, session: Session = Depends(get_session)):
+def calculate_risk_score(request: RiskRequest, session: Session = Depends(get_session)):
     # TODO: Implement actual risk scoring logic
     risk_assessment = RiskAssessment(
         entity_name=request.entity_name,
@@ -56,5 +59,16 @@ async def calculate_risk_score(request: RiskRequest, session: Session = Depends(
     session.add(risk_assessment)
     session.commit()
     session.refresh(risk_assessment)
-    
-    return risk_assessment.to_dict()
\ No newline at end of file
+
+    # build the response from typed values: factors come straight from the request
+    # instead of re-splitting the stored CSV, and datetimes are encoded once by pydantic
+    return RiskResponse(
+        id=risk_assessment.id,
+        risk_score=risk_assessment.risk_score,
+        confidence=risk_assessment.confidence,
+        factors=request.risk_factors,
+        entity_name=risk_assessment.entity_name,
+        context=risk_assessment.context,
+        created_at=risk_assessment.created_at,
+        updated_at=risk_assessment.updated_at,
+    )
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""In-process cache of serialized history responses.
+
+Entries are keyed on the normalized query parameters, evicted LRU under an entry
+count and byte budget, expire after a TTL, and are dropped as soon as a write for
+their entity commits. Each entry carries a strong ETag for ``If-None-Match``.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from .config import get_settings
+
+Key = Tuple[Hashable, ...]
+
+# entity write versions are tracked per hash slot so memory stays fixed however many
+# entities exist; a collision only means one response is not cached
+VERSION_SLOTS = 4096
+
+
+@dataclass
+class Entry:
+    body: bytes
+    etag: str
+    expires: float
+    entity_id: Optional[str]
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def make_key(endpoint: str, **params) -> Key:
+    # None and absent parameters are the same query
+    return (endpoint,) + tuple(sorted((k, str(v)) for k, v in params.items() if v is not None))
+
+
+class ResponseCache:
+    def __init__(
+        self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl_s: float = 30.0
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Key, Entry]" = OrderedDict()
+        self._by_entity: Dict[Optional[str], Set[Key]] = {}
+        self._bytes = 0
+        # bumped on invalidation so a response computed before a write is never stored
+        self._global_version = 0
+        self._entity_versions = [0] * VERSION_SLOTS
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self, entity_id: Optional[str]) -> int:
+        if entity_id is None:
+            return self._global_version
+        return self._entity_versions[hash(entity_id) % VERSION_SLOTS]
+
+    def get(self, key: Key) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        key: Key,
+        body: bytes,
+        entity_id: Optional[str],
+        version: int,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Entry:
+        entry = Entry(body, make_etag(body), time.monotonic() + self.ttl_s, entity_id, headers or {})
+        if version != self.version(entity_id) or len(body) > self.max_bytes:
+            # a write landed while this response was computed, or it can never fit
+            return entry
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._by_entity.setdefault(entity_id, set()).add(key)
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return entry
+
+    def _remove(self, key: Key) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+        keys = self._by_entity.get(entry.entity_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_entity[entry.entity_id]
+
+    def invalidate(self, entity_ids: Iterable[str]) -> None:
+        """Drop entries for these entities and every entry not filtered by entity."""
+        self._global_version += 1
+        for key in list(self._by_entity.get(None, ())):
+            self._remove(key)
+            self.invalidations += 1
+        for eid in set(entity_ids):
+            self._entity_versions[hash(eid) % VERSION_SLOTS] += 1
+            for key in list(self._by_entity.get(eid, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_entity.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def _build() -> Optional[ResponseCache]:
+    settings = get_settings()
+    if settings.cache_ttl_s <= 0:
+        return None
+    return ResponseCache(settings.cache_max_entries, settings.cache_max_bytes, settings.cache_ttl_s)
+
+
+# process-wide cache; None when disabled with ERIS_CACHE_TTL_S=0
+response_cache = _build()
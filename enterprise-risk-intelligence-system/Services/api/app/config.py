@@ -0,0 +1,138 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent / "risk.db"   # CWD issues solved
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return default if value is None or not value.strip() else int(value)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Runtime settings, read once from ``ERIS_*`` environment variables."""
+
+    # sync SQLAlchemy URL; the async engine swaps in aiosqlite / asyncpg drivers
+    database_url: str = f"sqlite:///{DEFAULT_DB_PATH}"
+    db_echo: bool = False
+    # create missing tables at worker startup (create_all plus index sync). Off by
+    # default: ``alembic upgrade head`` owns the schema, so startup runs no DDL
+    init_db: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # seconds before a pooled connection is replaced; -1 keeps connections forever
+    db_pool_recycle: int = 1800
+    # SQLite pragmas applied on every new connection (ignored for other backends)
+    sqlite_tuning: bool = True
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    # negative values are KiB, so -65536 is a 64 MiB page cache per connection
+    sqlite_cache_size: int = -65536
+    sqlite_busy_timeout_ms: int = 5000
+    # write-behind ingestion: /risk/score enqueues records and a background worker
+    # group-commits them; off by default so every response is durable on return
+    write_behind: bool = False
+    write_behind_max_queue: int = 10_000
+    write_behind_batch_size: int = 500
+    write_behind_flush_ms: int = 50
+    # how long a request waits for queue space before it is rejected with 503
+    write_behind_put_timeout_ms: int = 1000
+    # a failed group commit is retried this many times, waiting backoff, 2x backoff, ...
+    write_behind_flush_retries: int = 3
+    write_behind_retry_backoff_ms: int = 100
+    # history response cache; a TTL of 0 disables it
+    cache_ttl_s: float = 30.0
+    cache_max_entries: int = 1024
+    cache_max_bytes: int = 64 * 1024 * 1024
+    # stored /risk/score responses per Idempotency-Key; a TTL of 0 ignores the header
+    idempotency_ttl_s: float = 86_400.0
+    idempotency_max_keys: int = 10_000
+    # skip the write when an entity is rescored with an identical body within the
+    # window; 0 leaves it off, since repeated scores are otherwise new data points
+    dedup_window_s: float = 0.0
+    dedup_max_entities: int = 10_000
+    # secondary index on riskrecord.score; every insert pays for it, few queries use it
+    score_index: bool = True
+    # Parquet cold tier written by ``python -m app.tiering archive``
+    cold_dir: str = str(DEFAULT_DB_PATH.parent / "cold")
+    cold_after_days: int = 90
+    # per-entity trend state; changing the window or alpha needs ``app.trends rebuild``
+    trend_window: int = 20
+    trend_alpha: float = 0.2
+    trend_z_threshold: float = 3.0
+    # batches a /risk/stream subscriber may fall behind before it is disconnected
+    stream_buffer: int = 256
+    # worker processes for large scoring batches and downsampling; 0 keeps all of it
+    # inline. Smaller batches than offload_min_rows always run inline.
+    offload_workers: int = 0
+    offload_min_rows: int = 10_000
+    # sampling profiler: requests slower than profile_slow_ms dump collapsed stacks
+    # to profile_dir; 0 leaves the profiler off
+    profile_slow_ms: int = 0
+    profile_interval_ms: int = 5
+    profile_dir: str = str(DEFAULT_DB_PATH.parent / "profiles")
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings(
+        database_url=os.getenv("ERIS_DATABASE_URL", Settings.database_url),
+        db_echo=_env_bool("ERIS_DB_ECHO", Settings.db_echo),
+        init_db=_env_bool("ERIS_INIT_DB", Settings.init_db),
+        db_pool_size=_env_int("ERIS_DB_POOL_SIZE", Settings.db_pool_size),
+        db_max_overflow=_env_int("ERIS_DB_MAX_OVERFLOW", Settings.db_max_overflow),
+        db_pool_recycle=_env_int("ERIS_DB_POOL_RECYCLE", Settings.db_pool_recycle),
+        sqlite_tuning=_env_bool("ERIS_SQLITE_TUNING", Settings.sqlite_tuning),
+        sqlite_synchronous=os.getenv("ERIS_SQLITE_SYNCHRONOUS", Settings.sqlite_synchronous),
+        sqlite_mmap_size=_env_int("ERIS_SQLITE_MMAP_SIZE", Settings.sqlite_mmap_size),
+        sqlite_cache_size=_env_int("ERIS_SQLITE_CACHE_SIZE", Settings.sqlite_cache_size),
+        sqlite_busy_timeout_ms=_env_int(
+            "ERIS_SQLITE_BUSY_TIMEOUT_MS", Settings.sqlite_busy_timeout_ms
+        ),
+        write_behind=_env_bool("ERIS_WRITE_BEHIND", Settings.write_behind),
+        write_behind_max_queue=_env_int(
+            "ERIS_WRITE_BEHIND_MAX_QUEUE", Settings.write_behind_max_queue
+        ),
+        write_behind_batch_size=_env_int(
+            "ERIS_WRITE_BEHIND_BATCH_SIZE", Settings.write_behind_batch_size
+        ),
+        write_behind_flush_ms=_env_int("ERIS_WRITE_BEHIND_FLUSH_MS", Settings.write_behind_flush_ms),
+        write_behind_put_timeout_ms=_env_int(
+            "ERIS_WRITE_BEHIND_PUT_TIMEOUT_MS", Settings.write_behind_put_timeout_ms
+        ),
+        write_behind_flush_retries=_env_int(
+            "ERIS_WRITE_BEHIND_FLUSH_RETRIES", Settings.write_behind_flush_retries
+        ),
+        write_behind_retry_backoff_ms=_env_int(
+            "ERIS_WRITE_BEHIND_RETRY_BACKOFF_MS", Settings.write_behind_retry_backoff_ms
+        ),
+        cache_ttl_s=float(os.getenv("ERIS_CACHE_TTL_S", Settings.cache_ttl_s)),
+        cache_max_entries=_env_int("ERIS_CACHE_MAX_ENTRIES", Settings.cache_max_entries),
+        cache_max_bytes=_env_int("ERIS_CACHE_MAX_BYTES", Settings.cache_max_bytes),
+        idempotency_ttl_s=float(os.getenv("ERIS_IDEMPOTENCY_TTL_S", Settings.idempotency_ttl_s)),
+        idempotency_max_keys=_env_int("ERIS_IDEMPOTENCY_MAX_KEYS", Settings.idempotency_max_keys),
+        dedup_window_s=float(os.getenv("ERIS_DEDUP_WINDOW_S", Settings.dedup_window_s)),
+        dedup_max_entities=_env_int("ERIS_DEDUP_MAX_ENTITIES", Settings.dedup_max_entities),
+        score_index=_env_bool("ERIS_SCORE_INDEX", Settings.score_index),
+        cold_dir=os.getenv("ERIS_COLD_DIR", Settings.cold_dir),
+        cold_after_days=_env_int("ERIS_COLD_AFTER_DAYS", Settings.cold_after_days),
+        trend_window=_env_int("ERIS_TREND_WINDOW", Settings.trend_window),
+        trend_alpha=float(os.getenv("ERIS_TREND_ALPHA", Settings.trend_alpha)),
+        trend_z_threshold=float(os.getenv("ERIS_TREND_Z_THRESHOLD", Settings.trend_z_threshold)),
+        stream_buffer=_env_int("ERIS_STREAM_BUFFER", Settings.stream_buffer),
+        offload_workers=_env_int("ERIS_OFFLOAD_WORKERS", Settings.offload_workers),
+        offload_min_rows=_env_int("ERIS_OFFLOAD_MIN_ROWS", Settings.offload_min_rows),
+        profile_slow_ms=_env_int("ERIS_PROFILE_SLOW_MS", Settings.profile_slow_ms),
+        profile_interval_ms=_env_int("ERIS_PROFILE_INTERVAL_MS", Settings.profile_interval_ms),
+        profile_dir=os.getenv("ERIS_PROFILE_DIR", Settings.profile_dir),
+    )
@@ -1,17 +1,242 @@
 # Services/api/app/db.py
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
 from pathlib import Path
-from typing import Generator
-from sqlmodel import SQLModel, create_engine, Session
+from typing import Any, AsyncGenerator, Dict, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import metrics
+from .config import Settings, get_settings
+
+# async drivers used by the request path for each sync driver we accept in settings
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+}
+
+
+def async_url(url: str) -> URL:
+    u = make_url(url)
+    return u.set(drivername=ASYNC_DRIVERS.get(u.drivername, u.drivername))
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _engine_kwargs(url: str, settings: Settings) -> dict:
+    kwargs = {"echo": settings.db_echo, "pool_pre_ping": not _is_sqlite(url)}
+    u = make_url(url)
+    if _is_sqlite(url):
+        kwargs["connect_args"] = {"check_same_thread": False}
+        if u.database in (None, "", ":memory:"):
+            # in-memory databases live in a single connection; no pool sizing
+            return kwargs
+    kwargs.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    return kwargs
+
+
+def sqlite_pragmas(settings: Settings) -> dict:
+    return {
+        # WAL lets readers run concurrently with the single writer
+        "journal_mode": "WAL",
+        # with WAL, NORMAL only fsyncs at checkpoints and stays corruption-safe
+        "synchronous": settings.sqlite_synchronous,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "temp_store": "MEMORY",
+    }
+
+
+def _install_pragmas(sync_engine: Engine, settings: Settings) -> None:
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_db_engine(url: str, settings: Settings) -> Engine:
+    eng = create_engine(url, **_engine_kwargs(url, settings))
+    if _is_sqlite(url) and settings.sqlite_tuning:
+        _install_pragmas(eng, settings)
+    return eng
+
+
+def create_async_db_engine(url: str, settings: Settings) -> AsyncEngine:
+    eng = create_async_engine(async_url(url), **_engine_kwargs(url, settings))
+    if _is_sqlite(url) and settings.sqlite_tuning:
+        _install_pragmas(eng.sync_engine, settings)
+    return eng
+
+
+_engines: Dict[Tuple[str, int], Any] = {}
+_engines_lock = threading.Lock()
+
+
+def _process_engine(kind: str, factory):
+    # keyed on the pid: a forked worker must never reuse connections opened by its parent
+    key = (kind, os.getpid())
+    eng = _engines.get(key)
+    if eng is None:
+        with _engines_lock:
+            eng = _engines.get(key)
+            if eng is None:
+                for stale in [k for k in _engines if k[1] != key[1]]:
+                    # inherited from the parent: forget its pool without closing
+                    # connections the parent is still using
+                    inherited = _engines.pop(stale)
+                    getattr(inherited, "sync_engine", inherited).dispose(close=False)
+                eng = _engines[key] = factory()
+    return eng
+
+
+def get_engine() -> Engine:
+    """This process's sync engine: schema management, CLI jobs and tests."""
+
+    def factory():
+        settings = get_settings()
+        eng = create_db_engine(settings.database_url, settings)
+        metrics.instrument_engine(eng)
+        return eng
+
+    return _process_engine("sync", factory)
+
+
+def get_async_engine() -> AsyncEngine:
+    """This process's async engine: request handlers, so DB I/O never blocks the event loop."""
+
+    def factory():
+        settings = get_settings()
+        eng = create_async_db_engine(settings.database_url, settings)
+        metrics.instrument_engine(eng.sync_engine)
+        return eng
+
+    return _process_engine("async", factory)
+
+
+async def dispose_engines() -> None:
+    """Close this process's pools; the next use opens new ones."""
+    pid = os.getpid()
+    with _engines_lock:
+        mine = {kind: _engines.pop((kind, p)) for kind, p in list(_engines) if p == pid}
+    if "async" in mine:
+        await mine["async"].dispose()
+    if "sync" in mine:
+        mine["sync"].dispose()
+
+
+def __getattr__(name: str):
+    # ``from app.database import engine`` keeps working, but nothing connects at import
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-DB_PATH = Path(__file__).resolve().parent / "risk.db"   # CWD issues solved
-sqlite_url = f"sqlite:///{DB_PATH}"
-engine = create_engine(sqlite_url, echo=False, connect_args={"check_same_thread": False})
 
 def init_db() -> None:
     # IMPORTANT: import models before create_all so tables register
-    from . import models  # noqa: F401
-    SQLModel.metadata.create_all(engine)
+    from . import factors, models  # noqa: F401
+    SQLModel.metadata.create_all(get_engine())
+    sync_indexes()
+    with get_engine().begin() as conn:
+        factors.seed(conn)
+
+
+def _lock_path(url: str) -> Path:
+    digest = hashlib.blake2b(url.encode(), digest_size=8).hexdigest()
+    return Path(tempfile.gettempdir()) / f"eris-init-{digest}.lock"
+
+
+def init_db_once() -> None:
+    """``init_db`` at worker startup when ``ERIS_INIT_DB=1``; workers booting together take turns.
 
-def get_session() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    Deployments run ``alembic upgrade head`` instead and leave this off, so a
+    starting worker issues no DDL. The lock file lives in the system temp
+    directory and only serializes the workers of one host.
+    """
+    settings = get_settings()
+    if not settings.init_db:
+        return
+    if fcntl is None:
+        # no flock on this platform; create_all is still safe for a single worker
+        init_db()
+        return
+    with open(_lock_path(settings.database_url), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            init_db()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def sync_indexes() -> None:
+    """Bring indexes of already-existing tables in line with the models.
+
+    ``create_all`` only creates indexes together with a new table, so databases
+    created by an older schema would otherwise never pick up new indexes.
+    """
+    from .models import DROPPABLE_INDEXES
+
+    engine = get_engine()
+    insp = inspect(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+        wanted = {ix.name for ix in table.indexes}
+        droppable = set(DROPPABLE_INDEXES.get(table.name, ()))
+        with engine.begin() as conn:
+            for ix in table.indexes:
+                if ix.name not in existing:
+                    ix.create(conn)
+            for name in (droppable & existing) - wanted:
+                conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+
+
+def async_session() -> AsyncSession:
+    # objects stay readable after commit, so handlers never re-SELECT what they wrote
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
+
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session() as session:
         yield session
+
+
+def main() -> None:
+    # dev and test databases; deployments use ``alembic upgrade head``
+    parser = argparse.ArgumentParser(description="Database schema maintenance")
+    parser.add_argument("command", choices=["init"], help="create missing tables and indexes")
+    parser.parse_args()
+    init_db()
+    print(f"initialized {get_settings().database_url}")
+
+
+if __name__ == "__main__":
+    main()
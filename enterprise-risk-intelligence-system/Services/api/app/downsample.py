@@ -0,0 +1,72 @@
+"""Vectorized time-series downsampling for dashboard charts.
+
+All functions take ``x`` (int64 microseconds since the epoch, ascending) and ``y``
+(float64 scores) and return at most ``n`` points as index arrays into them, so
+callers can pick any column they carry alongside.
+"""
+import numpy as np
+
+
+def _edges(length: int, n_buckets: int) -> np.ndarray:
+    # near-equal-count buckets: edges[i]..edges[i+1] is bucket i
+    return np.linspace(0, length, n_buckets + 1).astype(np.int64)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: keeps the points that preserve visual shape."""
+    length = len(x)
+    if n >= length or n < 3:
+        return np.arange(length)
+    xf = (x - x[0]).astype(np.float64)
+    n_buckets = n - 2
+    # buckets cover the interior points; first and last are always kept
+    edges = 1 + _edges(length - 2, n_buckets)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(xf, edges[:-1]) / counts
+    avg_y = np.add.reduceat(y, edges[:-1]) / counts
+    # the "next bucket" average of the final bucket is the last point itself
+    next_x = np.append(avg_x[1:], xf[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+    a = 0
+    for i in range(n_buckets):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (xf[a] - next_x[i]) * (y[lo:hi] - y[a]) - (xf[a] - xf[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Keep the lowest and highest score of each of ``n // 2`` buckets (spikes survive)."""
+    length = len(x)
+    if n >= length:
+        return np.arange(length)
+    n_buckets = max(n // 2, 1)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(_edges(length, n_buckets)))
+    # sorting by (bucket, score) puts each bucket's min first and max last
+    order = np.lexsort((y, bucket))
+    boundaries = np.flatnonzero(np.diff(bucket[order])) + 1
+    first = np.concatenate(([0], boundaries))
+    last = np.concatenate((boundaries - 1, [length - 1]))
+    return np.unique(np.concatenate((order[first], order[last])))
+
+
+def average(x: np.ndarray, y: np.ndarray, n: int):
+    """Mean time and mean score of ``n`` equal-count buckets.
+
+    Returns ``(x, y)`` arrays rather than indexes, since the means are new points.
+    """
+    length = len(x)
+    if n >= length:
+        return x, y
+    edges = _edges(length, n)
+    counts = np.diff(edges)
+    # average offsets from x[0] to stay well inside float64 precision
+    mean_x = x[0] + np.rint(np.add.reduceat((x - x[0]).astype(np.float64), edges[:-1]) / counts)
+    mean_y = np.add.reduceat(y, edges[:-1]) / counts
+    return mean_x.astype(np.int64), mean_y
@@ -0,0 +1,46 @@
+"""Risk factors stored as typed rows instead of JSON blobs.
+
+Every scored record's factor values go to ``riskfactorvalue`` as one
+``(record_id, factor_id, value)`` row per factor, in the transaction that inserts
+the record. Factor range filters on the history API then walk the
+``(factor_id, value)`` index, and per-factor aggregates are a single GROUP BY,
+where blobs would have to be fetched and parsed row by row.
+
+Factor ids are positions in :data:`scoring.FACTORS`, which only ever grows at
+the end, so both the write path and the read path map names to ids without a
+lookup. The ``riskfactor`` dictionary table names them for SQL readers.
+"""
+import math
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+from sqlalchemy import Connection, insert, select
+
+from .models import RiskFactor
+from .scoring import FACTORS
+
+FACTOR_IDS: Dict[str, int] = {name: i for i, name in enumerate(FACTORS, start=1)}
+
+
+def from_matrix(factors: np.ndarray) -> List[Dict[str, float]]:
+    """Per-row ``{factor: value}`` of a factor matrix, leaving out absent (NaN) factors."""
+    return [
+        {name: v for name, v in zip(FACTORS, row, strict=True) if not math.isnan(v)} for row in factors.tolist()
+    ]
+
+
+def value_rows(record_ids: Sequence[int], records: Sequence[Mapping]) -> List[dict]:
+    """``riskfactorvalue`` rows for records carrying a ``factors`` mapping."""
+    return [
+        {"record_id": rid, "factor_id": FACTOR_IDS[name], "value": value}
+        for rid, r in zip(record_ids, records, strict=True)
+        for name, value in (r.get("factors") or {}).items()
+    ]
+
+
+def seed(conn: Connection) -> None:
+    """Add dictionary rows for factors the database does not know yet."""
+    known = set(conn.execute(select(RiskFactor.id)).scalars())
+    missing = [{"id": i, "name": name} for name, i in FACTOR_IDS.items() if i not in known]
+    if missing:
+        conn.execute(insert(RiskFactor), missing)
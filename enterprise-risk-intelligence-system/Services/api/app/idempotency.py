@@ -0,0 +1,202 @@
+"""Idempotency keys and duplicate-write suppression for ``/risk/score``.
+
+A request carrying an ``Idempotency-Key`` header has its response body stored
+under that key. A retry with the same key and body gets the stored body back
+without being scored or written; one with a different body is rejected. A retry
+that arrives while the original is still running waits for it. Only successful
+responses are stored, so a retry after an error runs again.
+
+With ``ERIS_DEDUP_WINDOW_S`` set, the last response written for each entity is
+also kept, hashed by its request body. Rescoring the entity with an identical
+body inside the window returns that response, whose record is already stored,
+and writes nothing.
+
+Both stores are per process, bounded LRU maps whose entries expire a fixed time
+after they are stored.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+import orjson
+from pydantic import BaseModel
+
+from .config import get_settings
+
+
+class KeyConflict(Exception):
+    """An idempotency key was reused with a different request body."""
+
+
+def fingerprint(payload: BaseModel) -> bytes:
+    # sorted keys, so factor order in the request body does not matter
+    body = orjson.dumps(payload.model_dump(), option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+class ExpiringStore:
+    """LRU map under an entry count whose entries expire ``ttl_s`` after ``put``."""
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        if item[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return item[1]
+
+    def put(self, key: Hashable, value) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class IdempotencyKeys:
+    def __init__(self, max_keys: int = 10_000, ttl_s: float = 86_400.0):
+        self._done = ExpiringStore(max_keys, ttl_s)
+        # keys whose first request is still running; retries wait on the future
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.replays = 0
+        self.misses = 0
+        self.waits = 0
+        self.conflicts = 0
+
+    async def begin(self, key: str, digest: bytes) -> Optional[bytes]:
+        """Stored body for ``key``, or None once the caller owns the key.
+
+        An owner must call :meth:`finish` or :meth:`abort`. Raises
+        :class:`KeyConflict` if ``key`` was stored for a different body.
+        """
+        while True:
+            stored = self._done.get(key)
+            if stored is not None:
+                stored_digest, body = stored
+                if stored_digest != digest:
+                    self.conflicts += 1
+                    raise KeyConflict("Idempotency-Key was already used with a different request body")
+                self.replays += 1
+                return body
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = asyncio.get_running_loop().create_future()
+                self.misses += 1
+                return None
+            # the first request may still fail, so look again once it is done
+            self.waits += 1
+            await asyncio.shield(pending)
+
+    def finish(self, key: str, digest: bytes, body: bytes) -> None:
+        self._done.put(key, (digest, body))
+        self._release(key)
+
+    def abort(self, key: str) -> None:
+        self._release(key)
+
+    def _release(self, key: str) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is not None and not pending.done():
+            pending.set_result(None)
+
+    def clear(self) -> None:
+        self._done.clear()
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._done),
+            "in_flight": len(self._pending),
+            "max_keys": self._done.max_entries,
+            "ttl_s": self._done.ttl_s,
+            "replays": self.replays,
+            "misses": self.misses,
+            "waits": self.waits,
+            "conflicts": self.conflicts,
+            "evictions": self._done.evictions,
+        }
+
+
+class Deduplicator:
+    def __init__(self, max_entities: int = 10_000, window_s: float = 60.0):
+        self._recent = ExpiringStore(max_entities, window_s)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, entity_id: str, digest: bytes) -> Optional[bytes]:
+        """The response last written for ``entity_id`` if its request hashed to ``digest``."""
+        recent = self._recent.get(entity_id)
+        if recent is not None and recent[0] == digest:
+            self.hits += 1
+            return recent[1]
+        self.misses += 1
+        return None
+
+    def remember(self, entity_id: str, digest: bytes, body: bytes) -> None:
+        self._recent.put(entity_id, (digest, body))
+
+    def forget(self, entity_ids: Iterable[str]) -> None:
+        """Drop entities written by another path, whose last record may now differ."""
+        for eid in entity_ids:
+            self._recent.discard(eid)
+
+    def clear(self) -> None:
+        self._recent.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entities": len(self._recent),
+            "max_entities": self._recent.max_entries,
+            "window_s": self._recent.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self._recent.evictions,
+        }
+
+
+def stats() -> dict:
+    saved = (keys.replays if keys is not None else 0) + (dedup.hits if dedup is not None else 0)
+    return {
+        "idempotency": keys.stats() if keys is not None else None,
+        "dedup": dedup.stats() if dedup is not None else None,
+        # requests answered without scoring or writing a record
+        "writes_saved": saved,
+    }
+
+
+def _build_keys() -> Optional[IdempotencyKeys]:
+    settings = get_settings()
+    if settings.idempotency_ttl_s <= 0:
+        return None
+    return IdempotencyKeys(settings.idempotency_max_keys, settings.idempotency_ttl_s)
+
+
+def _build_dedup() -> Optional[Deduplicator]:
+    settings = get_settings()
+    if settings.dedup_window_s <= 0:
+        return None
+    return Deduplicator(settings.dedup_max_entities, settings.dedup_window_s)
+
+
+# process-wide stores; keys is None with ERIS_IDEMPOTENCY_TTL_S=0 (the header is
+# then ignored), dedup is None unless ERIS_DEDUP_WINDOW_S is set
+keys = _build_keys()
+dedup = _build_dedup()
@@ -0,0 +1,288 @@
+"""Persisting scored records, synchronously or through a write-behind queue.
+
+:func:`write_records` is the single write path: it inserts ``RiskRecord`` rows and
+updates everything derived from them inside the caller's transaction. With
+``ERIS_WRITE_BEHIND=1`` the scoring endpoints hand rows to a
+:class:`WriteBehindQueue` instead, and a background task group-commits them.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional
+
+from sqlalchemy import func, insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import cache, factors, latest, pubsub, rollups, trends
+from .config import Settings
+from .models import RiskFactorValue, RiskRecord
+
+logger = logging.getLogger(__name__)
+
+
+async def write_records(session: AsyncSession, rows: List[dict]) -> None:
+    """Insert rows (``entity_id``, ``score``, ``model``, ``label``, ``created_at``).
+
+    An optional ``factors`` mapping per row is stored in ``riskfactorvalue``.
+    Does not commit.
+    """
+    if not rows:
+        return
+    records = [{f: r.get(f) for f in latest.FIELDS} for r in rows]
+    if any(r.get("factors") for r in rows):
+        ids = await _insert_returning_ids(session, records)
+        await session.exec(insert(RiskFactorValue), params=factors.value_rows(ids, rows))
+    else:
+        # one executemany INSERT; ids are never read back
+        await session.exec(insert(RiskRecord), params=records)
+    await session.run_sync(rollups.apply, rows)
+    await session.run_sync(latest.apply, rows)
+    await session.run_sync(trends.apply, rows)
+
+
+async def _insert_returning_ids(session: AsyncSession, records: List[dict]) -> List[int]:
+    """Insert RiskRecord rows and return their ids in row order."""
+    if (await session.connection()).dialect.name == "sqlite":
+        # ordered RETURNING degrades to one statement per row on SQLite. The write
+        # transaction holds the database lock and a new rowid is the largest one plus
+        # one, so the batch's ids are consecutive and end at last_insert_rowid()
+        await session.exec(insert(RiskRecord), params=records)
+        last = (await session.exec(select(func.last_insert_rowid()))).one()
+        return list(range(last - len(records) + 1, last + 1))
+    # batched INSERT ... RETURNING that keeps the ids in parameter order
+    stmt = insert(RiskRecord).returning(RiskRecord.id, sort_by_parameter_order=True)
+    return (await session.exec(stmt, params=records)).scalars().all()
+
+
+def after_commit(rows: List[dict]) -> None:
+    """Run once rows are durable: drop stale cached responses and notify stream subscribers."""
+    if cache.response_cache is not None and rows:
+        cache.response_cache.invalidate(r["entity_id"] for r in rows)
+    pubsub.broker.publish(rows)
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+class WriteBehindQueue:
+    """Bounded in-process queue flushed in group commits by one background task.
+
+    A flush happens once ``batch_size`` rows are waiting or ``flush_ms`` after the
+    first row of a batch arrived, whichever comes first. A failed commit is retried
+    ``flush_retries`` times with exponential backoff before its rows are dropped.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        max_size: int = 10_000,
+        batch_size: int = 500,
+        flush_ms: int = 50,
+        put_timeout_ms: int = 1000,
+        flush_retries: int = 3,
+        retry_backoff_ms: int = 100,
+    ):
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        # producers waiting for room for a whole batch; notified after every get
+        self._space = asyncio.Condition()
+        self._waiting = 0
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.put_timeout = put_timeout_ms / 1000
+        self.flush_retries = flush_retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_records = 0
+        self.flush_batches = 0
+        self.failed_records = 0
+        self.retried_flushes = 0
+        self.hook_errors = 0
+        self.rejected_records = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="eris-write-behind")
+
+    async def put(self, rows: List[dict]) -> None:
+        """Enqueue all rows or none, waiting up to ``put_timeout`` for room (backpressure).
+
+        A rejected batch leaves nothing behind, so a client retrying after the 503
+        does not write any of its rows twice.
+        """
+        n = len(rows)
+        if n > self.max_size:
+            self.rejected_records += n
+            raise IngestQueueFull(f"batch of {n} records exceeds the write-behind queue ({self.max_size} records)")
+        # waiting batches go first, so small ones cannot starve a large one
+        if self._waiting == 0 and self._free() >= n:
+            self._enqueue(rows)
+            return
+
+        async def enqueue():
+            async with self._space:
+                await self._space.wait_for(lambda: self._free() >= n)
+                self._enqueue(rows)
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(enqueue(), self.put_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_records += n
+            raise IngestQueueFull(f"write-behind queue is full ({self.max_size} records)") from None
+        finally:
+            self._waiting -= 1
+
+    def _free(self) -> int:
+        return self.max_size - self._queue.qsize()
+
+    def _enqueue(self, rows: List[dict]) -> None:
+        for row in rows:
+            self._queue.put_nowait(row)
+
+    async def _next_batch(self) -> List[dict]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        async with self._space:
+            self._space.notify_all()
+        return batch
+
+    async def _flush(self, batch: List[dict]) -> None:
+        t0 = time.perf_counter()
+        try:
+            if not await self._commit(batch):
+                self.failed_records += len(batch)
+                return
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        self.flushed_records += len(batch)
+        self.flush_batches += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+        # the rows are durable now; a failing hook must not count them as lost
+        try:
+            after_commit(batch)
+        except Exception:
+            self.hook_errors += 1
+            logger.exception("post-commit hooks for %d records failed", len(batch))
+
+    async def _commit(self, batch: List[dict]) -> bool:
+        """Write and commit the batch, retrying with backoff; False once it is given up."""
+        for attempt in range(self.flush_retries + 1):
+            try:
+                async with self._session_factory() as session:
+                    await write_records(session, batch)
+                    await session.commit()
+                return True
+            except Exception:
+                if attempt == self.flush_retries:
+                    logger.exception("write-behind flush of %d records failed", len(batch))
+                    return False
+                # e.g. "database is locked" once busy_timeout ran out; the session rolled back
+                self.retried_flushes += 1
+                logger.warning("write-behind flush of %d records failed, retrying", len(batch), exc_info=True)
+                await asyncio.sleep(self.retry_backoff * 2**attempt)
+
+    async def _run(self) -> None:
+        while True:
+            await self._flush(await self._next_batch())
+
+    async def stop(self) -> None:
+        """Flush everything still queued, then cancel the worker.
+
+        Rows put while this waits are flushed too; :func:`stop_queue` unpublishes
+        the queue first, so new requests already write synchronously.
+        """
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": "write_behind",
+            "running": self.running,
+            "queue_depth": self.depth,
+            "max_queue": self.max_size,
+            "batch_size": self.batch_size,
+            "flush_ms": self.flush_interval * 1000,
+            "flushed_records": self.flushed_records,
+            "flush_batches": self.flush_batches,
+            "failed_records": self.failed_records,
+            "retried_flushes": self.retried_flushes,
+            "hook_errors": self.hook_errors,
+            "rejected_records": self.rejected_records,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": self._total_flush_ms / self.flush_batches if self.flush_batches else 0.0,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+
+# process-wide queue, present only while the app runs in write-behind mode
+queue: Optional[WriteBehindQueue] = None
+
+
+def start_queue(settings: Settings, session_factory: Callable[[], AsyncSession]) -> None:
+    global queue
+    if not settings.write_behind:
+        return
+    queue = WriteBehindQueue(
+        session_factory,
+        max_size=settings.write_behind_max_queue,
+        batch_size=settings.write_behind_batch_size,
+        flush_ms=settings.write_behind_flush_ms,
+        put_timeout_ms=settings.write_behind_put_timeout_ms,
+        flush_retries=settings.write_behind_flush_retries,
+        retry_backoff_ms=settings.write_behind_retry_backoff_ms,
+    )
+    queue.start()
+
+
+async def stop_queue() -> None:
+    global queue
+    # unpublish first: requests arriving during the drain commit synchronously
+    q, queue = queue, None
+    if q is not None:
+        await q.stop()
+
+
+def stats() -> dict:
+    if queue is not None:
+        return queue.stats()
+    return {"mode": "sync"}
@@ -0,0 +1,103 @@
+"""Per-entity latest score, maintained on every write.
+
+:func:`apply` runs inside the transaction that inserts ``RiskRecord`` rows, so
+``POST /risk/latest`` answers "current score for these entities" with one primary
+key lookup instead of a sorted history scan per entity.
+``python -m app.latest rebuild`` backfills the table from existing history.
+"""
+import argparse
+from typing import Dict, Iterable, Mapping, Sequence
+
+from sqlalchemy import delete, select
+from sqlmodel import Session
+
+from .models import LatestScore, RiskRecord
+
+FIELDS = ("entity_id", "score", "model", "label", "created_at")
+# entity ids bound per IN (...) lookup; SQLite >= 3.32 allows 32766 parameters
+LOOKUP_CHUNK_SIZE = 10_000
+# records read per round trip during a rebuild
+REBUILD_CHUNK_SIZE = 50_000
+
+
+def _newest(acc: Dict[str, dict], record: Mapping) -> None:
+    cur = acc.get(record["entity_id"])
+    if cur is None or record["created_at"] >= cur["created_at"]:
+        acc[record["entity_id"]] = {f: record.get(f) for f in FIELDS}
+
+
+def _upsert(session: Session, acc: Dict[str, dict]) -> None:
+    if not acc:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    c = LatestScore.__table__.c
+    stmt = insert(LatestScore.__table__)
+    ex = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.entity_id],
+        set_={f: ex[f] for f in FIELDS if f != "entity_id"},
+        # an older record arriving late (e.g. a backfill) never replaces a newer one
+        where=c.created_at <= ex.created_at,
+    )
+    session.execute(stmt, list(acc.values()))
+
+
+def apply(session: Session, records: Iterable[Mapping]) -> None:
+    """Fold new records into the latest-score table. Does not commit."""
+    acc: Dict[str, dict] = {}
+    for r in records:
+        _newest(acc, r)
+    _upsert(session, acc)
+
+
+def lookup_query(entity_ids: Sequence[str]):
+    return select(*(getattr(LatestScore, f) for f in FIELDS)).where(
+        LatestScore.entity_id.in_(entity_ids)
+    )
+
+
+def rebuild(session: Session) -> int:
+    """Recompute the table from both storage tiers in one streaming pass; returns rows read."""
+    from .tiering import cold_tier
+
+    acc: Dict[str, dict] = {}
+    n = 0
+    watermark = cold_tier.watermark
+    if watermark is not None:
+        for table in cold_tier.scan(FIELDS, ordered=False):
+            for record in table.to_pylist():
+                _newest(acc, record)
+            n += table.num_rows
+    stmt = select(*(getattr(RiskRecord, f) for f in FIELDS))
+    if watermark is not None:
+        stmt = stmt.where(RiskRecord.created_at >= watermark)
+    result = session.execute(stmt.execution_options(yield_per=REBUILD_CHUNK_SIZE))
+    for rows in result.partitions():
+        for row in rows:
+            _newest(acc, row._mapping)
+        n += len(rows)
+    session.execute(delete(LatestScore))
+    _upsert(session, acc)
+    session.commit()
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.latest")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from .database import engine, init_db
+
+    init_db()
+    with Session(engine) as session:
+        n = rebuild(session)
+    print(f"rebuilt latest scores from {n} records")
+
+
+if __name__ == "__main__":
+    main()
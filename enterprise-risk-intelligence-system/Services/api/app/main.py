@@ -1,26 +1,79 @@
+import time
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from sqlalchemy import text
 
-from .database import init_db
+from . import ingest, metrics, offload
+from .config import get_settings
+from .database import async_session, dispose_engines, get_async_engine, init_db_once
 
 # Import routers package (we'll create routers/history.py and routers/risk.py)
 from .routers import history, risk
 
-
 app = FastAPI(
     title="Enterprise Risk Intelligence System API",
     version="0.1.0",
     description="API for assessing and monitoring enterprise risks",
+    default_response_class=ORJSONResponse,
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 @app.on_event("startup")
-def on_startup():
-    init_db()
+async def on_startup():
+    # no-op unless ERIS_INIT_DB=1; the lock keeps concurrent workers from racing on DDL.
+    # Scoring models are built on first use.
+    init_db_once()
+    ingest.start_queue(get_settings(), async_session)
+    await offload.start_pool(get_settings())
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # drain queued records before the engine goes away
+    await ingest.stop_queue()
+    await offload.stop_pool()
+    await dispose_engines()
+
+
+def pool_status(pool) -> dict:
+    # in-memory SQLite uses a single-connection pool without these counters
+    status = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if fn is not None:
+            status[name] = fn()
+    return status
 
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+async def health():
+    """Liveness plus a ``SELECT 1`` round trip through the request pool."""
+    async_engine = get_async_engine()
+    body = {"status": "ok", "pool": pool_status(async_engine.pool)}
+    t0 = time.perf_counter()
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception as exc:
+        body.update(status="error", db={"ok": False, "error": str(exc)})
+        return ORJSONResponse(body, status_code=503)
+    body["db"] = {"ok": True, "latency_ms": (time.perf_counter() - t0) * 1000}
+    return body
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/metrics/queries")
+def slow_queries(limit: int = 20):
+    """Statements with the slowest single execution since startup."""
+    return metrics.registry.slowest_queries(limit)
 
 
 # include routers
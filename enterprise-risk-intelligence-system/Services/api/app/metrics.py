@@ -0,0 +1,406 @@
+"""Request metrics in the Prometheus text format, plus an opt-in sampling profiler.
+
+:class:`MetricsMiddleware` times every request against its route template (never
+the raw path, so ids in URLs do not explode the label set) and tracks requests in
+flight. :func:`instrument_engine` hooks SQLAlchemy cursor events so each request
+also accounts its DB time and query count, and the slowest statements are kept
+for ``GET /metrics/queries``. Handlers report the rows they return with
+:func:`add_rows`.
+
+Per-request state lives in a context variable; SQLAlchemy runs the async engine's
+sync events in a greenlet that shares the request task's context, so engine events
+land on the request that issued the query.
+
+With ``ERIS_PROFILE_SLOW_MS`` set, a background thread samples the Python stacks
+every ``ERIS_PROFILE_INTERVAL_MS`` while requests are in flight. Requests slower
+than the threshold write their samples to ``ERIS_PROFILE_DIR`` as collapsed
+stacks (``frame;frame;frame count``), ready for ``flamegraph.pl`` or speedscope.
+"""
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import get_settings
+
+# upper bounds in seconds, shared by every latency histogram
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# distinct statements tracked for /metrics/queries
+SLOW_QUERY_STATEMENTS = 256
+SLOW_QUERY_TEXT_CHARS = 500
+UNMATCHED_ROUTE = "<unmatched>"
+
+# "IN (?, ?, ?)" lists of any length count as one statement
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.n += 1
+
+
+@dataclass
+class QueryStat:
+    statement: str
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    max_route: Optional[str] = None
+    max_at: Optional[datetime] = None
+
+
+@dataclass
+class RequestStats:
+    scope: dict = field(default_factory=dict)
+    db_s: float = 0.0
+    queries: int = 0
+    rows: int = 0
+    samples: Optional[Counter] = None
+    frame: object = None
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "eris_request_stats", default=None
+)
+
+
+def route_of(scope: dict) -> str:
+    # the router stores the matched route in the scope before calling the handler
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def add_rows(n: int) -> None:
+    """Count ``n`` rows returned by the current request."""
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += n
+
+
+def normalize_statement(statement: str) -> str:
+    text = _WHITESPACE.sub(" ", statement).strip()
+    return _PARAM_LIST.sub("(?...)", text)[:SLOW_QUERY_TEXT_CHARS]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # a gauge of live requests, so reset() leaves it alone
+        self.in_flight = 0
+        self._clear()
+
+    def _clear(self) -> None:
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.db_time: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Counter = Counter()
+        self.rows: Counter = Counter()
+        self.queries: Counter = Counter()
+        self.db_seconds_total = 0.0
+        self.queries_total = 0
+        self.query_errors_total = 0
+        self.slow: Dict[str, QueryStat] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.latency.setdefault(key, Histogram()).observe(seconds)
+            self.db_time.setdefault(key, Histogram()).observe(stats.db_s)
+            self.requests[(method, route, str(status))] += 1
+            self.rows[key] += stats.rows
+            self.queries[key] += stats.queries
+
+    def observe_query(self, statement: str, seconds: float, route: Optional[str]) -> None:
+        with self._lock:
+            self.db_seconds_total += seconds
+            self.queries_total += 1
+            text = normalize_statement(statement)
+            stat = self.slow.get(text)
+            if stat is None:
+                if len(self.slow) >= SLOW_QUERY_STATEMENTS:
+                    # replace the statement with the smallest worst case, if this one is slower
+                    fastest = min(self.slow.values(), key=lambda s: s.max_s)
+                    if fastest.max_s >= seconds:
+                        return
+                    del self.slow[fastest.statement]
+                stat = self.slow[text] = QueryStat(text)
+            stat.count += 1
+            stat.total_s += seconds
+            if seconds > stat.max_s:
+                stat.max_s, stat.max_route, stat.max_at = seconds, route, datetime.utcnow()
+
+    def observe_query_error(self, seconds: float) -> None:
+        # failed statements count toward DB time but stay out of the slow-query table
+        with self._lock:
+            self.db_seconds_total += seconds
+            self.query_errors_total += 1
+
+    def slowest_queries(self, limit: int = 20) -> List[dict]:
+        with self._lock:
+            stats = sorted(self.slow.values(), key=lambda s: s.max_s, reverse=True)[:limit]
+            return [
+                {
+                    "statement": s.statement,
+                    "count": s.count,
+                    "total_ms": s.total_s * 1000,
+                    "mean_ms": s.total_s / s.count * 1000,
+                    "max_ms": s.max_s * 1000,
+                    "max_route": s.max_route,
+                    "max_at": s.max_at,
+                }
+                for s in stats
+            ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        out: List[str] = []
+
+        def histogram(name: str, help_: str, series: Dict[Tuple[str, str], Histogram]):
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} histogram")
+            for (method, route), h in sorted(series.items()):
+                labels = f'method="{method}",route="{_escape(route)}"'
+                running = 0
+                for bound, count in zip(BUCKETS, h.counts, strict=False):
+                    running += count
+                    out.append(f'{name}_bucket{{{labels},le="{bound}"}} {running}')
+                out.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.n}')
+                out.append(f"{name}_sum{{{labels}}} {h.total}")
+                out.append(f"{name}_count{{{labels}}} {h.n}")
+
+        def counter(name: str, help_: str, series: Counter, label_names: Tuple[str, ...]):
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(label_names, key, strict=True))
+                out.append(f"{name}{{{labels}}} {value}")
+
+        with self._lock:
+            histogram(
+                "eris_http_request_duration_seconds", "Request latency by route.", self.latency
+            )
+            histogram(
+                "eris_http_request_db_seconds", "DB time spent per request by route.", self.db_time
+            )
+            counter(
+                "eris_http_requests_total", "Completed requests.", self.requests,
+                ("method", "route", "status"),
+            )
+            counter(
+                "eris_http_rows_returned_total", "Rows returned by handlers.", self.rows,
+                ("method", "route"),
+            )
+            counter(
+                "eris_http_db_queries_total", "Queries issued by requests.", self.queries,
+                ("method", "route"),
+            )
+            out += [
+                "# HELP eris_http_requests_in_flight Requests currently being served.",
+                "# TYPE eris_http_requests_in_flight gauge",
+                f"eris_http_requests_in_flight {self.in_flight}",
+                "# HELP eris_db_query_seconds_total Time in DB cursor execution, all callers.",
+                "# TYPE eris_db_query_seconds_total counter",
+                f"eris_db_query_seconds_total {self.db_seconds_total}",
+                "# HELP eris_db_queries_total Statements executed, all callers.",
+                "# TYPE eris_db_queries_total counter",
+                f"eris_db_queries_total {self.queries_total}",
+                "# HELP eris_db_query_errors_total Statements that raised, all callers.",
+                "# TYPE eris_db_query_errors_total counter",
+                f"eris_db_query_errors_total {self.query_errors_total}",
+            ]
+        return "\n".join(out) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+def instrument_engine(sync_engine: Engine) -> None:
+    """Time every cursor execution on ``sync_engine`` (pass ``async_engine.sync_engine``)."""
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("eris_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["eris_query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.db_s += elapsed
+        stats.queries += 1
+    registry.observe_query(statement, elapsed, route_of(stats.scope) if stats else None)
+
+
+def _handle_error(ctx):
+    # after_cursor_execute never runs for a failed statement; without this its start
+    # time would stay on the pooled connection for good
+    starts = ctx.connection.info.get("eris_query_start") if ctx.connection is not None else None
+    if not starts:
+        # the error came before the cursor ran (connect, compile) or outside one
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.db_s += elapsed
+        stats.queries += 1
+    registry.observe_query_error(elapsed)
+
+
+class Profiler:
+    """Samples thread stacks and credits each sample to the request whose frame it contains.
+
+    A request is identified by the middleware's own coroutine frame, which sits at
+    the bottom of every stack executed on behalf of that request in the event loop
+    thread. Work a handler pushes to other threads (threadpool, aiosqlite) shows up
+    as the ``await`` that waits for it.
+    """
+
+    def __init__(self, interval_s: float, slow_s: float, out_dir: str):
+        self.interval_s = interval_s
+        self.slow_s = slow_s
+        self.out_dir = out_dir
+        self._active: Dict[int, RequestStats] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dumped = 0
+
+    def start(self, stats: RequestStats, frame) -> None:
+        stats.samples = Counter()
+        stats.frame = frame
+        with self._lock:
+            self._active[id(frame)] = stats
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="eris-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, stats: RequestStats) -> None:
+        with self._lock:
+            self._active.pop(id(stats.frame), None)
+        stats.frame = None
+
+    def _run(self) -> None:
+        while True:
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            time.sleep(self.interval_s)
+            self.sample()
+
+    def sample(self) -> None:
+        with self._lock:
+            active = dict(self._active)
+        if not active:
+            return
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                owner = active.get(id(frame))
+                if owner is not None and frame is owner.frame:
+                    # stacks are root first; the middleware frame is the root
+                    owner.samples[";".join(reversed(stack))] += 1
+                    break
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+
+    def dump(self, method: str, route: str, seconds: float, stats: RequestStats) -> Optional[str]:
+        if seconds < self.slow_s or not stats.samples:
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        path = os.path.join(self.out_dir, f"{stamp}-{method}-{slug}-{seconds * 1000:.0f}ms.folded")
+        with open(path, "w") as f:
+            for stack, count in stats.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.dumped += 1
+        return path
+
+
+def _make_profiler() -> Optional[Profiler]:
+    settings = get_settings()
+    if settings.profile_slow_ms <= 0:
+        return None
+    return Profiler(
+        settings.profile_interval_ms / 1000, settings.profile_slow_ms / 1000, settings.profile_dir
+    )
+
+
+profiler = _make_profiler()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so streamed bodies are timed until their last chunk."""
+
+    def __init__(self, app, registry: Registry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        status = 500
+        prof = profiler
+        if prof is not None:
+            prof.start(stats, sys._getframe())
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.registry.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.registry.in_flight -= 1
+            _current.reset(token)
+            route = route_of(scope)
+            self.registry.observe_request(scope["method"], route, status, elapsed, stats)
+            if prof is not None:
+                prof.stop(stats)
+                prof.dump(scope["method"], route, elapsed, stats)
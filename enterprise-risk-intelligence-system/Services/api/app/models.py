@@ -1,8 +1,11 @@
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Any, Dict, List, Optional
+
 from sqlalchemy import JSON, Index
 from sqlmodel import Field, SQLModel
 
+from .config import get_settings
+
 
 class RiskRequest(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -48,15 +51,95 @@ class RiskHistoryRead(SQLModel):
     risk_factors: Optional[Dict[str, Any]] = None
 
 
+def _risk_record_indexes():
+    # every history filter is an equality on one of these columns plus a created_at
+    # range/order, so (column, created_at) serves both the WHERE and the ORDER BY
+    indexes = [
+        Index("ix_riskrecord_entity_time", "entity_id", "created_at"),
+        Index("ix_riskrecord_model_time", "model", "created_at"),
+        Index("ix_riskrecord_label_time", "label", "created_at"),
+    ]
+    if get_settings().score_index:
+        indexes.append(Index("ix_riskrecord_score", "score"))
+    return tuple(indexes)
+
+
 # New canonical time-series record for dashboarding
 class RiskRecord(SQLModel, table=True):
+    __table_args__ = _risk_record_indexes()
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    entity_id: str = Field(index=True)
-    score: float = Field(index=True)
+    entity_id: str
+    score: float
     model: Optional[str] = None
     label: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
 
 
-# Add a compound index for faster queries by entity and time
-__table_args__ = (Index("ix_entity_time", "entity_id", "created_at"),)
\ No newline at end of file
+# Dictionary of scoring factors; ids are assigned by app.factors, not autoincremented
+class RiskFactor(SQLModel, table=True):
+    id: int = Field(primary_key=True)
+    name: str = Field(index=True, unique=True)
+
+
+# Factor values of each RiskRecord, one row per (record, factor), written with the record
+class RiskFactorValue(SQLModel, table=True):
+    # factor range filters scan (factor_id, value) and read record_id from the index alone;
+    # without a rowid, SQLite keeps value in the primary key b-tree, so per-record
+    # lookups are covered too
+    __table_args__ = (
+        Index("ix_riskfactorvalue_factor_value", "factor_id", "value", "record_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    record_id: int = Field(primary_key=True, foreign_key="riskrecord.id")
+    factor_id: int = Field(primary_key=True, foreign_key="riskfactor.id")
+    value: float
+
+
+# indexes that init_db drops from existing databases when the models no longer declare
+# them: the old single-column entity index (a prefix of entity_time) and the optional
+# score index
+DROPPABLE_INDEXES = {
+    "riskrecord": ("ix_riskrecord_entity_id", "ix_riskrecord_score"),
+}
+
+
+# Materialized per-entity score buckets maintained on every RiskRecord write
+class RiskRollup(SQLModel, table=True):
+    period: str = Field(primary_key=True)  # "day" or "week"
+    entity_id: str = Field(primary_key=True)
+    bucket: str = Field(primary_key=True)  # ISO date of the bucket start
+    n: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+    min_score: float
+    max_score: float
+
+
+# Newest record per entity, upserted on every RiskRecord write
+class LatestScore(SQLModel, table=True):
+    entity_id: str = Field(primary_key=True)
+    score: float
+    model: Optional[str] = None
+    label: Optional[str] = None
+    created_at: datetime
+
+
+# Incremental per-entity trend state, updated on every RiskRecord write
+class EntityTrend(SQLModel, table=True):
+    entity_id: str = Field(primary_key=True)
+    n: int = 0
+    last_score: float
+    last_at: datetime
+    ewma: float
+    # the last ``trend_window`` scores, oldest first
+    window: List[float] = Field(default_factory=list, sa_type=JSON)
+    mean: float
+    std: float
+    # least-squares slope of the window, in score points per record
+    slope: float
+    # z-score of the last record against the window that preceded it
+    zscore: float
+    anomaly: bool = Field(default=False, index=True)
+    last_anomaly_at: Optional[datetime] = None
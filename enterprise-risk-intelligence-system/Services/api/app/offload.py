@@ -0,0 +1,222 @@
+"""Process-pool offload for CPU-heavy scoring and downsampling.
+
+With ``ERIS_OFFLOAD_WORKERS`` > 0 the app starts a ``ProcessPoolExecutor`` at
+startup, and request handlers await large batches on it instead of computing
+them on the event loop, which meanwhile keeps serving ``/health`` and history
+reads.
+
+Arrays never travel through pickle: the parent copies each input into a
+``multiprocessing.shared_memory`` block, the worker maps it as a numpy array and
+writes its result into an output block the parent allocated, and only block
+names, shapes and dtypes cross the process boundary. Batches below
+``ERIS_OFFLOAD_MIN_ROWS`` run inline, where a copy and a process hop would cost
+more than they save.
+"""
+import asyncio
+from typing import Optional, Tuple
+
+import numpy as np
+
+from . import downsample as ds
+from . import scoring
+from .config import Settings
+
+# (block name, shape, dtype) of an array in shared memory
+Spec = Tuple[str, Tuple[int, ...], str]
+
+
+class _Shared:
+    """A numpy array backed by a shared memory block the parent owns."""
+
+    def __init__(self, shape, dtype, data: Optional[np.ndarray] = None):
+        from multiprocessing.shared_memory import SharedMemory
+
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        # zero-size blocks are rejected, so empty arrays still get one byte
+        self.shm = SharedMemory(create=True, size=max(nbytes, 1))
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        if data is not None:
+            self.array[...] = data
+        self.spec: Spec = (self.shm.name, tuple(shape), dtype.str)
+
+    def release(self) -> None:
+        # the view must go before the mapping can close
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _call_shared(fn, specs, *args):
+    """Worker side: map ``specs`` as arrays, run ``fn`` on them, unmap.
+
+    ``fn`` writes into its output arrays in place and must not return views of
+    them, or the blocks could not be closed.
+    """
+    from multiprocessing.shared_memory import SharedMemory
+
+    blocks = [SharedMemory(name=name) for name, _, _ in specs]
+    try:
+        return fn(
+            *(np.ndarray(shape, dtype=dtype, buffer=b.buf) for b, (_, shape, dtype) in zip(blocks, specs, strict=True)),
+            *args,
+        )
+    finally:
+        for b in blocks:
+            b.close()
+
+
+def _score(factors: np.ndarray, out: np.ndarray, model: str) -> None:
+    out[:] = scoring.get_model(model).score(factors)
+
+
+def _downsample(x, y, out_x, out_y, n: int, method: str) -> int:
+    if method == "avg":
+        sx, sy = ds.average(x, y, n)
+    else:
+        idx = ds.lttb(x, y, n) if method == "lttb" else ds.minmax(x, y, n)
+        sx, sy = x[idx], y[idx]
+    k = len(sx)
+    out_x[:k] = sx
+    out_y[:k] = sy
+    return k
+
+
+def _warm_up() -> int:
+    import os
+
+    return os.getpid()
+
+
+class OffloadPool:
+    def __init__(self, workers: int, min_rows: int):
+        self.workers = workers
+        self.min_rows = min_rows
+        self._executor = None
+        self.offloaded = 0
+        self.inline = 0
+
+    def start(self) -> None:
+        # multiprocessing is only imported when a pool is configured
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn, not fork: the parent runs an event loop and threads that a fork
+        # would copy mid-flight; spawned workers import the models fresh
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=scoring.load_models,
+        )
+
+    async def warm_up(self) -> None:
+        """Start every worker now rather than on the first large request."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self._executor, _warm_up) for _ in range(self.workers))
+        )
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    def should_offload(self, rows: int) -> bool:
+        return self._executor is not None and rows >= self.min_rows
+
+    async def _run(self, fn, inputs, outputs, *args):
+        """Copy ``inputs`` into shared memory and run ``fn`` on them and ``outputs``.
+
+        Input blocks are released here; output blocks belong to the caller, who
+        copies the result out first.
+        """
+        loop = asyncio.get_running_loop()
+        shared = []
+
+        def copy_in():
+            for arr in inputs:
+                shared.append(_Shared(arr.shape, arr.dtype, arr))
+
+        try:
+            # numpy copies without the GIL, so a thread keeps the copy off the loop
+            await loop.run_in_executor(None, copy_in)
+            specs = [s.spec for s in shared] + [o.spec for o in outputs]
+            return await loop.run_in_executor(self._executor, _call_shared, fn, specs, *args)
+        finally:
+            for s in shared:
+                s.release()
+
+    async def score(self, model: str, factors: np.ndarray) -> np.ndarray:
+        out = _Shared((factors.shape[0],), np.float64)
+        try:
+            await self._run(_score, [factors], [out], model)
+            result = out.array.copy()
+        finally:
+            out.release()
+        self.offloaded += 1
+        return result
+
+    async def downsample(self, x: np.ndarray, y: np.ndarray, n: int, method: str):
+        out_x, out_y = _Shared((n,), np.int64), _Shared((n,), np.float64)
+        try:
+            k = await self._run(_downsample, [x, y], [out_x, out_y], n, method)
+            sx, sy = out_x.array[:k].copy(), out_y.array[:k].copy()
+        finally:
+            out_x.release()
+            out_y.release()
+        self.offloaded += 1
+        return sx, sy
+
+    def stats(self) -> dict:
+        return {
+            "mode": "process",
+            "workers": self.workers,
+            "min_rows": self.min_rows,
+            "offloaded_batches": self.offloaded,
+            "inline_batches": self.inline,
+        }
+
+
+pool: Optional[OffloadPool] = None
+
+
+async def start_pool(settings: Settings) -> None:
+    global pool
+    if settings.offload_workers <= 0:
+        return
+    pool = OffloadPool(settings.offload_workers, settings.offload_min_rows)
+    pool.start()
+    await pool.warm_up()
+
+
+async def stop_pool() -> None:
+    global pool
+    if pool is not None:
+        await pool.stop()
+        pool = None
+
+
+async def score(model: str, factors: np.ndarray) -> np.ndarray:
+    """Score ``factors`` with ``model``, in a worker process when the batch is large."""
+    if pool is not None and pool.should_offload(factors.shape[0]):
+        return await pool.score(model, factors)
+    if pool is not None:
+        pool.inline += 1
+    return scoring.get_model(model).score(factors)
+
+
+async def downsample(x: np.ndarray, y: np.ndarray, n: int, method: str):
+    """Reduce ``(x, y)`` to at most ``n`` points with ``method`` (lttb, minmax or avg)."""
+    if pool is not None and pool.should_offload(len(x)):
+        return await pool.downsample(x, y, n, method)
+    if pool is not None:
+        pool.inline += 1
+    out_x, out_y = np.empty(n, dtype=np.int64), np.empty(n, dtype=np.float64)
+    k = _downsample(x, y, out_x, out_y, n, method)
+    return out_x[:k], out_y[:k]
+
+
+def stats() -> dict:
+    if pool is not None:
+        return pool.stats()
+    return {"mode": "inline"}
@@ -0,0 +1,152 @@
+"""In-process pub/sub of newly committed risk records for streaming endpoints.
+
+:func:`app.ingest.after_commit` publishes every committed batch to :data:`broker`.
+Each subscriber owns a bounded queue of batches; a subscriber that falls
+``buffer`` batches behind is dropped rather than allowed to grow memory, and its
+stream ends with a ``dropped`` event so the client can reconnect.
+
+Batches are shared between subscribers and each row is serialized once, so a
+publish costs one queue put per interested subscriber regardless of batch size.
+Subscribers filtering on ``entity_id`` are indexed and only see batches that
+contain their entity.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+import orjson
+
+from .config import get_settings
+
+# (row, serialized row) pairs shared by every subscriber of a publish
+Batch = Tuple[Tuple[Mapping, str], ...]
+
+
+def _event(row: Mapping) -> str:
+    return orjson.dumps(
+        {
+            "entity_id": row["entity_id"],
+            "score": row["score"],
+            "model": row.get("model"),
+            "label": row.get("label"),
+            "created_at": row["created_at"],
+        }
+    ).decode()
+
+
+class Subscription:
+    def __init__(
+        self,
+        broker: "Broker",
+        entity_id: Optional[str] = None,
+        model: Optional[str] = None,
+        label: Optional[str] = None,
+        buffer: int = 256,
+    ):
+        self._broker = broker
+        self.entity_id = entity_id
+        self.model = model
+        self.label = label
+        self.dropped = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=buffer)
+
+    def matches(self, row: Mapping) -> bool:
+        return (
+            (self.entity_id is None or row["entity_id"] == self.entity_id)
+            and (self.model is None or row.get("model") == self.model)
+            and (self.label is None or row.get("label") == self.label)
+        )
+
+    def _offer(self, batch: Batch) -> bool:
+        try:
+            self._queue.put_nowait(batch)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def _drop(self) -> None:
+        self.dropped = True
+        # discard the backlog and leave only the end-of-stream marker
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def get(self) -> Optional[List[str]]:
+        """Next batch of serialized matching rows, or None once the subscriber was dropped.
+
+        Batches with no matching row are skipped.
+        """
+        while True:
+            batch = await self._queue.get()
+            if batch is None:
+                return None
+            lines = [line for row, line in batch if self.matches(row)]
+            if lines:
+                return lines
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        self._broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self, buffer: int = 256):
+        self.buffer = buffer
+        self._by_entity: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._unfiltered: Set[Subscription] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(
+        self, entity_id: Optional[str] = None, model: Optional[str] = None, label: Optional[str] = None
+    ) -> Subscription:
+        sub = Subscription(self, entity_id, model, label, self.buffer)
+        if entity_id is None:
+            self._unfiltered.add(sub)
+        else:
+            self._by_entity[entity_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        if sub.entity_id is None:
+            self._unfiltered.discard(sub)
+            return
+        subs = self._by_entity.get(sub.entity_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._by_entity[sub.entity_id]
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._unfiltered) + sum(len(s) for s in self._by_entity.values())
+
+    def publish(self, rows: List[Mapping]) -> None:
+        """Hand committed rows to every interested subscriber without blocking."""
+        if not rows or not (self._unfiltered or self._by_entity):
+            return
+        batch: Batch = tuple((row, _event(row)) for row in rows)
+        targets = set(self._unfiltered)
+        if self._by_entity:
+            for eid in {row["entity_id"] for row in rows}:
+                targets.update(self._by_entity.get(eid, ()))
+        for sub in targets:
+            if not sub._offer(batch):
+                sub._drop()
+                self.unsubscribe(sub)
+                self.dropped += 1
+        self.published += len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscribers,
+            "buffer": self.buffer,
+            "published_records": self.published,
+            "dropped_subscribers": self.dropped,
+        }
+
+
+broker = Broker(buffer=get_settings().stream_buffer)
@@ -0,0 +1,139 @@
+"""Incrementally maintained daily/weekly score rollups.
+
+Every write path calls :func:`apply` inside the transaction that inserts the
+``RiskRecord`` rows, so aggregate endpoints read O(buckets) rollup rows instead of
+grouping the full history. ``python -m app.rollups rebuild`` backfills them.
+"""
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlmodel import Session
+
+from .models import RiskRecord, RiskRollup
+
+PERIODS = ("day", "week")
+# records read per round trip during a rebuild
+REBUILD_CHUNK_SIZE = 50_000
+
+Key = Tuple[str, str, str]
+
+
+def bucket_start(period: str, ts: datetime) -> str:
+    d: date = ts.date()
+    if period == "week":
+        d = d - timedelta(days=d.weekday())
+    return d.isoformat()
+
+
+def _accumulate(acc: Dict[Key, List[float]], entity_id: str, score: float, ts: datetime) -> None:
+    for period in PERIODS:
+        key = (period, entity_id, bucket_start(period, ts))
+        b = acc.get(key)
+        if b is None:
+            acc[key] = [1, score, score * score, score, score]
+        else:
+            b[0] += 1
+            b[1] += score
+            b[2] += score * score
+            b[3] = min(b[3], score)
+            b[4] = max(b[4], score)
+
+
+def _upsert(session: Session, acc: Dict[Key, List[float]]) -> None:
+    if not acc:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        least, greatest = func.least, func.greatest
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+        # SQLite's multi-argument min()/max() are scalar functions
+        least, greatest = func.min, func.max
+
+    c = RiskRollup.__table__.c
+    stmt = insert(RiskRollup.__table__)
+    ex = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.period, c.entity_id, c.bucket],
+        set_={
+            "n": c.n + ex.n,
+            "total": c.total + ex.total,
+            "total_sq": c.total_sq + ex.total_sq,
+            "min_score": least(c.min_score, ex.min_score),
+            "max_score": greatest(c.max_score, ex.max_score),
+        },
+    )
+    rows = [
+        {
+            "period": period,
+            "entity_id": entity_id,
+            "bucket": bucket,
+            "n": n,
+            "total": total,
+            "total_sq": total_sq,
+            "min_score": lo,
+            "max_score": hi,
+        }
+        for (period, entity_id, bucket), (n, total, total_sq, lo, hi) in acc.items()
+    ]
+    session.execute(stmt, rows)
+
+
+def apply(session: Session, records: Iterable[Mapping]) -> None:
+    """Fold new records (``entity_id``, ``score``, ``created_at``) into the rollups.
+
+    Does not commit; callers run it in the same transaction as the record insert.
+    """
+    acc: Dict[Key, List[float]] = {}
+    for r in records:
+        _accumulate(acc, r["entity_id"], r["score"], r["created_at"])
+    _upsert(session, acc)
+
+
+def rebuild(session: Session) -> int:
+    """Recompute every rollup from both storage tiers in one streaming pass; returns rows read."""
+    from .tiering import cold_tier
+
+    acc: Dict[Key, List[float]] = {}
+    n = 0
+    columns = ("entity_id", "score", "created_at")
+    watermark = cold_tier.watermark
+    if watermark is not None:
+        for table in cold_tier.scan(columns, ordered=False):
+            for entity_id, score, ts in zip(*(table.column(c).to_pylist() for c in columns), strict=True):
+                _accumulate(acc, entity_id, score, ts)
+            n += table.num_rows
+    stmt = select(RiskRecord.entity_id, RiskRecord.score, RiskRecord.created_at)
+    if watermark is not None:
+        stmt = stmt.where(RiskRecord.created_at >= watermark)
+    result = session.execute(stmt.execution_options(yield_per=REBUILD_CHUNK_SIZE))
+    for rows in result.partitions():
+        for entity_id, score, ts in rows:
+            _accumulate(acc, entity_id, score, ts)
+        n += len(rows)
+    session.execute(delete(RiskRollup))
+    _upsert(session, acc)
+    session.commit()
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from .database import engine, init_db
+
+    init_db()
+    with Session(engine) as session:
+        n = rebuild(session)
+    print(f"rebuilt rollups from {n} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,132 @@
+import base64
+import binascii
+import csv
+import io
+import math
 from datetime import datetime
-from typing import Optional, List
-from fastapi import APIRouter, Depends, Query
-from sqlmodel import Session, select, col, text
+from enum import Enum
+from typing import List, Optional, Sequence, Tuple, Union
 
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import aliased
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from .. import cache, factors, metrics, offload, scoring, tiering
 from ..database import get_session
-from ..models import RiskRecord
+from ..models import EntityTrend, RiskFactor, RiskFactorValue, RiskRecord, RiskRollup
+from ..schemas import RiskRecordOut
 
 router = APIRouter(prefix="/history", tags=["history"])
 
+# rows fetched per round trip by the streaming export
+EXPORT_CHUNK_SIZE = 5000
+# entity ids accepted by /trends, bound per IN (...) query in chunks
+MAX_TREND_ENTITIES = 10_000
+TREND_CHUNK_SIZE = 5000
+# page size of /trends when it lists entities instead of looking ids up
+TREND_LIST_LIMIT = 1000
+TREND_COLUMNS = (
+    "entity_id", "n", "last_score", "last_at", "ewma", "mean", "std", "slope",
+    "zscore", "anomaly", "last_anomaly_at",
+)
+EXPORT_COLUMNS = ("id", "entity_id", "score", "model", "label", "created_at")
+# entities one /timeseries request may compare
+MAX_TIMESERIES_ENTITIES = 100
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
 
-@router.get("/timeseries", response_model=List[RiskRecord])
-def timeseries(
-    entity_id: Optional[str] = None,
+
+class DownsampleMethod(str, Enum):
+    lttb = "lttb"
+    minmax = "minmax"
+    avg = "avg"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+    parquet = "parquet"
+    arrow = "arrow"
+
+
+class SeriesFormat(str, Enum):
+    json = "json"
+    arrow = "arrow"
+
+
+FactorName = Enum("FactorName", {f: f for f in scoring.FACTORS}, type=str)
+
+
+def _factor_filter(
+    factor: Optional[FactorName], factor_min: Optional[float], factor_max: Optional[float]
+) -> dict:
+    if factor is None:
+        if factor_min is not None or factor_max is not None:
+            raise HTTPException(status_code=400, detail="factor_min and factor_max need a factor")
+        return {}
+    return {"factor": factor.value, "factor_min": factor_min, "factor_max": factor_max}
+
+
+def _require_pyarrow(what: str) -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as exc:
+        raise HTTPException(status_code=501, detail=f"{what} requires pyarrow") from exc
+
+
+def _record_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("entity_id", pa.string()),
+            ("score", pa.float64()),
+            ("model", pa.string()),
+            ("label", pa.string()),
+            ("created_at", pa.timestamp("us")),
+        ]
+    )
+
+
+def _record_table(rows, schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows, strict=True)) or [()] * len(schema)
+    return pa.Table.from_arrays([pa.array(c, t) for c, t in zip(columns, schema.types, strict=True)], schema=schema)
+
+
+def _ipc(table) -> bytes:
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _apply_filters(
+    stmt,
+    entity_id: Union[str, Sequence[str], None] = None,
     label: Optional[str] = None,
     model: Optional[str] = None,
     min_score: Optional[float] = None,
     max_score: Optional[float] = None,
     start: Optional[datetime] = None,
     end: Optional[datetime] = None,
-    limit: int = Query(500, le=5000),
-    offset: int = 0,
-    session: Session = Depends(get_session),
+    factor: Optional[str] = None,
+    factor_min: Optional[float] = None,
+    factor_max: Optional[float] = None,
 ):
-    stmt = select(RiskRecord)
-    if entity_id:
+    if isinstance(entity_id, str) and entity_id:
         stmt = stmt.where(RiskRecord.entity_id == entity_id)
+    elif entity_id and not isinstance(entity_id, str):
+        stmt = stmt.where(col(RiskRecord.entity_id).in_(entity_id))
     if label:
         stmt = stmt.where(RiskRecord.label == label)
     if model:
@@ -37,23 +139,578 @@ def timeseries(
         stmt = stmt.where(RiskRecord.created_at >= start)
     if end:
         stmt = stmt.where(RiskRecord.created_at <= end)
-    stmt = stmt.order_by(col(RiskRecord.created_at).asc()).limit(limit).offset(offset)
-    return session.exec(stmt).all()
+    if factor:
+        stmt = _join_factor(stmt, RiskRecord.id, factor, factor_min, factor_max)
+    return stmt
+
+
+def _join_factor(stmt, record_id, factor: str, factor_min=None, factor_max=None):
+    """Keep rows whose ``record_id`` has a value of ``factor`` in [factor_min, factor_max]."""
+    # records without a value for the factor never match
+    fv = aliased(RiskFactorValue)
+    stmt = stmt.join(fv, and_(fv.record_id == record_id, fv.factor_id == factors.FACTOR_IDS[factor]))
+    if factor_min is not None:
+        stmt = stmt.where(fv.value >= factor_min)
+    if factor_max is not None:
+        stmt = stmt.where(fv.value <= factor_max)
+    return stmt
+
+
+async def _cached_json(
+    request: Request, key, entity_id: Optional[str], produce, media_type: str = "application/json"
+) -> Response:
+    """Serve a body from the response cache, computing it with ``produce`` on a miss.
+
+    ``produce`` returns ``(body_bytes, headers)``. The ETag is honoured even when
+    caching is disabled, so unchanged results never cross the wire twice.
+    """
+    store = cache.response_cache
+    entry = store.get(key) if store is not None else None
+    if entry is None:
+        version = store.version(entity_id) if store is not None else 0
+        body, headers = await produce()
+        if store is not None:
+            entry = store.put(key, body, entity_id, version, headers)
+        else:
+            entry = cache.Entry(body, cache.make_etag(body), 0.0, entity_id, headers)
+    headers = {"ETag": entry.etag, **entry.headers}
+    if_none_match = request.headers.get("if-none-match", "")
+    if entry.etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type=media_type, headers=headers)
+
+
+def _hot_start(start: Optional[datetime]) -> Optional[datetime]:
+    """Clamp a range start to the cold-tier watermark; older rows are read from Parquet."""
+    wm = tiering.cold_tier.watermark
+    if wm is None or (start is not None and start >= wm):
+        return start
+    return wm
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, rid = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(rid)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="invalid cursor") from exc
+
+
+def _after_cursor(stmt, cursor: str):
+    # keyset predicate on (created_at, id); the leading >= keeps it sargable on created_at
+    ts, rid = decode_cursor(cursor)
+    return stmt.where(
+        and_(
+            col(RiskRecord.created_at) >= ts,
+            or_(col(RiskRecord.created_at) > ts, col(RiskRecord.id) > rid),
+        )
+    )
+
+
+def timeseries_query(
+    entity_id: Union[str, Sequence[str], None] = None,
+    label: Optional[str] = None,
+    model: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 500,
+    offset: int = 0,
+    factor: Optional[str] = None,
+    factor_min: Optional[float] = None,
+    factor_max: Optional[float] = None,
+):
+    # plain column tuples: no ORM identity map or per-row model construction
+    stmt = _apply_filters(
+        select(*(getattr(RiskRecord, c) for c in EXPORT_COLUMNS)),
+        entity_id, label, model, min_score, max_score, start, end, factor, factor_min, factor_max,
+    )
+    if cursor:
+        stmt = _after_cursor(stmt, cursor)
+    stmt = stmt.order_by(col(RiskRecord.created_at).asc(), col(RiskRecord.id).asc())
+    return stmt.limit(limit).offset(offset)
+
+
+@router.get("/timeseries", response_model=List[RiskRecordOut])
+async def timeseries(  # noqa: C901
+    request: Request,
+    entity_id: Optional[List[str]] = Query(None),
+    label: Optional[str] = None,
+    model: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(500, le=5000),
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    points: Optional[int] = Query(None, ge=3, le=10_000),
+    downsample: DownsampleMethod = DownsampleMethod.lttb,
+    format: SeriesFormat = SeriesFormat.json,
+    factor: Optional[FactorName] = None,
+    factor_min: Optional[float] = None,
+    factor_max: Optional[float] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """Return matching records ordered by (created_at, id).
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch the next
+    page; unlike ``offset`` every cursor page costs the same regardless of depth.
+
+    With ``points=N`` the whole matching range is reduced to at most N
+    ``{created_at, score}`` points instead (``downsample`` picks the method), and
+    paging parameters do not apply.
+
+    Repeat ``entity_id`` to compare entities in one request; downsampled points
+    are then reduced per entity and carry their ``entity_id``. ``format=arrow``
+    returns the same rows as an Arrow IPC stream.
+
+    ``factor`` with ``factor_min``/``factor_max`` keeps records whose stored factor
+    value lies in the range; factor filters never read the cold tier.
+    """
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="use either cursor or offset, not both")
+    factor_filter = _factor_filter(factor, factor_min, factor_max)
+    ids = list(dict.fromkeys(entity_id or []))
+    if len(ids) > MAX_TIMESERIES_ENTITIES:
+        raise HTTPException(
+            status_code=413, detail=f"timeseries compares at most {MAX_TIMESERIES_ENTITIES} entities"
+        )
+    if format is SeriesFormat.arrow:
+        _require_pyarrow("arrow format")
+    media_type = ARROW_STREAM if format is SeriesFormat.arrow else "application/json"
+    # a single entity keeps its own cache invalidation; comparisons are dropped on any write
+    eid: Union[str, Tuple[str, ...], None] = ids[0] if len(ids) == 1 else tuple(ids) or None
+    cache_entity = eid if isinstance(eid, str) else None
+    if points is not None:
+        if cursor or offset:
+            raise HTTPException(status_code=400, detail="points cannot be combined with paging")
+        filters = {
+            "entity_id": eid, "label": label, "model": model, "min_score": min_score,
+            "max_score": max_score, "start": start, "end": end,
+        }
+
+        async def produce_points():
+            series = []
+            for one in ids or [None]:
+                x, y = await _load_points(session, dict(filters, entity_id=one), factor_filter)
+                series.append((one, *await offload.downsample(x, y, points, downsample.value)))
+            if format is SeriesFormat.arrow:
+                return _points_arrow(series), {}
+            return _points_json(series, tagged=len(ids) > 1), {}
+
+        key = cache.make_key(
+            "points", points=points, downsample=downsample.value, format=format.value,
+            **filters, **factor_filter,
+        )
+        return await _cached_json(request, key, cache_entity, produce_points, media_type)
+    params = dict(
+        entity_id=eid, label=label, model=model, min_score=min_score,
+        max_score=max_score, start=start, end=end, cursor=cursor, limit=limit, offset=offset,
+        **factor_filter,
+    )
+
+    async def produce():
+        tier = tiering.cold_tier
+        after = decode_cursor(cursor) if cursor else None
+        cold, hot_offset = [], offset
+        if not factor_filter and tier.covers(start, after[0] if after else None):
+            filters = {
+                "entity_id": eid, "label": label, "model": model, "min_score": min_score,
+                "max_score": max_score, "start": start, "end": end,
+            }
+            cold, hot_offset = await run_in_threadpool(tier.page, limit, offset, after, **filters)
+        rows = [tuple(r[c] for c in EXPORT_COLUMNS) for r in cold]
+        if len(rows) < limit:
+            hot = dict(params, start=_hot_start(start), limit=limit - len(rows), offset=hot_offset)
+            rows += (await session.exec(timeseries_query(**hot))).all()
+        metrics.add_rows(len(rows))
+        headers = {}
+        if rows and len(rows) == limit:
+            last = dict(zip(EXPORT_COLUMNS, rows[-1], strict=True))
+            headers["X-Next-Cursor"] = encode_cursor(last["created_at"], last["id"])
+        if format is SeriesFormat.arrow:
+            # columns are built straight from the row tuples, never as dicts
+            return _ipc(_record_table(rows, _record_schema())), headers
+        # orjson writes the datetimes in isoformat() form without a per-row pass
+        return orjson.dumps([dict(zip(EXPORT_COLUMNS, row, strict=True)) for row in rows]), headers
+
+    key = cache.make_key("timeseries", format=format.value, **params)
+    return await _cached_json(request, key, cache_entity, produce, media_type)
+
+
+async def _load_points(session: AsyncSession, filters: dict, factor_filter: dict):
+    """Stream (created_at, score) for the filters into two compact numpy columns."""
+    xs, ys = [], []
+    tier = tiering.cold_tier
+    if not factor_filter and tier.covers(filters["start"]):
+        tables = await run_in_threadpool(lambda: list(tier.scan(("created_at", "score"), **filters)))
+        for table in tables:
+            xs.append(table.column("created_at").to_numpy().astype("datetime64[us]").astype(np.int64))
+            ys.append(table.column("score").to_numpy())
+    hot = dict(filters, start=_hot_start(filters["start"]))
+    stmt = _apply_filters(select(RiskRecord.created_at, RiskRecord.score), **hot, **factor_filter)
+    stmt = stmt.order_by(col(RiskRecord.created_at).asc(), col(RiskRecord.id).asc())
+    result = await session.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    async for rows in result.partitions():
+        ts, sc = zip(*rows, strict=True)
+        xs.append(np.array(ts, dtype="datetime64[us]").astype(np.int64))
+        ys.append(np.array(sc, dtype=np.float64))
+    if not xs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    x = np.concatenate(xs)
+    metrics.add_rows(len(x))
+    return x, np.concatenate(ys)
+
+
+def _points_json(series, tagged: bool) -> bytes:
+    out = []
+    for eid, x, y in series:
+        stamps = np.datetime_as_string(x.astype("datetime64[us]"), unit="us").tolist()
+        if tagged:
+            out.extend({"entity_id": eid, "created_at": t, "score": v} for t, v in zip(stamps, y.tolist(), strict=True))
+        else:
+            out.extend({"created_at": t, "score": v} for t, v in zip(stamps, y.tolist(), strict=True))
+    return orjson.dumps(out)
+
+
+def _points_arrow(series) -> bytes:
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [("entity_id", pa.string()), ("created_at", pa.timestamp("us")), ("score", pa.float64())]
+    )
+    tables = [
+        pa.Table.from_arrays(
+            [
+                pa.array([eid] * len(x), pa.string()),
+                # int64 microseconds reinterpret as timestamps without a copy
+                pa.array(x.view("datetime64[us]")),
+                pa.array(y),
+            ],
+            schema=schema,
+        )
+        for eid, x, y in series
+    ]
+    return _ipc(pa.concat_tables(tables))
+
+
+async def _tiered_partitions(cold_tables, hot_partitions):
+    """Cold-tier rows as tuple chunks, then the hot cursor's chunks; both in (created_at, id) order."""
+    if cold_tables is not None:
+        while True:
+            # each month is read off the event loop
+            table = await run_in_threadpool(next, cold_tables, None)
+            if table is None:
+                break
+            for batch in table.to_batches(EXPORT_CHUNK_SIZE):
+                metrics.add_rows(batch.num_rows)
+                yield list(zip(*(batch.column(c).to_pylist() for c in EXPORT_COLUMNS), strict=True))
+    async for rows in hot_partitions:
+        metrics.add_rows(len(rows))
+        yield rows
+
+
+async def _ndjson_chunks(partitions):
+    async for rows in partitions:
+        yield b"".join(orjson.dumps(dict(zip(EXPORT_COLUMNS, row, strict=True))) + b"\n" for row in rows)
+
+
+async def _csv_chunks(partitions):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in partitions:
+        writer.writerows(
+            (rid, eid, sc, mdl, lbl, ts.isoformat()) for rid, eid, sc, mdl, lbl, ts in rows
+        )
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    # header-only export for an empty result
+    if buf.tell():
+        yield buf.getvalue()
+
+
+async def _parquet_chunks(partitions):
+    import pyarrow.parquet as pq
+
+    schema = _record_schema()
+    sink = io.BytesIO()
+    # each chunk becomes one row group; bytes are handed off as soon as it is written
+    with pq.ParquetWriter(sink, schema) as writer:
+        async for rows in partitions:
+            writer.write_table(_record_table(rows, schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+async def _arrow_chunks(partitions):
+    import pyarrow as pa
+
+    schema = _record_schema()
+    sink = io.BytesIO()
+    # one record batch per chunk, so a reader can start before the stream ends
+    with pa.ipc.new_stream(sink, schema) as writer:
+        async for rows in partitions:
+            writer.write_table(_record_table(rows, schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+@router.get("/export")
+async def export(
+    format: ExportFormat = ExportFormat.ndjson,
+    entity_id: Optional[str] = None,
+    label: Optional[str] = None,
+    model: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    factor: Optional[FactorName] = None,
+    factor_min: Optional[float] = None,
+    factor_max: Optional[float] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """Stream every matching RiskRecord without materializing the result set."""
+    if format in (ExportFormat.parquet, ExportFormat.arrow):
+        _require_pyarrow(f"{format.value} export")
+    factor_filter = _factor_filter(factor, factor_min, factor_max)
+
+    tier = tiering.cold_tier
+    cold_tables = None
+    if not factor_filter and tier.covers(start):
+        cold_tables = tier.scan(
+            EXPORT_COLUMNS, entity_id=entity_id, label=label, model=model,
+            min_score=min_score, max_score=max_score, start=start, end=end,
+        )
+    cols = [getattr(RiskRecord, c) for c in EXPORT_COLUMNS]
+    stmt = _apply_filters(
+        select(*cols), entity_id, label, model, min_score, max_score, _hot_start(start), end,
+        **factor_filter,
+    )
+    stmt = stmt.order_by(col(RiskRecord.created_at).asc(), col(RiskRecord.id).asc())
+    # yield_per streams from a server-side cursor in fixed-size chunks of plain tuples
+    result = await session.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    partitions = _tiered_partitions(cold_tables, result.partitions())
+
+    if format is ExportFormat.csv:
+        body, media_type = _csv_chunks(partitions), "text/csv"
+    elif format is ExportFormat.parquet:
+        body, media_type = _parquet_chunks(partitions), "application/vnd.apache.parquet"
+    elif format is ExportFormat.arrow:
+        body, media_type = _arrow_chunks(partitions), ARROW_STREAM
+    else:
+        body, media_type = _ndjson_chunks(partitions), "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="riskrecord.{format.value}"'}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+def aggregate_query(period: str, entity_id: Optional[str] = None, month: bool = False):
+    """Sum rollup buckets of ``period``; ``month`` regroups day buckets by YYYY-MM."""
+    bucket = func.substr(RiskRollup.bucket, 1, 7) if month else RiskRollup.bucket
+    stmt = select(
+        bucket.label("bucket"),
+        func.sum(RiskRollup.n),
+        func.sum(RiskRollup.total),
+        func.sum(RiskRollup.total_sq),
+        func.min(RiskRollup.min_score),
+        func.max(RiskRollup.max_score),
+    ).where(RiskRollup.period == period)
+    if entity_id:
+        stmt = stmt.where(RiskRollup.entity_id == entity_id)
+    return stmt.group_by(bucket).order_by(bucket)
+
+
+async def _aggregate(
+    session: AsyncSession, key: str, period: str, entity_id: Optional[str], month=False
+):
+    rows = (await session.exec(aggregate_query(period, entity_id, month))).all()
+    metrics.add_rows(len(rows))
+    out = []
+    for bucket, n, total, total_sq, lo, hi in rows:
+        mean = total / n
+        var = max(total_sq / n - mean * mean, 0.0)
+        out.append(
+            {
+                key: bucket,
+                "avg_score": mean,
+                "n": n,
+                "min_score": lo,
+                "max_score": hi,
+                "std_score": math.sqrt(var),
+            }
+        )
+    return out
+
+
+async def _cached_aggregate(request, session, key, period, entity_id, month=False):
+    async def produce():
+        out = await _aggregate(session, key, period, entity_id, month)
+        return orjson.dumps(out), {}
+
+    cache_key = cache.make_key("aggregate", key=key, entity_id=entity_id)
+    return await _cached_json(request, cache_key, entity_id, produce)
 
 
 @router.get("/aggregate/day")
-def aggregate_day(
+async def aggregate_day(
+    request: Request,
+    entity_id: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    return await _cached_aggregate(request, session, "day", "day", entity_id)
+
+
+@router.get("/aggregate/week")
+async def aggregate_week(
+    request: Request,
+    entity_id: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    # buckets start on Monday
+    return await _cached_aggregate(request, session, "week", "week", entity_id)
+
+
+@router.get("/aggregate/month")
+async def aggregate_month(
+    request: Request,
     entity_id: Optional[str] = None,
-    session: Session = Depends(get_session),
-):
-    # SQLite daily buckets via strftime
-    q = """
-      SELECT strftime('%Y-%m-%d', created_at) as day, AVG(score) as avg_score, COUNT(*) as n
-      FROM riskrecord
-      {where}
-      GROUP BY day
-      ORDER BY day ASC
+    session: AsyncSession = Depends(get_session),
+):
+    return await _cached_aggregate(request, session, "month", "day", entity_id, month=True)
+
+
+def factor_aggregate_query(factor=None, factor_min=None, factor_max=None, **filters):
+    """Count, sum, sum of squares, min and max of every factor over the filtered records."""
+    v = RiskFactorValue
+    stmt = (
+        select(
+            RiskFactor.name,
+            func.count(),
+            func.sum(v.value),
+            func.sum(v.value * v.value),
+            func.min(v.value),
+            func.max(v.value),
+        )
+        .select_from(v)
+        .join(RiskFactor, RiskFactor.id == v.factor_id)
+    )
+    if any(value is not None for value in filters.values()):
+        # only record filters need riskrecord; factor filters join on record_id directly
+        stmt = _apply_filters(stmt.join(RiskRecord, RiskRecord.id == v.record_id), **filters)
+    if factor:
+        stmt = _join_factor(stmt, v.record_id, factor, factor_min, factor_max)
+    return stmt.group_by(RiskFactor.name).order_by(RiskFactor.name)
+
+
+@router.get("/aggregate/factors")
+async def aggregate_factors(
+    request: Request,
+    entity_id: Optional[str] = None,
+    label: Optional[str] = None,
+    model: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    factor: Optional[FactorName] = None,
+    factor_min: Optional[float] = None,
+    factor_max: Optional[float] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """Per-factor count, mean, std, min and max over the matching records.
+
+    Computed by one GROUP BY over the stored factor values; the ``factor`` filter
+    selects records, so e.g. ``factor=market_volatility&factor_min=70`` summarizes
+    every factor of the high-volatility records. Archived records are not included.
+    """
+    filters = dict(
+        entity_id=entity_id, label=label, model=model, min_score=min_score,
+        max_score=max_score, start=start, end=end,
+        **_factor_filter(factor, factor_min, factor_max),
+    )
+
+    async def produce():
+        rows = (await session.exec(factor_aggregate_query(**filters))).all()
+        metrics.add_rows(len(rows))
+        out = []
+        for name, n, total, total_sq, lo, hi in rows:
+            mean = total / n
+            out.append(
+                {
+                    "factor": name,
+                    "n": n,
+                    "avg_value": mean,
+                    "min_value": lo,
+                    "max_value": hi,
+                    "std_value": math.sqrt(max(total_sq / n - mean * mean, 0.0)),
+                }
+            )
+        return orjson.dumps(out), {}
+
+    key = cache.make_key("aggregate_factors", **filters)
+    return await _cached_json(request, key, entity_id, produce)
+
+
+def trends_query(
+    entity_ids: Optional[List[str]] = None, anomalous: bool = False, limit: int = 1000
+):
+    stmt = select(*(getattr(EntityTrend, c) for c in TREND_COLUMNS))
+    if entity_ids:
+        stmt = stmt.where(col(EntityTrend.entity_id).in_(entity_ids))
+    if anomalous:
+        stmt = stmt.where(EntityTrend.anomaly == True)  # noqa: E712
+    return stmt.order_by(EntityTrend.entity_id).limit(limit)
+
+
+@router.get("/trends")
+async def trends(
+    entity_id: Optional[List[str]] = Query(None),
+    anomalous: bool = False,
+    limit: Optional[int] = Query(None, le=MAX_TREND_ENTITIES),
+    session: AsyncSession = Depends(get_session),
+):
+    """Current trend state (EWMA, window mean/std/slope, last z-score) per entity.
+
+    Repeat ``entity_id`` to pick entities, all of which are returned unless
+    ``limit`` says otherwise; without it the first ``limit`` (default 1000)
+    entities are listed by id. ``anomalous=true`` keeps only entities whose
+    latest record was flagged.
     """
-    where = "WHERE entity_id = :eid" if entity_id else ""
-    rows = session.exec(text(q.format(where=where)), {"eid": entity_id} if entity_id else {}).all()
-    return [{"day": d, "avg_score": a, "n": n} for d, a, n in rows]
+    ids = list(dict.fromkeys(entity_id or []))
+    if len(ids) > MAX_TREND_ENTITIES:
+        raise HTTPException(
+            status_code=413, detail=f"trends are limited to {MAX_TREND_ENTITIES} entities"
+        )
+    if limit is None:
+        limit = len(ids) or TREND_LIST_LIMIT
+    chunks = [ids[i : i + TREND_CHUNK_SIZE] for i in range(0, len(ids), TREND_CHUNK_SIZE)] or [None]
+    out = []
+    for chunk in chunks:
+        rows = (await session.exec(trends_query(chunk, anomalous, limit - len(out)))).all()
+        out.extend(dict(zip(TREND_COLUMNS, row, strict=True)) for row in rows)
+        if len(out) >= limit:
+            break
+    metrics.add_rows(len(out))
+    return Response(orjson.dumps(out), media_type="application/json")
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    if cache.response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.response_cache.stats()}
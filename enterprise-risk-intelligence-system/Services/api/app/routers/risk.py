@@ -1,35 +1,313 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-import random
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Tuple
 
+import numpy as np
+import orjson
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .. import factors as factor_store
+from .. import idempotency, ingest, latest, metrics, offload, pubsub, scoring
 from ..database import get_session
-from ..models import RiskRecord
+from ..schemas import LatestRequest, ScoreRequest, ScoreResponse
 
 router = APIRouter(tags=["risk"])
 
+# upper bound for a single /risk/score/batch request body
+MAX_BATCH_SIZE = 10_000
+# idle streams send a comment this often so proxies keep the connection open
+STREAM_KEEPALIVE_S = 15.0
+
+
+def _entity_id(payload: ScoreRequest):
+    return payload.entity_id or payload.client_id
+
+
+async def _compute_scores(payloads: List[ScoreRequest]) -> Tuple[List[float], List[dict]]:
+    """Score all payloads with one vectorized call per requested model.
+
+    Returns the scores and each payload's numeric factors. Large batches are
+    scored in the offload pool so the event loop stays free.
+    """
+    try:
+        factors = scoring.factor_matrix(p.risk_factors for p in payloads)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    names = np.array([p.model or "v1" for p in payloads], dtype=object)
+    scores = np.empty(len(payloads), dtype=np.float64)
+    for name in set(names):
+        try:
+            scoring.get_model(name)
+        except scoring.UnknownModelError as exc:
+            raise HTTPException(status_code=400, detail=f"unknown model: {name}") from exc
+        mask = names == name
+        scores[mask] = await offload.score(name, factors[mask])
+    return scores.tolist(), factor_store.from_matrix(factors)
+
 
-@router.post("/risk/score")
-def score(payload: dict, session: Session = Depends(get_session)):
-    """Compute a score and persist a RiskRecord for dashboarding."""
+def _row(payload: ScoreRequest, sc: float, created_at: datetime, factors: dict) -> dict:
+    return {
+        "entity_id": _entity_id(payload),
+        "score": sc,
+        "model": payload.model or "v1",
+        "label": payload.label,
+        "created_at": created_at,
+        "factors": factors,
+    }
+
+
+async def _persist(session: AsyncSession, rows: List[dict]) -> None:
+    if ingest.queue is not None:
+        if len(rows) > ingest.queue.max_size:
+            # would never fit, so a 503 that invites a retry is the wrong answer
+            raise HTTPException(
+                status_code=413, detail=f"batch exceeds the write-behind queue ({ingest.queue.max_size} records)"
+            )
+        try:
+            await ingest.queue.put(rows)
+        except ingest.IngestQueueFull as exc:
+            raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"}) from exc
+        return
+    await ingest.write_records(session, rows)
+    await session.commit()
+    ingest.after_commit(rows)
+
+
+def _response(entity_id: str, sc: float, created_at: datetime, payload: ScoreRequest) -> dict:
+    # orjson writes datetimes in isoformat(), so created_at stays a datetime here
+    resp = {"entity_id": entity_id, "score": sc, "created_at": created_at}
+    # keep backward-compatible key for tests / clients that use client_id
+    if payload.client_id:
+        resp["client_id"] = payload.client_id
+    return resp
+
+
+async def _score_one(
+    session: AsyncSession, payload: ScoreRequest, eid: str, digest: Optional[bytes]
+) -> bytes:
+    """Score and persist one payload and return its JSON response body.
+
+    With dedup on, an identical rescore inside the window returns the body of the
+    record already written instead.
+    """
+    dedup = idempotency.dedup if digest is not None else None
+    if dedup is not None:
+        body = dedup.get(eid, digest)
+        if body is not None:
+            return body
+    scores, factors = await _compute_scores([payload])
+    sc = scores[0]
+    row = _row(payload, sc, datetime.utcnow(), factors[0])
+    await _persist(session, [row])
+    # the dict already matches ScoreResponse; skip re-validating it
+    body = orjson.dumps(_response(eid, sc, row["created_at"], payload))
+    if dedup is not None:
+        dedup.remember(eid, digest, body)
+    return body
+
+
+@router.post("/risk/score", response_model=ScoreResponse, response_model_exclude_none=True)
+async def score(
+    payload: ScoreRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    session: AsyncSession = Depends(get_session),
+):
+    """Compute a score and persist a RiskRecord for dashboarding.
+
+    A retry sent with the same ``Idempotency-Key`` gets the first response back
+    and writes nothing.
+    """
     # basic validation
-    eid = payload.get("entity_id") or payload.get("client_id")
+    eid = _entity_id(payload)
     if not eid:
         raise HTTPException(status_code=400, detail="entity_id or client_id is required")
 
-    # compute dummy score (replace with real model)
-    sc = float(random.uniform(0, 100))
+    keys = idempotency.keys if idempotency_key else None
+    if keys is None and idempotency.dedup is None:
+        body = await _score_one(session, payload, eid, None)
+        return Response(body, media_type="application/json")
+
+    digest = idempotency.fingerprint(payload)
+    if keys is not None:
+        try:
+            body = await keys.begin(idempotency_key, digest)
+        except idempotency.KeyConflict as exc:
+            raise HTTPException(status_code=422, detail=str(exc)) from exc
+        if body is not None:
+            return Response(body, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+    try:
+        body = await _score_one(session, payload, eid, digest)
+    except BaseException:
+        # errors are not stored: the key is released and a retry runs again
+        if keys is not None:
+            keys.abort(idempotency_key)
+        raise
+    if keys is not None:
+        keys.finish(idempotency_key, digest, body)
+    return Response(body, media_type="application/json")
+
+
+@router.post("/risk/score/batch")
+async def score_batch(
+    payloads: List[ScoreRequest] = Body(...), session: AsyncSession = Depends(get_session)
+):
+    """Score many entities and persist all RiskRecords in one transaction.
+
+    Results are streamed back as NDJSON, one line per input payload, in input order.
+    """
+    if len(payloads) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"batch is limited to {MAX_BATCH_SIZE} payloads")
+    missing = [i for i, p in enumerate(payloads) if not _entity_id(p)]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"entity_id or client_id is required (payload indexes: {missing[:20]})",
+        )
+
+    scores, factors = await _compute_scores(payloads)
+    now = datetime.utcnow()
+    rows = [_row(p, sc, now, f) for p, sc, f in zip(payloads, scores, factors, strict=True)]
+    if idempotency.dedup is not None:
+        idempotency.dedup.forget(r["entity_id"] for r in rows)
+    # one executemany INSERT and one commit, or one enqueue in write-behind mode
+    await _persist(session, rows)
+
+    def results():
+        for p, row in zip(payloads, rows, strict=True):
+            yield orjson.dumps(_response(row["entity_id"], row["score"], now, p)) + b"\n"
 
-    rec = RiskRecord(
-        entity_id=eid,
-        score=sc,
-        model=payload.get("model", "v1"),
-        label=payload.get("label"),
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post("/risk/latest")
+async def latest_scores(body: LatestRequest, session: AsyncSession = Depends(get_session)):
+    """Current score of each requested entity, in request order.
+
+    Served from the latest-score table by primary key; ids with no records are
+    listed under ``missing``.
+    """
+    entity_ids = body.entity_ids
+    if len(entity_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"lookup is limited to {MAX_BATCH_SIZE} entity ids")
+    wanted = list(dict.fromkeys(entity_ids))
+    found = {}
+    for i in range(0, len(wanted), latest.LOOKUP_CHUNK_SIZE):
+        chunk = wanted[i : i + latest.LOOKUP_CHUNK_SIZE]
+        for eid, sc, mdl, lbl, ts in (await session.exec(latest.lookup_query(chunk))).all():
+            found[eid] = {
+                "entity_id": eid,
+                "score": sc,
+                "model": mdl,
+                "label": lbl,
+                "created_at": ts,
+            }
+    metrics.add_rows(len(found))
+    return ORJSONResponse(
+        {
+            "scores": [found[eid] for eid in wanted if eid in found],
+            "missing": [eid for eid in wanted if eid not in found],
+        }
     )
-    session.add(rec)
-    session.commit()
-    session.refresh(rec)
-    resp = {"entity_id": rec.entity_id, "score": rec.score, "created_at": rec.created_at.isoformat()}
-    # keep backward-compatible key for tests / clients that use client_id
-    if payload.get("client_id"):
-        resp["client_id"] = payload.get("client_id")
-    return resp
+
+
+async def sse_events(sub: pubsub.Subscription, keepalive_s: float = STREAM_KEEPALIVE_S):
+    """Server-Sent Events for one subscription; unsubscribes when the client goes away."""
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                lines = await asyncio.wait_for(sub.get(), keepalive_s)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if lines is None:
+                yield 'event: dropped\ndata: {"reason": "subscriber fell behind"}\n\n'
+                return
+            yield "".join(f"data: {line}\n\n" for line in lines)
+    finally:
+        sub.close()
+
+
+@router.get("/risk/stream")
+async def stream(
+    entity_id: Optional[str] = None, model: Optional[str] = None, label: Optional[str] = None
+):
+    """Push every newly committed score as a Server-Sent Event, optionally filtered."""
+    sub = pubsub.broker.subscribe(entity_id, model, label)
+    return StreamingResponse(
+        sse_events(sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _ws_pump(websocket: WebSocket, sub: pubsub.Subscription) -> None:
+    while True:
+        lines = await sub.get()
+        if lines is None:
+            # 1013 "try again later": the client fell behind and was dropped
+            await websocket.close(code=1013, reason="subscriber fell behind")
+            return
+        for line in lines:
+            await websocket.send_text(line)
+
+
+async def _ws_watch(websocket: WebSocket) -> None:
+    # returns once the client disconnects; clients are not expected to send
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/risk/stream/ws")
+async def stream_ws(
+    websocket: WebSocket,
+    entity_id: Optional[str] = None,
+    model: Optional[str] = None,
+    label: Optional[str] = None,
+):
+    """WebSocket variant of /risk/stream: one JSON text message per score."""
+    # subscribe before accepting so nothing committed after the handshake is missed
+    sub = pubsub.broker.subscribe(entity_id, model, label)
+    try:
+        await websocket.accept()
+    except Exception:
+        sub.close()
+        raise
+
+    tasks = [asyncio.create_task(_ws_pump(websocket, sub)), asyncio.create_task(_ws_watch(websocket))]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # a send to a closed socket ends the pump; that is a normal disconnect
+            exc = task.exception()
+            if exc is not None and not isinstance(exc, (WebSocketDisconnect, RuntimeError)):
+                raise exc
+    finally:
+        for task in tasks:
+            task.cancel()
+        sub.close()
+
+
+@router.get("/risk/stream/stats")
+def stream_stats():
+    return pubsub.broker.stats()
+
+
+@router.get("/risk/offload/stats")
+def offload_stats():
+    """Offload pool mode and how many batches ran in workers vs inline."""
+    return offload.stats()
+
+
+@router.get("/risk/idempotency/stats")
+def idempotency_stats():
+    """Idempotency-Key replays and dedup hits, i.e. requests that wrote nothing."""
+    return idempotency.stats()
+
+
+@router.get("/risk/ingest/stats")
+def ingest_stats():
+    """Write mode plus, in write-behind mode, queue depth and flush latency."""
+    return ingest.stats()
@@ -0,0 +1,41 @@
+"""Request and response schemas of the public API.
+
+These are plain Pydantic models, separate from the SQLModel tables, so request
+parsing stays cheap and the table classes never run per-row validation on reads.
+History endpoints serialize result tuples directly and use the response models
+below for the OpenAPI schema only.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class ScoreRequest(BaseModel):
+    # either id is accepted; client_id is the legacy name
+    entity_id: Optional[str] = None
+    client_id: Optional[str] = None
+    # factor values are checked by the scoring engine, which reports bad ones as 400
+    risk_factors: Optional[Dict[str, Any]] = None
+    model: Optional[str] = None
+    label: Optional[str] = None
+
+
+class ScoreResponse(BaseModel):
+    entity_id: str
+    score: float
+    created_at: datetime
+    client_id: Optional[str] = None
+
+
+class LatestRequest(BaseModel):
+    entity_ids: List[str]
+
+
+class RiskRecordOut(BaseModel):
+    id: int
+    entity_id: str
+    score: float
+    model: Optional[str] = None
+    label: Optional[str] = None
+    created_at: datetime
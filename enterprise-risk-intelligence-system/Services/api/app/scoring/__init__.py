@@ -0,0 +1,21 @@
+"""Pluggable, vectorized risk scoring models.
+
+Models register under the name clients pass as ``payload["model"]`` and score a
+whole ``(n_entities, n_factors)`` array per call, so one entity and 100k entities
+share the same code path.
+"""
+# import built-in models so they register themselves
+from . import linear  # noqa: F401,E402
+from .base import FACTORS, ScoringModel, factor_matrix
+from .registry import UnknownModelError, get_model, load_models, register, registered_models
+
+__all__ = [
+    "FACTORS",
+    "ScoringModel",
+    "UnknownModelError",
+    "factor_matrix",
+    "get_model",
+    "load_models",
+    "register",
+    "registered_models",
+]
@@ -0,0 +1,51 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+
+# factor columns, in matrix order; these are the fields the dashboard form sends
+FACTORS = ("financial_health", "market_volatility", "compliance_score", "operational_risk")
+
+
+class ScoringModel(ABC):
+    """A model scores a float64 matrix with one row per entity and one column per factor.
+
+    Missing factors arrive as NaN; implementations return one score in [0, 100] per row.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def score(self, factors: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+def factor_matrix(risk_factors: Iterable[Optional[Mapping]]) -> np.ndarray:
+    """Build the ``(n, len(FACTORS))`` float64 matrix; absent factors become NaN.
+
+    Raises ValueError for a factor name outside FACTORS and for a value that is
+    not a finite number; null counts as absent.
+    """
+    risk_factors = [rf or {} for rf in risk_factors]
+    unknown = {name for rf in risk_factors for name in rf}.difference(FACTORS)
+    if unknown:
+        raise ValueError(f"unknown risk factors: {', '.join(sorted(unknown))}")
+    # JSON numbers only: numeric strings and booleans would otherwise convert silently
+    if not all(_is_number(v) for rf in risk_factors for v in rf.values()):
+        raise ValueError("risk factor values must be numeric")
+    # None (absent or null) converts to NaN below
+    rows = [[rf.get(f) for f in FACTORS] for rf in risk_factors]
+    if not rows:
+        return np.empty((0, len(FACTORS)), dtype=np.float64)
+    try:
+        matrix = np.array(rows, dtype=np.float64)
+    except (OverflowError, TypeError, ValueError) as exc:
+        raise ValueError("risk factor values must be numeric") from exc
+    # every NaN should come from an absent factor; the rest are supplied NaN or +-inf
+    if np.count_nonzero(~np.isfinite(matrix)) != sum(row.count(None) for row in rows):
+        raise ValueError("risk factor values must be finite")
+    return matrix
+
+
+def _is_number(value) -> bool:
+    return value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
@@ -0,0 +1,30 @@
+import numpy as np
+
+from .base import FACTORS, ScoringModel
+from .registry import register
+
+
+@register("v1")
+class LinearModel(ScoringModel):
+    """Weighted sum of factor risk contributions.
+
+    Factors are 0-100 sliders. ``financial_health`` and ``compliance_score`` are
+    "higher is safer" and get inverted; missing factors count as a neutral 50.
+    """
+
+    weights = {
+        "financial_health": 0.35,
+        "market_volatility": 0.25,
+        "compliance_score": 0.20,
+        "operational_risk": 0.20,
+    }
+    inverted = ("financial_health", "compliance_score")
+
+    def __init__(self):
+        self._w = np.array([self.weights[f] for f in FACTORS], dtype=np.float64)
+        self._flip = np.array([f in self.inverted for f in FACTORS])
+
+    def score(self, factors: np.ndarray) -> np.ndarray:
+        x = np.clip(np.nan_to_num(factors, nan=50.0), 0.0, 100.0)
+        x = np.where(self._flip, 100.0 - x, x)
+        return x @ self._w
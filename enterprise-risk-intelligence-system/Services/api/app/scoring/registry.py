@@ -0,0 +1,44 @@
+from typing import Callable, Dict, List
+
+from .base import ScoringModel
+
+_factories: Dict[str, Callable[[], ScoringModel]] = {}
+_loaded: Dict[str, ScoringModel] = {}
+
+
+class UnknownModelError(KeyError):
+    pass
+
+
+def register(name: str):
+    """Class decorator registering a model factory under ``name``."""
+
+    def decorator(cls):
+        cls.name = name
+        _factories[name] = cls
+        return cls
+
+    return decorator
+
+
+def registered_models() -> List[str]:
+    return sorted(_factories)
+
+
+def load_models() -> None:
+    """Instantiate every registered model once, e.g. in offload worker processes.
+
+    The API itself builds models lazily on first use.
+    """
+    for name in _factories:
+        get_model(name)
+
+
+def get_model(name: str) -> ScoringModel:
+    model = _loaded.get(name)
+    if model is None:
+        factory = _factories.get(name)
+        if factory is None:
+            raise UnknownModelError(name)
+        model = _loaded[name] = factory()
+    return model
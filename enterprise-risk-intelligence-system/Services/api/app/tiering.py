@@ -0,0 +1,304 @@
+"""Parquet cold tier for aged RiskRecord history.
+
+``python -m app.tiering archive --older-than-days N`` moves records older than the
+cutoff out of the database into Hive-partitioned Parquet files
+(``month=YYYY-MM/bucket=NN``, where the bucket is a hash of ``entity_id``) and
+advances a watermark: every record before it lives in the cold tier, every record
+at or after it in the database. History reads consult the cold tier only when the
+requested range reaches below the watermark, scanning memory-mapped files with
+partition pruning, predicate pushdown and column projection.
+
+Rollups are left in place when records are archived, so the aggregate endpoints
+keep covering both tiers without touching Parquet at all. Factor values are
+dropped with their records: factor filters and aggregates cover the database only.
+"""
+import argparse
+import json
+import os
+import uuid
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import delete
+from sqlmodel import Session, col, select
+
+from .config import get_settings
+from .models import RiskFactorValue, RiskRecord
+
+COLUMNS = ("id", "entity_id", "score", "model", "label", "created_at")
+# files are spread over this many entity hash buckets per month
+ENTITY_BUCKETS = 16
+# records read from the database per round trip while archiving
+ARCHIVE_CHUNK_SIZE = 100_000
+STATE_FILE = "_tier.json"
+
+
+def entity_bucket(entity_id: str) -> int:
+    return zlib.crc32(entity_id.encode()) % ENTITY_BUCKETS
+
+
+def _month(ts: datetime) -> str:
+    return ts.strftime("%Y-%m")
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("entity_id", pa.string()),
+            ("score", pa.float64()),
+            ("model", pa.string()),
+            ("label", pa.string()),
+            ("created_at", pa.timestamp("us")),
+        ]
+    )
+
+
+class ColdTier:
+    """Parquet files under ``root`` plus a JSON state file listing them and the watermark.
+
+    Files that are not listed in the state (left behind by an interrupted archive
+    run) are never read and are removed by the next run.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._state_path = self.root / STATE_FILE
+        self._state_mtime: Optional[float] = None
+        self._state: dict = {"watermark": None, "files": []}
+
+    def _load(self) -> dict:
+        # cheap stat per read so a tier advanced by the CLI is picked up by servers
+        try:
+            mtime = self._state_path.stat().st_mtime
+        except FileNotFoundError:
+            return {"watermark": None, "files": []}
+        if mtime != self._state_mtime:
+            self._state = json.loads(self._state_path.read_text())
+            self._state_mtime = mtime
+        return self._state
+
+    def _save(self, state: dict) -> None:
+        tmp = self._state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self._state_path)
+
+    @property
+    def watermark(self) -> Optional[datetime]:
+        value = self._load()["watermark"]
+        return datetime.fromisoformat(value) if value else None
+
+    def covers(self, start: Optional[datetime] = None, after: Optional[datetime] = None) -> bool:
+        """Whether a query starting at ``start`` (or after cursor time ``after``) needs cold rows."""
+        wm = self.watermark
+        if wm is None:
+            return False
+        lower = max(t for t in (start, after, datetime.min) if t is not None)
+        return lower < wm
+
+    def _months(self, start: Optional[datetime], end: Optional[datetime]) -> List[Tuple[str, List[str]]]:
+        by_month: Dict[str, List[str]] = defaultdict(list)
+        for rel in self._load()["files"]:
+            by_month[rel.split("/", 1)[0].split("=", 1)[1]].append(str(self.root / rel))
+        lo = _month(start) if start else ""
+        hi = _month(end) if end else "9999-99"
+        # partition pruning: whole months outside the range are never opened
+        return [(m, by_month[m]) for m in sorted(by_month) if lo <= m <= hi]
+
+    def _dataset(self, files: List[str]):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+
+        partitioning = ds.partitioning(
+            pa.schema([("month", pa.string()), ("bucket", pa.int32())]), flavor="hive"
+        )
+        schema = _schema().append(pa.field("month", pa.string())).append(pa.field("bucket", pa.int32()))
+        return ds.dataset(
+            files,
+            schema=schema,
+            format="parquet",
+            partitioning=partitioning,
+            partition_base_dir=str(self.root),
+            filesystem=fs.LocalFileSystem(use_mmap=True),
+        )
+
+    def _expression(
+        self,
+        entity_id: Union[str, Sequence[str], None] = None,
+        label: Optional[str] = None,
+        model: Optional[str] = None,
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+    ):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        ts = pa.timestamp("us")
+        f = ds.field
+        expr = f("created_at") < pa.scalar(self.watermark, ts)
+        if isinstance(entity_id, str) and entity_id:
+            expr &= (f("bucket") == entity_bucket(entity_id)) & (f("entity_id") == entity_id)
+        elif entity_id and not isinstance(entity_id, str):
+            # several entities: prune to their buckets, then match exactly
+            buckets = sorted({entity_bucket(e) for e in entity_id})
+            expr &= f("bucket").isin(buckets) & f("entity_id").isin(list(entity_id))
+        if label:
+            expr &= f("label") == label
+        if model:
+            expr &= f("model") == model
+        if min_score is not None:
+            expr &= f("score") >= min_score
+        if max_score is not None:
+            expr &= f("score") <= max_score
+        if start:
+            expr &= f("created_at") >= pa.scalar(start, ts)
+        if end:
+            expr &= f("created_at") <= pa.scalar(end, ts)
+        if after:
+            at, rid = pa.scalar(after[0], ts), after[1]
+            expr &= (f("created_at") > at) | ((f("created_at") == at) & (f("id") > rid))
+        return expr
+
+    def scan(
+        self,
+        columns: Sequence[str] = COLUMNS,
+        after: Optional[Tuple[datetime, int]] = None,
+        ordered: bool = True,
+        **filters,
+    ) -> Iterator:
+        """Yield one pyarrow Table per month, oldest first.
+
+        Rows within a month are sorted by (created_at, id) unless ``ordered`` is
+        False, which aggregate-style scans use to skip the sort.
+        """
+        expr = self._expression(after=after, **filters)
+        read = list(dict.fromkeys((*columns, "created_at", "id"))) if ordered else list(columns)
+        for _, files in self._months(filters.get("start"), filters.get("end")):
+            table = self._dataset(files).to_table(columns=read, filter=expr)
+            if table.num_rows:
+                if ordered:
+                    table = table.sort_by([("created_at", "ascending"), ("id", "ascending")])
+                yield table.select(list(columns))
+
+    def page(
+        self, limit: int, offset: int = 0, after: Optional[Tuple[datetime, int]] = None, **filters
+    ) -> Tuple[List[dict], int]:
+        """Up to ``limit`` cold records after skipping ``offset``.
+
+        Returns the records and the part of ``offset`` the cold tier could not
+        absorb, which the caller applies to the hot query.
+        """
+        expr = self._expression(after=after, **filters)
+        out: List[dict] = []
+        for _, files in self._months(filters.get("start"), filters.get("end")):
+            dataset = self._dataset(files)
+            if offset:
+                # skip whole months by row count without materializing them
+                n = dataset.count_rows(filter=expr)
+                if n <= offset:
+                    offset -= n
+                    continue
+            table = dataset.to_table(columns=list(COLUMNS), filter=expr)
+            table = table.sort_by([("created_at", "ascending"), ("id", "ascending")])
+            out.extend(table.slice(offset, limit - len(out)).to_pylist())
+            offset = 0
+            if len(out) >= limit:
+                break
+        return out, offset
+
+    def archive(self, session: Session, cutoff: datetime) -> int:
+        """Move records created before ``cutoff`` into Parquet; returns records moved."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        state = dict(self._load())
+        wm = self.watermark
+        if wm is not None and cutoff <= wm:
+            return 0
+        self._remove_orphans(state["files"])
+
+        run = uuid.uuid4().hex[:12]
+        written: List[str] = []
+        schema = _schema()
+        partitioning = ds.partitioning(
+            pa.schema([("month", pa.string()), ("bucket", pa.int32())]), flavor="hive"
+        )
+        stmt = select(*(getattr(RiskRecord, c) for c in COLUMNS)).where(
+            col(RiskRecord.created_at) < cutoff
+        )
+        if wm is not None:
+            stmt = stmt.where(col(RiskRecord.created_at) >= wm)
+        stmt = stmt.order_by(col(RiskRecord.created_at).asc(), col(RiskRecord.id).asc())
+        result = session.execute(stmt.execution_options(yield_per=ARCHIVE_CHUNK_SIZE))
+        moved = 0
+        for i, rows in enumerate(result.partitions()):
+            arrays = [pa.array(c, t) for c, t in zip(zip(*rows, strict=True), schema.types, strict=True)]
+            table = pa.Table.from_arrays(arrays, schema=schema)
+            table = table.append_column("month", pa.array([_month(r[5]) for r in rows]))
+            table = table.append_column(
+                "bucket", pa.array([entity_bucket(r[1]) for r in rows], pa.int32())
+            )
+            # entity-clustered row groups give the entity_id predicate useful statistics
+            table = table.take(pc.sort_indices(table, [("entity_id", "ascending"), ("created_at", "ascending")]))
+            ds.write_dataset(
+                table,
+                str(self.root),
+                format="parquet",
+                partitioning=partitioning,
+                basename_template=f"part-{run}-{i}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                file_visitor=lambda f: written.append(os.path.relpath(f.path, self.root)),
+            )
+            moved += len(rows)
+
+        # publish files and watermark first: from here on reads skip hot rows below
+        # the watermark, so the delete below can be retried without double counting
+        self._save({"watermark": cutoff.isoformat(), "files": state["files"] + written})
+        # factor values are not archived; factor filters only ever read the database
+        archived = select(RiskRecord.id).where(col(RiskRecord.created_at) < cutoff)
+        session.execute(delete(RiskFactorValue).where(col(RiskFactorValue.record_id).in_(archived)))
+        session.execute(delete(RiskRecord).where(col(RiskRecord.created_at) < cutoff))
+        session.commit()
+        return moved
+
+    def _remove_orphans(self, files: List[str]) -> None:
+        keep = set(files)
+        for path in self.root.glob("month=*/bucket=*/*.parquet"):
+            if os.path.relpath(path, self.root) not in keep:
+                path.unlink()
+
+
+cold_tier = ColdTier(Path(get_settings().cold_dir))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.tiering")
+    parser.add_argument("command", choices=["archive"])
+    parser.add_argument(
+        "--older-than-days", type=int, default=get_settings().cold_after_days,
+        help="archive records created more than this many days ago",
+    )
+    args = parser.parse_args()
+
+    from .database import engine, init_db
+
+    init_db()
+    cutoff = datetime.utcnow() - timedelta(days=args.older_than_days)
+    with Session(engine) as session:
+        n = cold_tier.archive(session, cutoff)
+    print(f"archived {n} records older than {cutoff.isoformat()} to {cold_tier.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Incremental per-entity trend state and anomaly flags.
+
+Every write path calls :func:`apply` inside the transaction that inserts the
+``RiskRecord`` rows. Each entity keeps a fixed amount of state: an EWMA, its last
+``trend_window`` scores and the mean, standard deviation and least-squares slope
+of that window. A record whose z-score against the window before it reaches
+``trend_z_threshold`` is flagged as an anomaly.
+
+``python -m app.trends rebuild`` recomputes the state for every entity from the
+full history with numpy, without replaying records one at a time.
+"""
+import argparse
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlmodel import Session
+
+from .config import Settings, get_settings
+from .models import EntityTrend, RiskRecord
+
+# a z-score needs at least this many earlier scores to be meaningful
+MIN_SAMPLES = 5
+# windows flatter than this are treated as constant (z-score 0)
+MIN_STD = 1e-9
+# entity ids bound per IN (...) when loading state
+LOAD_CHUNK_SIZE = 10_000
+# records read per round trip during a rebuild
+REBUILD_CHUNK_SIZE = 50_000
+
+
+def _window_stats(window: Sequence[float]):
+    """Mean, population std and least-squares slope of ``window``."""
+    m = len(window)
+    mean = sum(window) / m
+    std = math.sqrt(sum((y - mean) ** 2 for y in window) / m)
+    if m < 2:
+        return mean, std, 0.0
+    ibar = (m - 1) / 2
+    sxx = m * (m * m - 1) / 12
+    slope = sum((i - ibar) * (y - mean) for i, y in enumerate(window)) / sxx
+    return mean, std, slope
+
+
+def _step(state: dict, score: float, ts, settings: Settings) -> dict:
+    window = state["window"]
+    zscore = 0.0
+    if len(window) >= MIN_SAMPLES:
+        mean, std, _ = _window_stats(window)
+        if std > MIN_STD:
+            zscore = (score - mean) / std
+    anomaly = abs(zscore) >= settings.trend_z_threshold
+    window = (window + [score])[-settings.trend_window :]
+    mean, std, slope = _window_stats(window)
+    alpha = settings.trend_alpha
+    return {
+        "entity_id": state["entity_id"],
+        "n": state["n"] + 1,
+        "last_score": score,
+        "last_at": ts,
+        "ewma": score if state["n"] == 0 else alpha * score + (1 - alpha) * state["ewma"],
+        "window": window,
+        "mean": mean,
+        "std": std,
+        "slope": slope,
+        "zscore": zscore,
+        "anomaly": anomaly,
+        "last_anomaly_at": ts if anomaly else state["last_anomaly_at"],
+    }
+
+
+def _upsert(session: Session, states: List[dict]) -> None:
+    if not states:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(EntityTrend.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EntityTrend.__table__.c.entity_id],
+        set_={k: stmt.excluded[k] for k in states[0] if k != "entity_id"},
+    )
+    session.execute(stmt, states)
+
+
+def _load(session: Session, entity_ids: List[str]) -> Dict[str, dict]:
+    table = EntityTrend.__table__
+    out = {}
+    for i in range(0, len(entity_ids), LOAD_CHUNK_SIZE):
+        chunk = entity_ids[i : i + LOAD_CHUNK_SIZE]
+        # row locks on Postgres; SQLite already holds the write lock from the insert
+        stmt = select(table).where(table.c.entity_id.in_(chunk)).with_for_update()
+        for row in session.execute(stmt).mappings():
+            out[row["entity_id"]] = dict(row)
+    return out
+
+
+def apply(session: Session, records: Iterable[Mapping]) -> None:
+    """Fold new records into the trend state, oldest first per entity.
+
+    Does not commit; callers run it in the same transaction as the record insert,
+    after the insert, so concurrent writers of one entity are serialized.
+    """
+    settings = get_settings()
+    by_entity = defaultdict(list)
+    for r in records:
+        by_entity[r["entity_id"]].append((r["created_at"], r["score"]))
+    if not by_entity:
+        return
+    states = _load(session, list(by_entity))
+    out = []
+    for entity_id, points in by_entity.items():
+        state = states.get(entity_id) or {
+            "entity_id": entity_id, "n": 0, "window": [], "ewma": 0.0, "last_anomaly_at": None,
+        }
+        for ts, score in sorted(points, key=lambda p: p[0]):
+            state = _step(state, score, ts, settings)
+        out.append(state)
+    _upsert(session, out)
+
+
+def compute(entity_ids, created_at, scores, settings: Settings) -> List[dict]:
+    """Trend state per entity from full histories given as parallel arrays.
+
+    Equivalent to :func:`apply` over the records in (entity, created_at) order, but
+    vectorized: rolling windows are ``trend_window`` shifted passes over the whole
+    array and the EWMA uses its closed form.
+    """
+    n_total = len(scores)
+    if not n_total:
+        return []
+    names, codes = np.unique(np.asarray(entity_ids, dtype=object), return_inverse=True)
+    order = np.lexsort((created_at, codes))
+    codes, created_at, y = codes[order], created_at[order], np.asarray(scores, np.float64)[order]
+    idx = np.arange(n_total)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], n_total]
+    counts = ends - starts
+    g_start = np.repeat(starts, counts)
+    g_end = np.repeat(ends, counts)
+    N = settings.trend_window
+
+    # z-score of every record against the up-to-N scores before it; two passes of
+    # shifted sums keep the variance exact where cumulative sums would drift
+    pos = idx - g_start
+    cnt = np.minimum(pos, N)
+    total = np.zeros(n_total)
+    for k in range(1, N + 1):
+        i = np.flatnonzero(pos >= k)
+        total[i] += y[i - k]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_prev = total / cnt
+    sq = np.zeros(n_total)
+    for k in range(1, N + 1):
+        i = np.flatnonzero(pos >= k)
+        sq[i] += (y[i - k] - mean_prev[i]) ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std_prev = np.sqrt(sq / cnt)
+        z = np.where(
+            (cnt >= MIN_SAMPLES) & (std_prev > MIN_STD), (y - mean_prev) / std_prev, 0.0
+        )
+    anomaly = np.abs(z) >= settings.trend_z_threshold
+    stamp = created_at.astype("datetime64[us]")
+    flagged = np.where(anomaly, stamp, np.datetime64("NaT", "us"))
+    # NaT is the smallest int64, so the maximum skips records that were not flagged
+    last_anomaly = np.maximum.reduceat(flagged.view(np.int64), starts).view("datetime64[us]")
+
+    # final window: the last min(N, count) records of each entity
+    from_end = g_end - 1 - idx
+    in_window = from_end < N
+    m = np.minimum(counts, N)
+    w_pos = np.repeat(m, counts) - 1 - from_end  # index within the window, 0 = oldest
+    w_mean = np.add.reduceat(np.where(in_window, y, 0.0), starts) / m
+    dev = np.where(in_window, y - np.repeat(w_mean, counts), 0.0)
+    w_std = np.sqrt(np.add.reduceat(dev * dev, starts) / m)
+    ibar = np.repeat((m - 1) / 2, counts)
+    sxx = m * (m * m - 1) / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w_slope = np.where(m >= 2, np.add.reduceat((w_pos - ibar) * dev, starts) / sxx, 0.0)
+
+    # EWMA closed form: the first record enters with weight (1-a)^(count-1), the rest a(1-a)^k
+    alpha = settings.trend_alpha
+    weights = alpha * (1 - alpha) ** from_end
+    weights[starts] = (1 - alpha) ** from_end[starts]
+    ewma = np.add.reduceat(weights * y, starts)
+
+    out = []
+    last = ends - 1
+    for g in range(len(starts)):
+        window = y[ends[g] - m[g] : ends[g]].tolist()
+        la = last_anomaly[g]
+        out.append(
+            {
+                "entity_id": names[g],
+                "n": int(counts[g]),
+                "last_score": float(y[last[g]]),
+                "last_at": stamp[last[g]].astype(object),
+                "ewma": float(ewma[g]),
+                "window": window,
+                "mean": float(w_mean[g]),
+                "std": float(w_std[g]),
+                "slope": float(w_slope[g]),
+                "zscore": float(z[last[g]]),
+                "anomaly": bool(anomaly[last[g]]),
+                "last_anomaly_at": None if np.isnat(la) else la.astype(object),
+            }
+        )
+    return out
+
+
+def rebuild(session: Session) -> int:
+    """Recompute trend state for every entity from both storage tiers; returns rows read."""
+    from .tiering import cold_tier
+
+    entity_ids: List[np.ndarray] = []
+    stamps: List[np.ndarray] = []
+    scores: List[np.ndarray] = []
+    columns = ("entity_id", "created_at", "score")
+    watermark = cold_tier.watermark
+    if watermark is not None:
+        for table in cold_tier.scan(columns, ordered=False):
+            entity_ids.append(np.asarray(table.column("entity_id").to_pylist(), dtype=object))
+            stamps.append(table.column("created_at").to_numpy().astype("datetime64[us]"))
+            scores.append(table.column("score").to_numpy())
+    stmt = select(RiskRecord.entity_id, RiskRecord.created_at, RiskRecord.score)
+    if watermark is not None:
+        stmt = stmt.where(RiskRecord.created_at >= watermark)
+    # id order keeps same-timestamp records in insertion order, like the ingest path
+    stmt = stmt.order_by(RiskRecord.id)
+    result = session.execute(stmt.execution_options(yield_per=REBUILD_CHUNK_SIZE))
+    for rows in result.partitions():
+        eids, ts, sc = zip(*rows, strict=True)
+        entity_ids.append(np.asarray(eids, dtype=object))
+        stamps.append(np.array(ts, dtype="datetime64[us]"))
+        scores.append(np.array(sc, dtype=np.float64))
+    n = sum(len(s) for s in scores)
+    states = []
+    if n:
+        states = compute(
+            np.concatenate(entity_ids), np.concatenate(stamps), np.concatenate(scores), get_settings()
+        )
+    session.execute(delete(EntityTrend))
+    for i in range(0, len(states), REBUILD_CHUNK_SIZE):
+        _upsert(session, states[i : i + REBUILD_CHUNK_SIZE])
+    session.commit()
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.trends")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from .database import engine, init_db
+
+    init_db()
+    with Session(engine) as session:
+        n = rebuild(session)
+    print(f"rebuilt trends from {n} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""Performance benchmarks for the ERIS API.
+
+Run from ``Services/api`` so the ``app`` package is importable, e.g.::
+
+    python -m benchmarks.batch_score --n 5000
+"""
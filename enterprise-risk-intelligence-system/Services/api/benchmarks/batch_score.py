@@ -0,0 +1,59 @@
+"""Compare records/sec of POST /risk/score against POST /risk/score/batch."""
+import argparse
+import json
+
+from .common import Timer, temp_client
+
+
+def payload(i: int) -> dict:
+    return {
+        "entity_id": f"bench-{i}",
+        "model": "v1",
+        "risk_factors": {
+            "financial_health": i % 100,
+            "market_volatility": (i * 7) % 100,
+            "compliance_score": (i * 13) % 100,
+            "operational_risk": (i * 31) % 100,
+        },
+    }
+
+
+def run(n_single: int, n_batch: int, batch_size: int) -> dict:
+    with temp_client() as client:
+        with Timer() as t_single:
+            for i in range(n_single):
+                client.post("/risk/score", json=payload(i)).raise_for_status()
+
+        with Timer() as t_batch:
+            for start in range(0, n_batch, batch_size):
+                chunk = [payload(i) for i in range(start, min(start + batch_size, n_batch))]
+                r = client.post("/risk/score/batch", json=chunk)
+                r.raise_for_status()
+                # drain the streamed body so the timing includes serialization
+                r.read()
+
+    single_rps = n_single / t_single.elapsed
+    batch_rps = n_batch / t_batch.elapsed
+    return {
+        "single": {"records": n_single, "seconds": t_single.elapsed, "records_per_sec": single_rps},
+        "batch": {
+            "records": n_batch,
+            "batch_size": batch_size,
+            "seconds": t_batch.elapsed,
+            "records_per_sec": batch_rps,
+        },
+        "speedup": batch_rps / single_rps,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-single", type=int, default=1_000)
+    parser.add_argument("--n-batch", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.n_single, args.n_batch, args.batch_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import get_session
+from app.main import app
+
+
+@contextmanager
+def temp_client() -> Iterator[TestClient]:
+    """TestClient wired to a throwaway SQLite file so runs never touch app/risk.db."""
+    tmp_dir = tempfile.mkdtemp(prefix="eris-bench-")
+    db_file = os.path.join(tmp_dir, "bench.db")
+    engine = create_engine(f"sqlite:///{db_file}", connect_args={"check_same_thread": False})
+    from app import models  # noqa: F401
+
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+
+    async def get_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+        asyncio.run(async_engine.dispose())
+        try:
+            os.remove(db_file)
+            os.rmdir(tmp_dir)
+        except OSError:
+            pass
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,90 @@
+"""Write volume of a retrying /risk/score client, with and without dedup.
+
+Replays one request stream in which ``--retry-rate`` of the submissions are
+sent twice (a client retrying after a timeout) and ``--repeat-rate`` of them
+rescore an entity with exactly the body it was last scored with. Each mode gets
+a fresh database and reports requests/s, records written and writes saved:
+
+* ``plain``: no ``Idempotency-Key``, dedup off (every request writes)
+* ``keys``: every submission and its retry share an ``Idempotency-Key``
+* ``keys_dedup``: keys plus a dedup window covering the whole run
+
+::
+
+    python -m benchmarks.dedup --submissions 2000
+"""
+import argparse
+import json
+import random
+import uuid
+
+from app import cache, idempotency
+from app.scoring import FACTORS
+
+from .common import Timer, temp_client
+
+
+def _workload(submissions: int, entities: int, retry_rate: float, repeat_rate: float, seed: int):
+    rng = random.Random(seed)
+    last = {}
+    sends = []
+    for _ in range(submissions):
+        eid = f"dd-{rng.randrange(entities)}"
+        if eid in last and rng.random() < repeat_rate:
+            body = last[eid]
+        else:
+            body = {"entity_id": eid, "risk_factors": {f: rng.randint(0, 100) for f in FACTORS}}
+        last[eid] = body
+        key = uuid.UUID(int=rng.getrandbits(128)).hex
+        sends.append((key, body))
+        if rng.random() < retry_rate:
+            sends.append((key, body))
+    return sends
+
+
+def _run(sends, use_keys: bool, dedup: bool) -> dict:
+    idempotency.keys = idempotency.IdempotencyKeys(len(sends), 3600.0)
+    idempotency.dedup = idempotency.Deduplicator(len(sends), 3600.0) if dedup else None
+    with temp_client() as client:
+        with Timer() as t:
+            for key, body in sends:
+                headers = {"Idempotency-Key": key} if use_keys else None
+                client.post("/risk/score", json=body, headers=headers).raise_for_status()
+        # the daily rollups whose averages duplicate writes would skew
+        written = sum(day["n"] for day in client.get("/history/aggregate/day").json())
+        stats = idempotency.stats()
+    return {
+        "requests": len(sends),
+        "requests_per_s": len(sends) / t.elapsed,
+        "records_written": written,
+        "writes_saved": stats["writes_saved"],
+        "key_replays": stats["idempotency"]["replays"],
+        "dedup_hits": stats["dedup"]["hits"] if stats["dedup"] else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--retry-rate", type=float, default=0.2)
+    parser.add_argument("--repeat-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sends = _workload(args.submissions, args.entities, args.retry_rate, args.repeat_rate, args.seed)
+    saved = cache.response_cache, idempotency.keys, idempotency.dedup
+    cache.response_cache = None
+    try:
+        report = {
+            "plain": _run(sends, use_keys=False, dedup=False),
+            "keys": _run(sends, use_keys=True, dedup=False),
+            "keys_dedup": _run(sends, use_keys=True, dedup=True),
+        }
+    finally:
+        cache.response_cache, idempotency.keys, idempotency.dedup = saved
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
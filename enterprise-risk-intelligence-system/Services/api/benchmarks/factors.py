@@ -0,0 +1,172 @@
+"""Factor-filtered reads: indexed riskfactorvalue rows vs JSON factor blobs.
+
+Seeds ``--rows`` records whose four factors are stored both ways: as
+``riskfactorvalue`` rows (the ingest path) and as a JSON blob per row in
+``riskrequest``, the way requests used to keep them. For a selective and a broad
+``market_volatility`` range it times a 500-row page of matching records, the
+count of matches and the per-factor aggregate over them, answered by
+
+* ``blob_python``: fetch every blob and ``json.loads`` it (what callers had to do)
+* ``blob_json_extract``: SQLite's ``json_extract`` in the WHERE clause (a full scan)
+* ``factor_index``: the history API queries over the ``(factor_id, value)`` index
+
+::
+
+    python -m benchmarks.factors --rows 1000000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlmodel import Session, SQLModel, select
+
+from app import factors
+from app.config import get_settings
+from app.database import create_db_engine
+from app.models import RiskFactorValue
+from app.routers.history import factor_aggregate_query, timeseries_query
+from app.scoring import FACTORS
+
+from .common import Timer
+
+CHUNK_SIZE = 100_000
+FACTOR = "market_volatility"
+PAGE = 500
+
+
+def _seed(db_file: str, rows: int, seed: int) -> None:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    for lo in range(0, rows, CHUNK_SIZE):
+        ids = range(lo + 1, min(lo + CHUNK_SIZE, rows) + 1)
+        values = [[round(rng.uniform(0, 100), 2) for _ in FACTORS] for _ in ids]
+        created = [str(start + timedelta(seconds=i * 30)) for i in ids]
+        conn.executemany(
+            "INSERT INTO riskrecord (id, entity_id, score, model, label, created_at) VALUES (?, ?, ?, 'v1', NULL, ?)",
+            [(i, f"ent-{i % 1000}", v[0], t) for i, v, t in zip(ids, values, created, strict=True)],
+        )
+        conn.executemany(
+            "INSERT INTO riskfactorvalue (record_id, factor_id, value) VALUES (?, ?, ?)",
+            [(i, fid, x) for i, v in zip(ids, values, strict=True) for fid, x in zip(factors.FACTOR_IDS.values(), v, strict=True)],
+        )
+        conn.executemany(
+            "INSERT INTO riskrequest (id, client_id, request_time, risk_factors, score) VALUES (?, ?, ?, ?, ?)",
+            [
+                (i, f"ent-{i % 1000}", t, json.dumps(dict(zip(FACTORS, v, strict=True))), v[0])
+                for i, v, t in zip(ids, values, created, strict=True)
+            ],
+        )
+        conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def _blob_python(conn: sqlite3.Connection, lo: float, hi: float) -> dict:
+    page, n, acc = [], 0, {f: [0, 0.0, float("inf"), float("-inf")] for f in FACTORS}
+    for rid, blob in conn.execute("SELECT id, risk_factors FROM riskrequest ORDER BY request_time"):
+        rf = json.loads(blob)
+        if not lo <= rf[FACTOR] <= hi:
+            continue
+        n += 1
+        if len(page) < PAGE:
+            page.append(rid)
+        for f, v in rf.items():
+            a = acc[f]
+            a[0] += 1
+            a[1] += v
+            a[2] = min(a[2], v)
+            a[3] = max(a[3], v)
+    return {"page": len(page), "matches": n, "factors": len(acc)}
+
+
+def _blob_json_extract(conn: sqlite3.Connection, lo: float, hi: float) -> dict:
+    where = f"json_extract(risk_factors, '$.{FACTOR}') BETWEEN ? AND ?"
+    page = conn.execute(
+        f"SELECT id FROM riskrequest WHERE {where} ORDER BY request_time LIMIT {PAGE}", (lo, hi)
+    ).fetchall()
+    n = conn.execute(f"SELECT count(*) FROM riskrequest WHERE {where}", (lo, hi)).fetchone()[0]
+    aggs = [
+        conn.execute(
+            f"SELECT count(*), avg(json_extract(risk_factors, '$.{f}')), "
+            f"min(json_extract(risk_factors, '$.{f}')), max(json_extract(risk_factors, '$.{f}')) "
+            f"FROM riskrequest WHERE {where}",
+            (lo, hi),
+        ).fetchone()
+        for f in FACTORS
+    ]
+    return {"page": len(page), "matches": n, "factors": len(aggs)}
+
+
+def _factor_index(session: Session, lo: float, hi: float) -> dict:
+    flt = {"factor": FACTOR, "factor_min": lo, "factor_max": hi}
+    page = session.exec(timeseries_query(limit=PAGE, **flt)).all()
+    fid = factors.FACTOR_IDS[FACTOR]
+    n = session.exec(
+        select(func.count())
+        .select_from(RiskFactorValue)
+        .where(RiskFactorValue.factor_id == fid, RiskFactorValue.value.between(lo, hi))
+    ).one()
+    aggs = session.exec(factor_aggregate_query(**flt)).all()
+    return {"page": len(page), "matches": n, "factors": len(aggs)}
+
+
+def _best(fn, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        with Timer() as t:
+            out = fn()
+        best = min(best, t.elapsed)
+    return best, out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="eris-factors-")
+    db_file = os.path.join(tmp_dir, "bench.db")
+    engine = create_db_engine(f"sqlite:///{db_file}", get_settings())
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        factors.seed(conn)
+    try:
+        with Timer() as t_seed:
+            _seed(db_file, args.rows, args.seed)
+        report = {"rows": args.rows, "seed_s": t_seed.elapsed, "db_bytes": os.path.getsize(db_file)}
+        conn = sqlite3.connect(db_file)
+        with Session(engine) as session:
+            for name, (lo, hi) in (("selective_1pct", (99.0, 100.0)), ("broad_30pct", (70.0, 100.0))):
+                case = {}
+                for label, fn in (
+                    ("blob_python", lambda lo=lo, hi=hi: _blob_python(conn, lo, hi)),
+                    ("blob_json_extract", lambda lo=lo, hi=hi: _blob_json_extract(conn, lo, hi)),
+                    ("factor_index", lambda lo=lo, hi=hi: _factor_index(session, lo, hi)),
+                ):
+                    seconds, out = _best(fn, args.repeat)
+                    case[label] = {"ms": seconds * 1000, **out}
+                matches = {c["matches"] for c in case.values()}
+                assert len(matches) == 1, f"paths disagree: {case}"
+                case["speedup_vs_python"] = case["blob_python"]["ms"] / case["factor_index"]["ms"]
+                case["speedup_vs_json_extract"] = case["blob_json_extract"]["ms"] / case["factor_index"]["ms"]
+                report[name] = case
+        conn.close()
+        print(json.dumps(report, indent=2))
+    finally:
+        engine.dispose()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
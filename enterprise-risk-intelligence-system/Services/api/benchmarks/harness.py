@@ -0,0 +1,218 @@
+"""Throughput and latency of the main endpoints, with run-to-run regression checks.
+
+``run`` seeds (or reuses) a SQLite file, then drives each scenario with
+``--concurrency`` closed-loop clients, either in-process through the ASGI app or
+against a local uvicorn, and writes a JSON report with throughput and
+p50/p95/p99 latencies::
+
+    python -m benchmarks.harness run --rows 1000000 --mode uvicorn --out base.json
+    python -m benchmarks.harness compare base.json new.json --threshold 0.1
+
+``compare`` exits with status 1 when any scenario regressed by more than the
+threshold (latency up or throughput down).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+from .load import percentile, serve
+from .seed import seed
+
+SCENARIOS = ("score", "timeseries", "aggregate_day")
+# report keys compared by ``compare``; True means higher is better
+METRICS = {"throughput_rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+
+def _request(scenario: str, entities: int, rng: random.Random):
+    eid = f"ent-{rng.randrange(entities)}"
+    if scenario == "score":
+        factors = {"financial_health": rng.randrange(100), "market_volatility": rng.randrange(100)}
+        return "POST", "/risk/score", {"json": {"entity_id": eid, "risk_factors": factors}}
+    if scenario == "timeseries":
+        return "GET", "/history/timeseries", {"params": {"entity_id": eid, "limit": 500}}
+    return "GET", "/history/aggregate/day", {"params": {"entity_id": eid}}
+
+
+async def _drive(http: httpx.AsyncClient, scenario: str, concurrency: int, requests: int, entities: int):
+    latencies, errors = [], 0
+    remaining = requests
+
+    async def client(worker: int):
+        nonlocal remaining, errors
+        rng = random.Random(worker)
+        while remaining > 0:
+            remaining -= 1
+            method, path, kwargs = _request(scenario, entities, rng)
+            t0 = time.perf_counter()
+            try:
+                r = await http.request(method, path, **kwargs)
+                r.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def _run_scenarios(http, args) -> dict:
+    results = {}
+    for scenario in args.scenarios:
+        # a short warm-up fills connection pools and page caches
+        await _drive(http, scenario, args.concurrency, min(args.requests, args.concurrency * 2), args.entities)
+        results[scenario] = await _drive(http, scenario, args.concurrency, args.requests, args.entities)
+    return results
+
+
+async def _in_process(db_url: str, extra_env: dict, args) -> dict:
+    # settings are read on first import, so the environment must be in place first
+    os.environ.update(extra_env, ERIS_DATABASE_URL=db_url)
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+            return await _run_scenarios(http, args)
+    finally:
+        await app.router.shutdown()
+
+
+async def _over_http(url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        return await _run_scenarios(http, args)
+
+
+def run(args) -> dict:
+    tmp_dir = None
+    db = args.db
+    if db is None:
+        tmp_dir = tempfile.mkdtemp(prefix="eris-harness-")
+        db = os.path.join(tmp_dir, "bench.db")
+    seeded = None
+    if args.rows and (args.db is None or not os.path.exists(db) or args.reseed):
+        seeded = seed(db, args.rows, args.entities)
+    db_url = f"sqlite:///{db}"
+    extra_env = dict(kv.split("=", 1) for kv in args.env)
+    try:
+        if args.mode == "uvicorn":
+            with serve(dict(extra_env, ERIS_DATABASE_URL=db_url), workers=args.workers) as url:
+                results = asyncio.run(_over_http(url, args))
+        else:
+            results = asyncio.run(_in_process(db_url, extra_env, args))
+    finally:
+        if tmp_dir is not None:
+            for name in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, name))
+            os.rmdir(tmp_dir)
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else 1,
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "entities": args.entities,
+            "env": extra_env,
+            "seed": seeded,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float) -> dict:
+    """Relative change of every metric per scenario; regressions beyond ``threshold`` are flagged."""
+    report, regressions = {}, []
+    for scenario, before in base["results"].items():
+        after = new["results"].get(scenario)
+        if after is None:
+            continue
+        rows = {}
+        for metric, higher_is_better in METRICS.items():
+            old, cur = before[metric], after[metric]
+            change = (cur - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            rows[metric] = {"base": old, "new": cur, "change": change, "regression": worse > threshold}
+            if worse > threshold:
+                regressions.append(f"{scenario}.{metric}")
+        report[scenario] = rows
+    # results are only comparable when the runs were configured alike
+    keys = ("mode", "workers", "concurrency", "requests_per_scenario", "entities", "env")
+    mismatched = [k for k in keys if base["meta"].get(k) != new["meta"].get(k)]
+    return {
+        "threshold": threshold,
+        "regressions": regressions,
+        "config_mismatch": mismatched,
+        "scenarios": report,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("run", help="seed and drive the scenarios")
+    r.add_argument("--db", help="SQLite file to use; seeded when missing (default: temporary)")
+    r.add_argument("--rows", type=int, default=100_000, help="records to seed (1k..10M)")
+    r.add_argument("--reseed", action="store_true", help="append --rows even if --db exists")
+    r.add_argument("--entities", type=int, default=1000)
+    r.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    r.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    r.add_argument("--concurrency", type=int, default=50)
+    r.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    r.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    r.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE",
+        help="server settings, e.g. --env ERIS_CACHE_TTL_S=0",
+    )
+    r.add_argument("--out", help="write the JSON report here as well as to stdout")
+
+    c = sub.add_parser("compare", help="diff two reports and flag regressions")
+    c.add_argument("base")
+    c.add_argument("new")
+    c.add_argument("--threshold", type=float, default=0.10, help="relative change that counts")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        report = run(args)
+        text = json.dumps(report, indent=2)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(text + "\n")
+        print(text)
+        return
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    result = compare(base, new, args.threshold)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""JSON vs Arrow IPC for the dashboard's /history/timeseries reads.
+
+For a 5000-row page and for a downsampled multi-entity comparison, reports the
+body size, the server time per request (response cache off) and the client
+time to turn the body into a pandas DataFrame::
+
+    python -m benchmarks.history_format --entities 5 --rows-per-entity 5000
+"""
+import argparse
+import json
+
+import orjson
+
+from app import cache
+
+from .common import Timer, temp_client
+
+
+def _json_frame(body: bytes):
+    import pandas as pd
+
+    df = pd.DataFrame(orjson.loads(body))
+    df["created_at"] = pd.to_datetime(df["created_at"])
+    return df
+
+
+def _arrow_frame(body: bytes):
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(pa.py_buffer(body)).read_all().to_pandas(split_blocks=True)
+
+
+def _best(fn, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        with Timer() as t:
+            out = fn()
+        best = min(best, t.elapsed)
+    return best, out
+
+
+def run(entities: int, rows_per_entity: int, points: int, repeat: int) -> dict:
+    ids = [f"fmt-{i}" for i in range(entities)]
+    cases = {
+        "page_5000": {"entity_id": ids, "limit": 5000},
+        f"compare_{entities}x{points}_points": {"entity_id": ids, "points": points},
+    }
+    saved, cache.response_cache = cache.response_cache, None
+    results = {}
+    try:
+        with temp_client() as client:
+            for eid in ids:
+                for start in range(0, rows_per_entity, 5000):
+                    n = min(5000, rows_per_entity - start)
+                    client.post("/risk/score/batch", json=[{"entity_id": eid}] * n).raise_for_status()
+            for case, params in cases.items():
+                out = {}
+                for fmt, decode in (("json", _json_frame), ("arrow", _arrow_frame)):
+                    def fetch(params=params, fmt=fmt):
+                        r = client.get("/history/timeseries", params={**params, "format": fmt})
+                        r.raise_for_status()
+                        return r.content
+
+                    server_s, body = _best(fetch, repeat)
+                    decode_s, frame = _best(lambda decode=decode, body=body: decode(body), repeat)
+                    out[fmt] = {
+                        "bytes": len(body),
+                        "rows": len(frame),
+                        "request_ms": server_s * 1000,
+                        "decode_ms": decode_s * 1000,
+                    }
+                out["bytes_ratio"] = out["arrow"]["bytes"] / out["json"]["bytes"]
+                results[case] = out
+    finally:
+        cache.response_cache = saved
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, default=5)
+    parser.add_argument("--rows-per-entity", type=int, default=5000)
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.entities, args.rows_per_entity, args.points, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Closed-loop load test of POST /risk/score against a running uvicorn server.
+
+Each of ``--concurrency`` clients sends requests back to back; the report gives
+throughput and latency percentiles. With ``--serve`` a local uvicorn is started
+on a throwaway SQLite file first.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    idx = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+async def _client(http: httpx.AsyncClient, worker: int, n: int, latencies, errors) -> None:
+    for i in range(n):
+        payload = {
+            "entity_id": f"load-{worker}",
+            "risk_factors": {"financial_health": (worker + i) % 100, "market_volatility": i % 100},
+        }
+        t0 = time.perf_counter()
+        try:
+            r = await http.post("/risk/score", json=payload)
+            r.raise_for_status()
+        except httpx.HTTPError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - t0)
+
+
+async def _probe(url: str, stop: asyncio.Event, latencies) -> None:
+    # /health on its own connection shows whether writes stall unrelated requests
+    async with httpx.AsyncClient(base_url=url, timeout=60) as http:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                await http.get("/health")
+            except httpx.HTTPError:
+                pass
+            else:
+                latencies.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.05)
+
+
+async def run(url: str, concurrency: int, requests_per_client: int) -> dict:
+    latencies, errors, probe = [], [], []
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        prober = asyncio.create_task(_probe(url, stop, probe))
+        t0 = time.perf_counter()
+        await asyncio.gather(
+            *(_client(http, w, requests_per_client, latencies, errors) for w in range(concurrency))
+        )
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await prober
+    latencies.sort()
+    probe.sort()
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "health_p50_ms": percentile(probe, 50) * 1000,
+        "health_p99_ms": percentile(probe, 99) * 1000,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def serve(extra_env=None, workers: int = 1):
+    """Start uvicorn on a free port; yields the base URL.
+
+    The database is a temporary file unless ``extra_env`` sets ``ERIS_DATABASE_URL``.
+    """
+    port = _free_port()
+    tmp_dir = tempfile.mkdtemp(prefix="eris-load-")
+    # a fresh database, so the workers create the schema themselves
+    env = dict(os.environ, ERIS_DATABASE_URL=f"sqlite:///{tmp_dir}/load.db", ERIS_INIT_DB="1")
+    env.update(extra_env or {})
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, cwd=API_DIR, env=env)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                httpx.get(f"{url}/health", timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError as exc:
+                if time.time() > deadline or proc.poll() is not None:
+                    raise RuntimeError("uvicorn did not come up") from exc
+                time.sleep(0.2)
+        yield url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--serve", action="store_true", help="start a local uvicorn first")
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE",
+        help="extra environment for --serve, e.g. --env ERIS_WRITE_BEHIND=1",
+    )
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests-per-client", type=int, default=10)
+    args = parser.parse_args()
+    if args.serve:
+        with serve(dict(kv.split("=", 1) for kv in args.env)) as url:
+            report = asyncio.run(run(url, args.concurrency, args.requests_per_client))
+    else:
+        report = asyncio.run(run(args.url, args.concurrency, args.requests_per_client))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
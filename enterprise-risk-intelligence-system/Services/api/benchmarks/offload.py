@@ -0,0 +1,77 @@
+"""Inline vs process-pool scoring: batch latency and the longest event-loop stall.
+
+A ticker coroutine measures how long the loop goes without running while a
+batch scores; inline scoring blocks it for the whole batch, offloaded scoring
+only for the copy into shared memory. Run it to pick ``ERIS_OFFLOAD_MIN_ROWS``::
+
+    python -m benchmarks.offload --rows 1000 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from app import offload, scoring
+from app.config import Settings
+
+
+async def _measure(work) -> dict:
+    gaps, done = [0.0], False
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - t0
+    done = True
+    await task
+    return {"ms": elapsed * 1000, "max_stall_ms": max(gaps) * 1000}
+
+
+async def run(sizes, workers: int, repeat: int) -> dict:
+    await offload.start_pool(Settings(offload_workers=workers, offload_min_rows=0))
+    model = scoring.get_model("v1")
+    rng = np.random.default_rng(0)
+    results = []
+    try:
+        for n in sizes:
+            factors = rng.uniform(0, 100, (n, len(scoring.FACTORS)))
+
+            # bind this size's matrix now; the closures must not see a later one
+            async def inline(factors=factors):
+                model.score(factors)
+
+            async def offloaded(factors=factors):
+                await offload.score("v1", factors)
+
+            best = {}
+            for name, work in (("inline", inline), ("offload", offloaded)):
+                runs = [await _measure(work) for _ in range(repeat)]
+                best[name] = min(runs, key=lambda r: r["ms"])
+            results.append({"rows": n, **best})
+    finally:
+        await offload.stop_pool()
+    return {"workers": workers, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.rows, args.workers, args.repeat)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
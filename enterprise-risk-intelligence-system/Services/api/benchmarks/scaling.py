@@ -0,0 +1,61 @@
+"""POST /risk/score throughput as the number of uvicorn workers grows.
+
+Each worker count gets a fresh server on one shared SQLite file, started with
+write-behind ingestion by default so request parsing, scoring and encoding (the
+parts extra processes can spread over cores) dominate rather than per-request
+commits. Speedup is relative to the first worker count::
+
+    python -m benchmarks.scaling --workers 1 2 4 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+from .load import run, serve
+
+
+def _default_workers():
+    counts, n = [], 1
+    while n <= (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts
+
+
+def scale(workers, concurrency: int, requests_per_client: int, extra_env: dict) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="eris-scaling-") as tmp:
+        env = dict({"ERIS_WRITE_BEHIND": "1"}, ERIS_DATABASE_URL=f"sqlite:///{tmp}/scaling.db")
+        env.update(extra_env)
+        for n in workers:
+            with serve(env, workers=n) as url:
+                # a short warm-up so every worker has imported, connected and loaded models
+                asyncio.run(run(url, concurrency, 2))
+                report = asyncio.run(run(url, concurrency, requests_per_client))
+            report["workers"] = n
+            results.append(report)
+    base = results[0]["throughput_rps"] if results else 0.0
+    for r in results:
+        r["speedup"] = r["throughput_rps"] / base if base else float("nan")
+    return {"cpus": os.cpu_count(), "env": env, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=_default_workers())
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests-per-client", type=int, default=20)
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE",
+        help="server settings, e.g. --env ERIS_WRITE_BEHIND=0",
+    )
+    args = parser.parse_args()
+    extra_env = dict(kv.split("=", 1) for kv in args.env)
+    report = scale(args.workers, args.concurrency, args.requests_per_client, extra_env)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
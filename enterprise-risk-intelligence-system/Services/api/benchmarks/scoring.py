@@ -0,0 +1,48 @@
+"""Per-entity scoring latency of the registered models at different batch sizes."""
+import argparse
+import json
+
+import numpy as np
+
+from app import scoring
+
+from .common import Timer
+
+BATCH_SIZES = (1, 10, 100, 1_000, 10_000, 100_000)
+
+
+def run(model_name: str, batch_sizes, repeat: int) -> dict:
+    model = scoring.get_model(model_name)
+    rng = np.random.default_rng(0)
+    results = []
+    for n in batch_sizes:
+        values = rng.uniform(0, 100, (n, len(scoring.FACTORS)))
+        factors = [dict(zip(scoring.FACTORS, row, strict=True)) for row in values]
+        best_score = best_total = float("inf")
+        for _ in range(repeat):
+            with Timer() as t_total:
+                with Timer() as t_matrix:
+                    x = scoring.factor_matrix(factors)
+                model.score(x)
+            best_total = min(best_total, t_total.elapsed)
+            best_score = min(best_score, t_total.elapsed - t_matrix.elapsed)
+        results.append(
+            {
+                "batch_size": n,
+                "score_us_per_entity": best_score / n * 1e6,
+                "total_us_per_entity": best_total / n * 1e6,
+            }
+        )
+    return {"model": model_name, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="v1", choices=scoring.registered_models())
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.model, BATCH_SIZES, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Seed a SQLite file with a synthetic RiskRecord history for benchmarks.
+
+Rows are spread evenly over ``--entities`` entities and the last ``--days`` days.
+Rollups are built with one SQL aggregate and the latest-score table is derived
+from them, so seeding 10M rows does not replay the Python ingest path.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import SQLModel, create_engine
+
+CHUNK_SIZE = 100_000
+LABELS = (None, "watch", "review", "escalated")
+
+_DAY_BUCKET = "date(created_at)"
+# SQLite: 'weekday 0' moves to the coming Sunday (or stays), -6 days lands on Monday
+_WEEK_BUCKET = "date(created_at, 'weekday 0', '-6 days')"
+
+
+def _rows(n: int, entities: int, days: int, seed: int):
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(days=days)
+    step = days * 86400 / max(n, 1)
+    for i in range(n):
+        yield (
+            f"ent-{i % entities}",
+            round(rng.uniform(0, 100), 2),
+            "v1",
+            LABELS[i % len(LABELS)],
+            str(start + timedelta(seconds=i * step)),
+        )
+
+
+def seed(db_path: str, rows: int, entities: int = 1000, days: int = 365, seed: int = 0) -> dict:
+    """Create the schema in ``db_path`` and append ``rows`` records; returns a summary."""
+    from app import models  # noqa: F401
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    it = _rows(rows, entities, days, seed)
+    while True:
+        chunk = [r for _, r in zip(range(CHUNK_SIZE), it, strict=False)]
+        if not chunk:
+            break
+        conn.executemany(
+            "INSERT INTO riskrecord (entity_id, score, model, label, created_at) VALUES (?, ?, ?, ?, ?)",
+            chunk,
+        )
+        conn.commit()
+    conn.execute("DELETE FROM riskrollup")
+    for period, bucket in (("day", _DAY_BUCKET), ("week", _WEEK_BUCKET)):
+        conn.execute(
+            f"""
+            INSERT INTO riskrollup (period, entity_id, bucket, n, total, total_sq, min_score, max_score)
+            SELECT '{period}', entity_id, {bucket}, count(*), sum(score), sum(score * score),
+                   min(score), max(score)
+            FROM riskrecord GROUP BY entity_id, {bucket}
+            """
+        )
+    conn.execute("DELETE FROM latestscore")
+    conn.execute(
+        """
+        INSERT INTO latestscore (entity_id, score, model, label, created_at)
+        SELECT entity_id, score, model, label, max(created_at) FROM riskrecord GROUP BY entity_id
+        """
+    )
+    conn.commit()
+    total = conn.execute("SELECT count(*) FROM riskrecord").fetchone()[0]
+    conn.close()
+    return {
+        "db": db_path,
+        "rows_added": rows,
+        "rows_total": total,
+        "entities": entities,
+        "seconds": time.perf_counter() - t0,
+        "bytes": os.path.getsize(db_path),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", required=True, help="SQLite file to create or extend")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--entities", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(seed(args.db, args.rows, args.entities, args.days, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
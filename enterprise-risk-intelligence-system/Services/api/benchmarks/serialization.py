@@ -0,0 +1,107 @@
+"""Fetch + serialize time of one 5000-row /history/timeseries page.
+
+Compares the old path (ORM entities validated against ``List[RiskRecord]`` and
+encoded with the stdlib ``json``), hand-built dicts from ORM entities, and the
+current path (column tuples zipped into dicts and encoded with orjson).
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import models  # noqa: F401
+from app.models import RiskRecord
+from app.routers.history import EXPORT_COLUMNS, timeseries_query
+
+from .common import Timer
+
+PAGE = 5000
+
+
+def _orm_validated(session) -> bytes:
+    rows = session.exec(select(RiskRecord).order_by(RiskRecord.created_at).limit(PAGE)).all()
+    validated = TypeAdapter(List[RiskRecord]).validate_python(rows, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def _orm_dicts(session) -> bytes:
+    rows = session.exec(select(RiskRecord).order_by(RiskRecord.created_at).limit(PAGE)).all()
+    return json.dumps(
+        [
+            {
+                "id": r.id,
+                "entity_id": r.entity_id,
+                "score": r.score,
+                "model": r.model,
+                "label": r.label,
+                "created_at": r.created_at.isoformat(),
+            }
+            for r in rows
+        ]
+    ).encode()
+
+
+def _tuples_orjson(session) -> bytes:
+    rows = session.exec(timeseries_query(limit=PAGE)).all()
+    return orjson.dumps([dict(zip(EXPORT_COLUMNS, row, strict=True)) for row in rows])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="eris-serialize-")
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+    SQLModel.metadata.create_all(engine)
+    base = datetime(2024, 1, 1)
+    try:
+        with Session(engine) as session:
+            session.execute(
+                insert(RiskRecord),
+                [
+                    {
+                        "entity_id": f"ent-{i % 50}",
+                        "score": (i * 7919 % 10000) / 100,
+                        "model": "v1",
+                        "label": "watch" if i % 3 else None,
+                        "created_at": base + timedelta(seconds=i, microseconds=i % 7),
+                    }
+                    for i in range(PAGE)
+                ],
+            )
+            session.commit()
+
+            bodies = {}
+            results = {}
+            for name, fn in (
+                ("orm_validated_json", _orm_validated),
+                ("orm_dicts_json", _orm_dicts),
+                ("tuples_orjson", _tuples_orjson),
+            ):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    session.expunge_all()
+                    with Timer() as t:
+                        bodies[name] = fn(session)
+                    best = min(best, t.elapsed)
+                results[name] = {"ms": best * 1000, "bytes": len(bodies[name])}
+        decoded = [json.loads(b) for b in bodies.values()]
+        assert all(d == decoded[0] for d in decoded), "paths disagree"
+        print(json.dumps({"rows": PAGE, **results}, indent=2))
+    finally:
+        engine.dispose()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
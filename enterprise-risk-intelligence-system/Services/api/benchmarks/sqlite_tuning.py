@@ -0,0 +1,104 @@
+"""Concurrent read/write throughput of default SQLite settings vs the tuned pragmas.
+
+Writer threads insert RiskRecord rows one commit at a time (the /risk/score
+pattern) while reader threads run /history/timeseries-shaped queries.
+"""
+import argparse
+import dataclasses
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel
+
+from app import models  # noqa: F401
+from app.config import get_settings
+from app.database import create_db_engine
+from app.models import RiskRecord
+from app.routers.history import timeseries_query
+
+
+def _run(tuned: bool, writers: int, readers: int, seconds: float, seed_rows: int) -> dict:
+    tmp_dir = tempfile.mkdtemp(prefix="eris-sqlite-")
+    url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    settings = dataclasses.replace(
+        get_settings(),
+        sqlite_tuning=tuned,
+        db_pool_size=writers + readers,
+        db_max_overflow=0,
+    )
+    engine = create_db_engine(url, settings)
+    SQLModel.metadata.create_all(engine)
+    now = datetime.utcnow()
+    seed = [
+        {"entity_id": f"ent-{i % 100}", "score": float(i % 100), "created_at": now}
+        for i in range(seed_rows)
+    ]
+    with Session(engine) as session:
+        session.execute(insert(RiskRecord), seed)
+        session.commit()
+
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def writer(i):
+        while time.perf_counter() < stop:
+            try:
+                with Session(engine) as session:
+                    session.add(RiskRecord(entity_id=f"ent-{i}", score=random.uniform(0, 100)))
+                    session.commit()
+                bump("writes")
+            except OperationalError:
+                bump("errors")
+
+    def reader(i):
+        while time.perf_counter() < stop:
+            try:
+                with Session(engine) as session:
+                    session.exec(timeseries_query(entity_id=f"ent-{i % 100}", limit=200)).all()
+                bump("reads")
+            except OperationalError:
+                bump("errors")
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    return {
+        "tuned": tuned,
+        "writes_per_sec": counts["writes"] / seconds,
+        "reads_per_sec": counts["reads"] / seconds,
+        "errors": counts["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed-rows", type=int, default=50_000)
+    args = parser.parse_args()
+    results = [
+        _run(tuned, args.writers, args.readers, args.seconds, args.seed_rows)
+        for tuned in (False, True)
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""API cold start: import time by package and time until /health answers.
+
+``import`` runs ``python -X importtime -c "import app.main"`` in fresh
+interpreters and reports medians of the total, the self time summed per heavy
+dependency and the self time of each app module. ``ready`` starts uvicorn on a
+migrated SQLite file and measures process start to the first 200 from
+``/health``, with and without startup DDL (``ERIS_INIT_DB``)::
+
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .load import API_DIR, _free_port
+
+PACKAGES = (
+    "fastapi", "starlette", "pydantic", "sqlalchemy", "sqlmodel", "aiosqlite",
+    "numpy", "orjson", "anyio",
+)
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| *(\S+)")
+
+
+def import_times(repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            cwd=API_DIR, capture_output=True, text=True, check=True,
+        ).stderr
+        total_us, by_package, app_self = 0, {}, {}
+        for m in _LINE.finditer(out):
+            self_us, cum_us, name = int(m[1]), int(m[2]), m[3]
+            if name == "app.main":
+                total_us = cum_us
+            # self times add up to the whole without double counting nested imports
+            top = name.split(".", 1)[0]
+            by_package[top] = by_package.get(top, 0) + self_us
+            if top == "app":
+                app_self[name] = self_us
+        runs.append(
+            {
+                "total_ms": total_us / 1000,
+                "packages_ms": {p: by_package.get(p, 0) / 1000 for p in PACKAGES},
+                "app_modules_self_ms": {k: v / 1000 for k, v in app_self.items()},
+            }
+        )
+    median = statistics.median
+    return {
+        "total_ms": median(r["total_ms"] for r in runs),
+        "packages_ms": {p: median(r["packages_ms"][p] for r in runs) for p in PACKAGES},
+        "app_modules_self_ms": {
+            k: median(r["app_modules_self_ms"].get(k, 0) for r in runs)
+            for k in sorted(runs[0]["app_modules_self_ms"], key=lambda k: -runs[0]["app_modules_self_ms"][k])
+        },
+    }
+
+
+def _time_to_ready(env: dict) -> float:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, env=env,
+    )
+    try:
+        while True:
+            try:
+                if httpx.get(url, timeout=1).status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None or time.perf_counter() - t0 > 30:
+                raise RuntimeError("uvicorn did not come up")
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def ready_times(repeat: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="eris-startup-") as tmp:
+        db_url = f"sqlite:///{tmp}/startup.db"
+        env = dict(os.environ, ERIS_DATABASE_URL=db_url)
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            cwd=API_DIR, env=env, check=True, capture_output=True,
+        )
+        out = {}
+        for label, init in (("no_ddl", "0"), ("init_db", "1")):
+            samples = [_time_to_ready(dict(env, ERIS_INIT_DB=init)) for _ in range(repeat)]
+            out[label] = {"median_ms": statistics.median(samples) * 1000, "min_ms": min(samples) * 1000}
+        return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-ready", action="store_true", help="only measure imports")
+    args = parser.parse_args()
+    report = {"python": sys.version.split()[0], "import": import_times(args.repeat)}
+    if not args.skip_ready:
+        report["ready"] = ready_times(args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""One-year per-entity aggregate scan: everything in SQLite vs SQLite + Parquet cold tier.
+
+Seeds a year of RiskRecord history, times a raw-row scan (count/avg/min/max per
+entity, and for a single entity), archives all but the last ``--hot-days`` into
+the cold tier and times the same scans across both tiers.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+from sqlmodel import Session, SQLModel, select
+
+from app import models  # noqa: F401
+from app.config import get_settings
+from app.database import create_db_engine
+from app.models import RiskRecord
+from app.tiering import ColdTier
+
+from .common import Timer
+
+YEAR = timedelta(days=365)
+
+
+def _sql_scan(session, start, entity_id=None) -> dict:
+    stmt = select(
+        RiskRecord.entity_id,
+        func.count(),
+        func.sum(RiskRecord.score),
+        func.min(RiskRecord.score),
+        func.max(RiskRecord.score),
+    ).where(RiskRecord.created_at >= start)
+    if entity_id:
+        stmt = stmt.where(RiskRecord.entity_id == entity_id)
+    rows = session.exec(stmt.group_by(RiskRecord.entity_id)).all()
+    return {eid: [n, total, lo, hi] for eid, n, total, lo, hi in rows}
+
+
+def _tiered_scan(session, tier: ColdTier, start, entity_id=None) -> dict:
+    out = {}
+    for table in tier.scan(("entity_id", "score"), ordered=False, start=start, entity_id=entity_id):
+        agg = table.group_by("entity_id").aggregate(
+            [("score", "count"), ("score", "sum"), ("score", "min"), ("score", "max")]
+        )
+        for eid, n, total, lo, hi in zip(
+            *(agg.column(c).to_pylist() for c in ("entity_id", "score_count", "score_sum", "score_min", "score_max")),
+            strict=True,
+        ):
+            _merge(out, eid, [n, total, lo, hi])
+    hot = _sql_scan(session, max(start, tier.watermark), entity_id)
+    for eid, acc in hot.items():
+        _merge(out, eid, acc)
+    return out
+
+
+def _merge(out: dict, eid: str, acc: list) -> None:
+    cur = out.get(eid)
+    if cur is None:
+        out[eid] = acc
+    else:
+        out[eid] = [cur[0] + acc[0], cur[1] + acc[1], min(cur[2], acc[2]), max(cur[3], acc[3])]
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        with Timer() as t:
+            fn()
+        best = min(best, t.elapsed)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--interval-minutes", type=int, default=60)
+    parser.add_argument("--hot-days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="eris-tiering-")
+    db_file = os.path.join(tmp_dir, "bench.db")
+    engine = create_db_engine(f"sqlite:///{db_file}", get_settings())
+    SQLModel.metadata.create_all(engine)
+    now = datetime.utcnow().replace(microsecond=0)
+    start = now - YEAR
+    steps = int(YEAR.total_seconds() // (args.interval_minutes * 60))
+    try:
+        with Session(engine) as session:
+            for step in range(0, steps, 100):
+                rows = [
+                    {
+                        "entity_id": f"ent-{e}",
+                        "score": float((s * 7 + e) % 100),
+                        "model": "v1",
+                        "created_at": start + timedelta(minutes=s * args.interval_minutes),
+                    }
+                    for s in range(step, min(step + 100, steps))
+                    for e in range(args.entities)
+                ]
+                session.execute(insert(RiskRecord), rows)
+            session.commit()
+            total = session.exec(select(func.count()).select_from(RiskRecord)).one()
+
+            expected = _sql_scan(session, start)
+            sqlite_all = _time(lambda: _sql_scan(session, start), args.repeat)
+            sqlite_one = _time(lambda: _sql_scan(session, start, "ent-7"), args.repeat)
+            db_bytes_before = os.path.getsize(db_file)
+
+            tier = ColdTier(os.path.join(tmp_dir, "cold"))
+            with Timer() as archive:
+                moved = tier.archive(session, now - timedelta(days=args.hot_days))
+            got = _tiered_scan(session, tier, start)
+            assert {k: (n, lo, hi) for k, (n, _, lo, hi) in got.items()} == {
+                k: (n, lo, hi) for k, (n, _, lo, hi) in expected.items()
+            }
+            tiered_all = _time(lambda: _tiered_scan(session, tier, start), args.repeat)
+            tiered_one = _time(lambda: _tiered_scan(session, tier, start, "ent-7"), args.repeat)
+
+        cold_bytes = sum(p.stat().st_size for p in tier.root.rglob("*.parquet"))
+        print(
+            json.dumps(
+                {
+                    "rows": total,
+                    "archived": moved,
+                    "archive_seconds": archive.elapsed,
+                    "sqlite_file_bytes": db_bytes_before,
+                    "parquet_bytes": cold_bytes,
+                    "all_entities": {"sqlite_s": sqlite_all, "tiered_s": tiered_all},
+                    "one_entity": {"sqlite_s": sqlite_one, "tiered_s": tiered_one},
+                },
+                indent=2,
+            )
+        )
+    finally:
+        engine.dispose()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
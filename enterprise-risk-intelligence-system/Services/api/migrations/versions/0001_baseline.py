@@ -0,0 +1,60 @@
+"""Baseline: the schema init_db created before migrations existed.
+
+Databases created by that ``init_db`` already have exactly this; mark them with
+``alembic stamp 0001`` and then ``alembic upgrade head``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "riskrequest",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("client_id", sa.String(), nullable=False),
+        sa.Column("request_time", sa.DateTime(), nullable=False),
+        sa.Column("risk_factors", sa.JSON(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_riskrequest_client_id", "riskrequest", ["client_id"])
+
+    op.create_table(
+        "riskhistory",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("client_id", sa.String(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("risk_factors", sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_riskhistory_client_id", "riskhistory", ["client_id"])
+
+    op.create_table(
+        "riskrecord",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("entity_id", sa.String(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("model", sa.String(), nullable=True),
+        sa.Column("label", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_riskrecord_score", "riskrecord", ["score"])
+    op.create_index("ix_riskrecord_entity_id", "riskrecord", ["entity_id"])
+    op.create_index("ix_riskrecord_created_at", "riskrecord", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("riskrecord")
+    op.drop_table("riskhistory")
+    op.drop_table("riskrequest")
@@ -0,0 +1,85 @@
+"""History indexes and the tables every write maintains.
+
+Swaps the single-column entity index for ``(column, created_at)`` indexes that
+serve history filters and their ordering, and adds the rollup, latest-score and
+trend tables. They start empty; on a database that already holds history, run
+``python -m app.rollups rebuild``, ``python -m app.latest rebuild`` and
+``python -m app.trends rebuild`` once after upgrading.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from app.config import get_settings
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # (entity_id, created_at) has entity_id as its prefix, so the old index is redundant
+    op.drop_index("ix_riskrecord_entity_id", table_name="riskrecord")
+    op.create_index("ix_riskrecord_entity_time", "riskrecord", ["entity_id", "created_at"])
+    op.create_index("ix_riskrecord_model_time", "riskrecord", ["model", "created_at"])
+    op.create_index("ix_riskrecord_label_time", "riskrecord", ["label", "created_at"])
+    # optional, like the model: ERIS_SCORE_INDEX=0 drops it
+    if not get_settings().score_index:
+        op.drop_index("ix_riskrecord_score", table_name="riskrecord")
+
+    op.create_table(
+        "riskrollup",
+        sa.Column("period", sa.String(), nullable=False),
+        sa.Column("entity_id", sa.String(), nullable=False),
+        sa.Column("bucket", sa.String(), nullable=False),
+        sa.Column("n", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("total_sq", sa.Float(), nullable=False),
+        sa.Column("min_score", sa.Float(), nullable=False),
+        sa.Column("max_score", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("period", "entity_id", "bucket"),
+    )
+
+    op.create_table(
+        "latestscore",
+        sa.Column("entity_id", sa.String(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("model", sa.String(), nullable=True),
+        sa.Column("label", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("entity_id"),
+    )
+
+    op.create_table(
+        "entitytrend",
+        sa.Column("entity_id", sa.String(), nullable=False),
+        sa.Column("n", sa.Integer(), nullable=False),
+        sa.Column("last_score", sa.Float(), nullable=False),
+        sa.Column("last_at", sa.DateTime(), nullable=False),
+        sa.Column("ewma", sa.Float(), nullable=False),
+        sa.Column("window", sa.JSON(), nullable=False),
+        sa.Column("mean", sa.Float(), nullable=False),
+        sa.Column("std", sa.Float(), nullable=False),
+        sa.Column("slope", sa.Float(), nullable=False),
+        sa.Column("zscore", sa.Float(), nullable=False),
+        sa.Column("anomaly", sa.Boolean(), nullable=False),
+        sa.Column("last_anomaly_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("entity_id"),
+    )
+    op.create_index("ix_entitytrend_anomaly", "entitytrend", ["anomaly"])
+
+
+def downgrade() -> None:
+    op.drop_table("entitytrend")
+    op.drop_table("latestscore")
+    op.drop_table("riskrollup")
+    if not get_settings().score_index:
+        op.create_index("ix_riskrecord_score", "riskrecord", ["score"])
+    op.drop_index("ix_riskrecord_label_time", table_name="riskrecord")
+    op.drop_index("ix_riskrecord_model_time", table_name="riskrecord")
+    op.drop_index("ix_riskrecord_entity_time", table_name="riskrecord")
+    op.create_index("ix_riskrecord_entity_id", "riskrecord", ["entity_id"])
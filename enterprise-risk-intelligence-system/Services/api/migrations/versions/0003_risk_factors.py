@@ -0,0 +1,49 @@
+"""Factor dictionary and per-record factor values.
+
+Records written before this revision never stored their factors, so there is
+nothing to backfill; new records get their values at ingest.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# ids are positions in app.scoring.FACTORS; a new factor gets a revision adding its row
+FACTORS = ("financial_health", "market_volatility", "compliance_score", "operational_risk")
+
+
+def upgrade() -> None:
+    riskfactor = op.create_table(
+        "riskfactor",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_riskfactor_name", "riskfactor", ["name"], unique=True)
+    op.bulk_insert(riskfactor, [{"id": i, "name": name} for i, name in enumerate(FACTORS, start=1)])
+
+    op.create_table(
+        "riskfactorvalue",
+        sa.Column("record_id", sa.Integer(), nullable=False),
+        sa.Column("factor_id", sa.Integer(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["factor_id"], ["riskfactor.id"]),
+        sa.ForeignKeyConstraint(["record_id"], ["riskrecord.id"]),
+        sa.PrimaryKeyConstraint("record_id", "factor_id"),
+        sqlite_with_rowid=False,
+    )
+    op.create_index(
+        "ix_riskfactorvalue_factor_value", "riskfactorvalue", ["factor_id", "value", "record_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("riskfactorvalue")
+    op.drop_table("riskfactor")
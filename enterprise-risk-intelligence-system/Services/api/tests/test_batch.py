@@ -0,0 +1,40 @@
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import init_db
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def test_batch_score_streams_one_result_per_payload():
+    eid = f'batch-{uuid.uuid4().hex[:8]}'
+    payloads = [{'entity_id': eid, 'label': 'nightly'} for _ in range(25)]
+    payloads.append({'client_id': eid})
+    r = client.post('/risk/score/batch', json=payloads)
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('application/x-ndjson')
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert len(lines) == len(payloads)
+    assert all(line['entity_id'] == eid for line in lines)
+    assert lines[-1]['client_id'] == eid
+
+    r2 = client.get('/history/timeseries', params={'entity_id': eid})
+    assert len(r2.json()) == len(payloads)
+
+
+def test_batch_score_rejects_missing_entity_without_writing():
+    eid = f'batch-{uuid.uuid4().hex[:8]}'
+    r = client.post('/risk/score/batch', json=[{'entity_id': eid}, {'label': 'x'}])
+    assert r.status_code == 400
+    r2 = client.get('/history/timeseries', params={'entity_id': eid})
+    assert r2.json() == []
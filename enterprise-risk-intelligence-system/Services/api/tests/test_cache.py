@@ -0,0 +1,85 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import cache
+from app.database import init_db
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def test_repeat_queries_hit_cache_and_writes_invalidate():
+    eid = f'cache-{uuid.uuid4().hex[:8]}'
+    client.post('/risk/score', json={'entity_id': eid})
+    hits = client.get('/history/cache/stats').json()['hits']
+
+    r1 = client.get('/history/timeseries', params={'entity_id': eid})
+    r2 = client.get('/history/timeseries', params={'entity_id': eid, 'limit': 500})
+    assert r1.json() == r2.json()
+    assert r1.headers['etag'] == r2.headers['etag']
+    assert client.get('/history/cache/stats').json()['hits'] == hits + 1
+
+    r304 = client.get('/history/timeseries', params={'entity_id': eid}, headers={'If-None-Match': r1.headers['etag']})
+    assert r304.status_code == 304
+    assert r304.content == b''
+
+    client.post('/risk/score', json={'entity_id': eid})
+    r3 = client.get('/history/timeseries', params={'entity_id': eid}, headers={'If-None-Match': r1.headers['etag']})
+    assert r3.status_code == 200
+    assert len(r3.json()) == 2
+    assert r3.headers['etag'] != r1.headers['etag']
+
+
+def test_aggregate_is_invalidated_by_batch_writes():
+    eid = f'cache-{uuid.uuid4().hex[:8]}'
+    client.post('/risk/score/batch', json=[{'entity_id': eid}] * 3)
+    assert client.get('/history/aggregate/day', params={'entity_id': eid}).json()[0]['n'] == 3
+    client.post('/risk/score/batch', json=[{'entity_id': eid}] * 2)
+    assert client.get('/history/aggregate/day', params={'entity_id': eid}).json()[0]['n'] == 5
+
+
+def test_lru_eviction_respects_byte_budget():
+    c = cache.ResponseCache(max_entries=100, max_bytes=10, ttl_s=60)
+    for i in range(4):
+        c.put(('k', i), b'abcd', None, c.version(None))
+    assert c.stats()['entries'] == 2
+    assert c.get(('k', 0)) is None
+    assert c.get(('k', 3)) is not None
+    assert c.stats()['evictions'] == 2
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    c = cache.ResponseCache(ttl_s=5)
+    c.put(('k',), b'x', 'e1', c.version('e1'))
+    assert c.get(('k',)) is not None
+    now[0] += 6
+    assert c.get(('k',)) is None
+
+
+def test_response_computed_before_a_write_is_not_stored():
+    c = cache.ResponseCache()
+    version = c.version('e1')
+    c.invalidate(['e1'])
+    c.put(('k',), b'stale', 'e1', version)
+    assert c.get(('k',)) is None
+
+
+def test_invalidation_spares_other_entities_but_not_unfiltered_queries():
+    c = cache.ResponseCache()
+    c.put(('a',), b'1', 'e1', c.version('e1'))
+    c.put(('b',), b'2', 'e2', c.version('e2'))
+    c.put(('all',), b'3', None, c.version(None))
+    c.invalidate(['e1'])
+    assert c.get(('a',)) is None
+    assert c.get(('b',)) is not None
+    assert c.get(('all',)) is None
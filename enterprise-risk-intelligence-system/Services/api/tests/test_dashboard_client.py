@@ -0,0 +1,87 @@
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from app.database import init_db
+from app.main import app
+
+pytest.importorskip('streamlit')
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / 'webapp'))
+import api_client  # noqa: E402
+
+client = TestClient(app)
+
+
+class _AppAdapter(requests.adapters.BaseAdapter):
+    """Hands the dashboard's requests to the app in-process instead of over a socket."""
+
+    def send(self, request, **kwargs):
+        r = client.request(request.method, request.url, content=request.body, headers=dict(request.headers))
+        response = requests.Response()
+        response.status_code = r.status_code
+        response.headers = requests.structures.CaseInsensitiveDict(r.headers)
+        response._content = r.content
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def setup_database(monkeypatch):
+    init_db()
+    session = requests.Session()
+    session.mount('http://', _AppAdapter())
+    monkeypatch.setattr(api_client, 'session', lambda: session)
+    api_client._fetch.clear()
+    yield
+
+
+def _scored_entities(n, per_entity):
+    ids = [f'dash-{uuid.uuid4().hex[:8]}' for _ in range(n)]
+    for eid in ids:
+        for i in range(per_entity):
+            client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'financial_health': 10 * i}})
+    return ids
+
+
+def test_history_falls_back_to_json_without_pyarrow(monkeypatch):
+    ids = _scored_entities(2, 3)
+    # the shipped image before pyarrow was a requirement: every Arrow request is a 501
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    assert client.get('/history/timeseries', params={'entity_id': ids, 'format': 'arrow'}).status_code == 501
+
+    rows = api_client.timeseries(ids, points=None)
+    assert rows['ok']
+    assert sorted(rows['frame']['entity_id']) == sorted(ids * 3)
+    assert str(rows['frame']['created_at'].dtype).startswith('datetime64')
+
+    # a single entity's points are untagged in JSON; the frame still has the column
+    points = api_client.timeseries(ids[:1], points=3)
+    assert points['ok']
+    assert list(points['frame'].columns) == ['entity_id', 'created_at', 'score']
+    assert list(points['frame']['entity_id']) == [ids[0]] * 3
+
+
+def test_history_fallback_matches_arrow(monkeypatch):
+    pytest.importorskip('pyarrow')
+    ids = _scored_entities(2, 4)
+    arrow = api_client.timeseries(ids, points=3)['frame']
+    api_client._fetch.clear()
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    as_json = api_client.timeseries(ids, points=3)['frame']
+    assert as_json['entity_id'].tolist() == arrow['entity_id'].tolist()
+    assert as_json['score'].tolist() == arrow['score'].tolist()
+    assert (as_json['created_at'] == arrow['created_at']).all()
+
+
+def test_other_errors_are_not_retried_as_json():
+    result = api_client.timeseries([f'x{i}' for i in range(101)])
+    assert not result['ok']
+    assert '413' in result['error']
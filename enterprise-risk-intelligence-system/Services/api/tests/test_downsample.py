@@ -0,0 +1,71 @@
+import uuid
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import downsample
+from app.database import init_db
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def _series(n=1000):
+    x = np.arange(n, dtype=np.int64) * 1_000_000
+    y = np.sin(np.linspace(0, 20, n)) * 40 + 50
+    y[137] = 100.0
+    y[811] = 0.0
+    return x, y
+
+
+@pytest.mark.parametrize('method', [downsample.lttb, downsample.minmax])
+def test_index_methods_bound_output_and_keep_order(method):
+    x, y = _series()
+    idx = method(x, y, 100)
+    assert 0 < len(idx) <= 100
+    assert np.all(np.diff(idx) > 0)
+    # both methods keep isolated spikes
+    assert {137, 811} <= set(idx.tolist())
+
+
+def test_lttb_keeps_endpoints_and_passes_short_series_through():
+    x, y = _series()
+    idx = downsample.lttb(x, y, 50)
+    assert len(idx) == 50
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert len(downsample.lttb(x[:20], y[:20], 50)) == 20
+
+
+def test_average_returns_bucket_means():
+    x = np.arange(10, dtype=np.int64)
+    y = np.arange(10, dtype=np.float64)
+    mx, my = downsample.average(x, y, 5)
+    assert my.tolist() == [0.5, 2.5, 4.5, 6.5, 8.5]
+    assert mx.dtype == np.int64
+
+
+def test_timeseries_points_endpoint():
+    eid = f'ds-{uuid.uuid4().hex[:8]}'
+    payloads = [{'entity_id': eid, 'risk_factors': {'market_volatility': v % 100}} for v in range(300)]
+    client.post('/risk/score/batch', json=payloads)
+
+    for method in ('lttb', 'minmax', 'avg'):
+        r = client.get('/history/timeseries', params={'entity_id': eid, 'points': 40, 'downsample': method})
+        assert r.status_code == 200
+        pts = r.json()
+        assert 0 < len(pts) <= 40
+        assert set(pts[0]) == {'created_at', 'score'}
+
+    full = client.get('/history/timeseries', params={'entity_id': eid, 'points': 1000}).json()
+    assert len(full) == 300
+
+    assert client.get('/history/timeseries', params={'entity_id': eid, 'points': 10}).status_code == 200
+    assert client.get('/history/timeseries', params={'points': 2}).status_code == 422
+    assert client.get('/history/timeseries', params={'points': 10, 'offset': 5}).status_code == 400
@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import init_db
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+@pytest.fixture
+def entity():
+    eid = f'export-{uuid.uuid4().hex[:8]}'
+    r = client.post('/risk/score/batch', json=[{'entity_id': eid, 'label': 'exp'}] * 12)
+    assert r.status_code == 200
+    return eid
+
+
+def test_export_ndjson(entity):
+    r = client.get('/history/export', params={'entity_id': entity})
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('application/x-ndjson')
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 12
+    assert {row['entity_id'] for row in rows} == {entity}
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+
+
+def test_export_csv(entity):
+    r = client.get('/history/export', params={'entity_id': entity, 'format': 'csv'})
+    assert r.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == 12
+    assert rows[0]['label'] == 'exp'
+
+
+def test_export_csv_empty_has_header():
+    r = client.get('/history/export', params={'entity_id': 'no-such-entity', 'format': 'csv'})
+    assert r.status_code == 200
+    assert r.text.strip() == 'id,entity_id,score,model,label,created_at'
+
+
+def test_export_parquet(entity):
+    pq = pytest.importorskip('pyarrow.parquet')
+    r = client.get('/history/export', params={'entity_id': entity, 'format': 'parquet'})
+    assert r.status_code == 200
+    table = pq.read_table(io.BytesIO(r.content))
+    assert table.num_rows == 12
+    assert set(table.column('entity_id').to_pylist()) == {entity}
+
+
+def test_export_arrow(entity):
+    pa = pytest.importorskip('pyarrow')
+    r = client.get('/history/export', params={'entity_id': entity, 'format': 'arrow'})
+    assert r.status_code == 200
+    assert r.headers['content-type'] == 'application/vnd.apache.arrow.stream'
+    table = pa.ipc.open_stream(r.content).read_all()
+    assert table.num_rows == 12
+    assert table.column('label').to_pylist() == ['exp'] * 12
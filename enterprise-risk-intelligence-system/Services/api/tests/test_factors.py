@@ -0,0 +1,104 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.database import get_engine, init_db
+from app.main import app
+from app.models import RiskFactor, RiskFactorValue
+from app.scoring import FACTORS
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+@pytest.fixture
+def entity():
+    eid = f'factor-{uuid.uuid4().hex[:8]}'
+    payloads = [
+        {'entity_id': eid, 'risk_factors': {'market_volatility': v, 'financial_health': 100 - v}}
+        for v in range(0, 100, 10)
+    ]
+    # no factors at all: the record is stored, its factor rows are not
+    payloads.append({'entity_id': eid})
+    assert client.post('/risk/score/batch', json=payloads).status_code == 200
+    return eid
+
+
+def test_factor_values_are_stored_per_record(entity):
+    with Session(get_engine()) as session:
+        names = dict(session.exec(select(RiskFactor.id, RiskFactor.name)).all())
+        assert sorted(names.values()) == sorted(FACTORS)
+    rows = client.get('/history/timeseries', params={'entity_id': entity}).json()
+    ids = [r['id'] for r in rows]
+    with Session(get_engine()) as session:
+        values = session.exec(
+            select(RiskFactorValue).where(RiskFactorValue.record_id.in_(ids))
+        ).all()
+    stored = {(v.record_id, names[v.factor_id]): v.value for v in values}
+    assert len(stored) == 20
+    assert [stored[(rid, 'market_volatility')] for rid in ids[:10]] == list(range(0, 100, 10))
+
+
+def test_factor_range_filter(entity):
+    params = {'entity_id': entity, 'factor': 'market_volatility', 'factor_min': 30, 'factor_max': 60}
+    rows = client.get('/history/timeseries', params=params).json()
+    assert len(rows) == 4
+    points = client.get('/history/timeseries', params={**params, 'points': 10}).json()
+    assert len(points) == 4
+    export = client.get('/history/export', params=params).text.splitlines()
+    assert len(export) == 4
+
+    assert client.get('/history/timeseries', params={'factor_min': 30}).status_code == 400
+    assert client.get('/history/timeseries', params={'factor': 'nope'}).status_code == 422
+
+
+def test_factor_aggregates(entity):
+    out = client.get('/history/aggregate/factors', params={'entity_id': entity}).json()
+    by_name = {row['factor']: row for row in out}
+    assert set(by_name) == {'financial_health', 'market_volatility'}
+    vol = by_name['market_volatility']
+    assert (vol['n'], vol['min_value'], vol['max_value']) == (10, 0, 90)
+    assert vol['avg_value'] == pytest.approx(45.0)
+
+    high = client.get(
+        '/history/aggregate/factors',
+        params={'entity_id': entity, 'factor': 'market_volatility', 'factor_min': 70},
+    ).json()
+    health = next(row for row in high if row['factor'] == 'financial_health')
+    assert (health['n'], health['max_value']) == (3, 30)
+
+
+def test_non_finite_factor_values_are_rejected():
+    eid = f'factor-{uuid.uuid4().hex[:8]}'
+    for bad in ('NaN', 'Infinity', '-Infinity'):
+        body = f'{{"entity_id": "{eid}", "risk_factors": {{"market_volatility": {bad}}}}}'
+        r = client.post('/risk/score', content=body, headers={'Content-Type': 'application/json'})
+        assert r.status_code == 400, bad
+        r = client.post('/risk/score/batch', content=f'[{body}]', headers={'Content-Type': 'application/json'})
+        assert r.status_code == 400, bad
+    # null is the same as leaving the factor out
+    r = client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'market_volatility': None, 'financial_health': 10}})
+    assert r.status_code == 200
+    assert len(client.get('/history/timeseries', params={'entity_id': eid}).json()) == 1
+
+
+def test_unknown_factor_names_and_non_numeric_values_are_rejected():
+    eid = f'factor-{uuid.uuid4().hex[:8]}'
+    for factors in ({'credit_rsik': 0.9}, {'financial_health': 10, 'credit_rsik': 0.9}):
+        r = client.post('/risk/score', json={'entity_id': eid, 'risk_factors': factors})
+        assert r.status_code == 400
+        assert 'credit_rsik' in r.json()['detail']
+    for value in ('0.5', True, [1], {'v': 1}):
+        r = client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'financial_health': value}})
+        assert r.status_code == 400, value
+    # one bad row fails the whole batch
+    batch = [{'entity_id': eid, 'risk_factors': {'financial_health': 10}}, {'entity_id': eid, 'risk_factors': {'credit_rsik': 1}}]
+    assert client.post('/risk/score/batch', json=batch).status_code == 400
+    assert client.get('/history/timeseries', params={'entity_id': eid}).json() == []
@@ -1,7 +1,10 @@
+import uuid
+
 import pytest
 from fastapi.testclient import TestClient
-from app.main import app
+
 from app.database import init_db
+from app.main import app
 
 client = TestClient(app)
 
@@ -32,3 +35,43 @@ def test_history_roundtrip():
     first = data[0]
     assert first['entity_id'] == 'hist-test'
     assert 'score' in first
+
+
+def _scored_entities(n, per_entity):
+    ids = [f'cmp-{uuid.uuid4().hex[:8]}' for _ in range(n)]
+    for eid in ids:
+        r = client.post('/risk/score/batch', json=[{'entity_id': eid}] * per_entity)
+        assert r.status_code == 200
+    return ids
+
+
+def test_timeseries_compares_entities_in_one_request():
+    ids = _scored_entities(3, 5)
+    rows = client.get('/history/timeseries', params={'entity_id': ids[:2]}).json()
+    assert len(rows) == 10
+    assert {r['entity_id'] for r in rows} == set(ids[:2])
+
+    points = client.get('/history/timeseries', params={'entity_id': ids, 'points': 3}).json()
+    assert sorted(p['entity_id'] for p in points) == sorted(ids * 3)
+
+    too_many = [f'x{i}' for i in range(101)]
+    assert client.get('/history/timeseries', params={'entity_id': too_many}).status_code == 413
+
+
+def test_timeseries_arrow_matches_json():
+    pa = pytest.importorskip('pyarrow')
+    ids = _scored_entities(2, 4)
+    params = {'entity_id': ids, 'limit': 3}
+    as_json = client.get('/history/timeseries', params=params)
+    r = client.get('/history/timeseries', params={**params, 'format': 'arrow'})
+    assert r.status_code == 200
+    assert r.headers['content-type'] == 'application/vnd.apache.arrow.stream'
+    assert r.headers['x-next-cursor'] == as_json.headers['x-next-cursor']
+    table = pa.ipc.open_stream(r.content).read_all()
+    assert table.column_names == ['id', 'entity_id', 'score', 'model', 'label', 'created_at']
+    assert table.column('id').to_pylist() == [row['id'] for row in as_json.json()]
+
+    r = client.get('/history/timeseries', params={'entity_id': ids, 'points': 3, 'format': 'arrow'})
+    points = pa.ipc.open_stream(r.content).read_all()
+    assert points.column_names == ['entity_id', 'created_at', 'score']
+    assert points.num_rows == 6
@@ -0,0 +1,129 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import idempotency
+from app.database import init_db
+from app.main import app
+
+client = TestClient(app)
+
+FACTORS = {'financial_health': 40, 'market_volatility': 70}
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    store = idempotency.Deduplicator(max_entities=100, window_s=60.0)
+    monkeypatch.setattr(idempotency, 'dedup', store)
+    return store
+
+
+def _records(eid):
+    return len(client.get('/history/timeseries', params={'entity_id': eid}).json())
+
+
+def test_retry_with_same_key_replays_without_writing():
+    eid = f'idem-{uuid.uuid4().hex[:8]}'
+    headers = {'Idempotency-Key': uuid.uuid4().hex}
+    payload = {'entity_id': eid, 'risk_factors': FACTORS}
+    replays = client.get('/risk/idempotency/stats').json()['idempotency']['replays']
+
+    first = client.post('/risk/score', json=payload, headers=headers)
+    retry = client.post('/risk/score', json=payload, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.content == first.content
+    assert retry.headers['idempotent-replayed'] == 'true'
+    assert 'idempotent-replayed' not in first.headers
+    assert _records(eid) == 1
+
+    # without a key, or with a fresh one, every request is a new record
+    client.post('/risk/score', json=payload)
+    client.post('/risk/score', json=payload, headers={'Idempotency-Key': uuid.uuid4().hex})
+    assert _records(eid) == 3
+    stats = client.get('/risk/idempotency/stats').json()
+    assert stats['idempotency']['replays'] == replays + 1
+
+
+def test_key_reused_with_different_body_is_rejected():
+    eid = f'idem-{uuid.uuid4().hex[:8]}'
+    headers = {'Idempotency-Key': uuid.uuid4().hex}
+    client.post('/risk/score', json={'entity_id': eid, 'risk_factors': FACTORS}, headers=headers)
+    r = client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'financial_health': 1}}, headers=headers)
+    assert r.status_code == 422
+    assert _records(eid) == 1
+
+
+def test_failed_request_releases_its_key():
+    eid = f'idem-{uuid.uuid4().hex[:8]}'
+    headers = {'Idempotency-Key': uuid.uuid4().hex}
+    bad = client.post('/risk/score', json={'entity_id': eid, 'model': 'nope'}, headers=headers)
+    assert bad.status_code == 400
+    # same body again: the error was not stored, so it is evaluated (and fails) again
+    assert client.post('/risk/score', json={'entity_id': eid, 'model': 'nope'}, headers=headers).status_code == 400
+    assert client.get('/risk/idempotency/stats').json()['idempotency']['in_flight'] == 0
+
+
+def test_concurrent_retry_waits_for_the_first_request():
+    keys = idempotency.IdempotencyKeys(max_keys=10, ttl_s=60.0)
+
+    async def scenario():
+        assert await keys.begin('k', b'd') is None
+        retry = asyncio.create_task(keys.begin('k', b'd'))
+        await asyncio.sleep(0)
+        assert not retry.done()
+        keys.finish('k', b'd', b'{"score": 1}')
+        return await retry
+
+    assert asyncio.run(scenario()) == b'{"score": 1}'
+    assert keys.stats()['waits'] == 1
+    assert keys.stats()['replays'] == 1
+
+
+def test_key_store_is_bounded():
+    keys = idempotency.IdempotencyKeys(max_keys=2, ttl_s=60.0)
+
+    async def scenario():
+        for k in ('a', 'b', 'c'):
+            await keys.begin(k, b'd')
+            keys.finish(k, b'd', k.encode())
+        return await keys.begin('a', b'd')
+
+    # 'a' was evicted, so the caller owns it again
+    assert asyncio.run(scenario()) is None
+    assert keys.stats()['evictions'] == 1
+
+
+def test_identical_rescore_inside_window_is_not_written(dedup):
+    eid = f'dedup-{uuid.uuid4().hex[:8]}'
+    payload = {'entity_id': eid, 'risk_factors': FACTORS}
+    first = client.post('/risk/score', json=payload)
+    again = client.post('/risk/score', json=payload)
+    assert again.content == first.content
+    assert _records(eid) == 1
+
+    # a different factor value or label is new data
+    client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {**FACTORS, 'market_volatility': 71}})
+    client.post('/risk/score', json={**payload, 'label': 'review'})
+    assert _records(eid) == 3
+    stats = client.get('/risk/idempotency/stats').json()
+    assert stats['dedup']['hits'] == 1
+    assert stats['writes_saved'] >= 1
+
+
+def test_batch_write_resets_dedup_for_its_entities(dedup):
+    eid = f'dedup-{uuid.uuid4().hex[:8]}'
+    payload = {'entity_id': eid, 'risk_factors': FACTORS}
+    client.post('/risk/score', json=payload)
+    client.post('/risk/score/batch', json=[{'entity_id': eid, 'risk_factors': {'financial_health': 5}}])
+    # the latest record is the batch one now, so the identical rescore is written
+    client.post('/risk/score', json=payload)
+    assert _records(eid) == 3
+    assert dedup.hits == 0
@@ -0,0 +1,214 @@
+import asyncio
+import dataclasses
+import os
+import tempfile
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import app.main as main
+from app import ingest
+from app.database import init_db
+from app.main import app
+from app.models import RiskFactorValue, RiskRecord
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+@pytest.fixture
+def temp_db():
+    tmp_dir = tempfile.mkdtemp()
+    db_file = os.path.join(tmp_dir, 'ingest.db')
+    engine = create_engine(f'sqlite:///{db_file}')
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+    yield f'sqlite+aiosqlite:///{db_file}'
+    os.remove(db_file)
+    os.rmdir(tmp_dir)
+
+
+def _rows(n, eid='wb'):
+    return [{'entity_id': eid, 'score': float(i), 'model': 'v1', 'label': None, 'created_at': datetime.utcnow()} for i in range(n)]
+
+
+async def _count(engine):
+    async with AsyncSession(engine) as session:
+        return (await session.exec(select(func.count()).select_from(RiskRecord))).one()
+
+
+def test_factor_values_follow_their_records(temp_db):
+    # mixed None columns and rows without factors must not shift the ids factor rows get
+    rows = [
+        dict(r, label='x' if i % 3 else None, factors={'market_volatility': r['score']} if i % 4 else {})
+        for i, r in enumerate(_rows(500))
+    ]
+
+    async def scenario():
+        engine = create_async_engine(temp_db)
+        async with AsyncSession(engine) as session:
+            await ingest.write_records(session, rows[:7])
+            await ingest.write_records(session, rows)
+            await session.commit()
+            stmt = select(RiskRecord.score, RiskFactorValue.value).join(
+                RiskFactorValue, RiskFactorValue.record_id == RiskRecord.id
+            )
+            pairs = (await session.exec(stmt)).all()
+        await engine.dispose()
+        return pairs
+
+    pairs = asyncio.run(scenario())
+    assert len(pairs) == 5 + 375
+    assert all(score == value for score, value in pairs)
+
+
+def test_queue_group_commits_and_drains_on_stop(temp_db):
+    async def scenario():
+        engine = create_async_engine(temp_db)
+        q = ingest.WriteBehindQueue(lambda: AsyncSession(engine), batch_size=10, flush_ms=20)
+        q.start()
+        await q.put(_rows(25))
+        await q.stop()
+        n = await _count(engine)
+        await engine.dispose()
+        return n, q.stats()
+
+    n, stats = asyncio.run(scenario())
+    assert n == 25
+    assert stats['flushed_records'] == 25
+    assert stats['flush_batches'] >= 3
+    assert stats['queue_depth'] == 0
+
+
+def test_full_queue_applies_backpressure(temp_db):
+    async def scenario():
+        engine = create_async_engine(temp_db)
+        # worker not started, so nothing drains the queue
+        q = ingest.WriteBehindQueue(lambda: AsyncSession(engine), max_size=3, put_timeout_ms=10)
+        with pytest.raises(ingest.IngestQueueFull):
+            await q.put(_rows(5))  # can never fit
+        await q.put(_rows(2))
+        with pytest.raises(ingest.IngestQueueFull):
+            await q.put(_rows(2))  # only one slot free: none of the batch is enqueued
+        depth = q.depth
+
+        # a waiting batch goes in once a flush frees enough room
+        q.put_timeout = 5
+        waiting = asyncio.create_task(q.put(_rows(3)))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        # the batch takes the two queued rows, which lets the three waiting ones in
+        # before its flush window closes
+        assert len(await q._next_batch()) == 5
+        await waiting
+        await engine.dispose()
+        return depth, q.stats()
+
+    depth, stats = asyncio.run(scenario())
+    assert depth == 2
+    assert stats['queue_depth'] == 0
+    assert stats['rejected_records'] == 7
+
+
+def test_sync_mode_is_default():
+    assert client.get('/risk/ingest/stats').json() == {'mode': 'sync'}
+
+
+def test_write_behind_mode_through_app(monkeypatch):
+    settings = dataclasses.replace(main.get_settings(), write_behind=True, write_behind_flush_ms=5)
+    monkeypatch.setattr(main, 'get_settings', lambda: settings)
+    eid = f'wb-{uuid.uuid4().hex[:8]}'
+    with TestClient(app) as c:
+        assert c.get('/risk/ingest/stats').json()['mode'] == 'write_behind'
+        for _ in range(5):
+            assert c.post('/risk/score', json={'entity_id': eid}).status_code == 200
+        assert c.post('/risk/score/batch', json=[{'entity_id': eid}] * 5).status_code == 200
+    # shutdown drained the queue
+    assert ingest.queue is None
+    r = client.get('/history/timeseries', params={'entity_id': eid})
+    assert len(r.json()) == 10
+
+
+def test_failed_flush_is_retried_before_it_is_dropped(temp_db):
+    async def scenario(failures):
+        engine = create_async_engine(temp_db)
+        calls = 0
+
+        def session_factory():
+            nonlocal calls
+            calls += 1
+            if calls <= failures:
+                raise RuntimeError('database is locked')
+            return AsyncSession(engine)
+
+        q = ingest.WriteBehindQueue(session_factory, flush_retries=2, retry_backoff_ms=1)
+        await q.put(_rows(4))
+        await q._flush(await q._next_batch())
+        n = await _count(engine)
+        await engine.dispose()
+        return n, q.stats()
+
+    n, stats = asyncio.run(scenario(failures=2))
+    assert n == 4
+    assert stats['flushed_records'] == 4
+    assert stats['retried_flushes'] == 2
+    assert stats['failed_records'] == 0
+
+    n, stats = asyncio.run(scenario(failures=3))
+    assert n == 4  # from the first run; nothing new was written
+    assert stats['flushed_records'] == 0
+    assert stats['failed_records'] == 4
+    assert stats['queue_depth'] == 0
+
+
+def test_failing_post_commit_hook_does_not_fail_committed_rows(temp_db, monkeypatch):
+    def broken(rows):
+        raise RuntimeError('subscriber error')
+
+    monkeypatch.setattr(ingest, 'after_commit', broken)
+
+    async def scenario():
+        engine = create_async_engine(temp_db)
+        q = ingest.WriteBehindQueue(lambda: AsyncSession(engine))
+        await q.put(_rows(3))
+        await q._flush(await q._next_batch())
+        n = await _count(engine)
+        await engine.dispose()
+        return n, q.stats()
+
+    n, stats = asyncio.run(scenario())
+    assert n == 3
+    assert stats['flushed_records'] == 3
+    assert stats['failed_records'] == 0
+    assert stats['hook_errors'] == 1
+
+
+def test_stop_queue_unpublishes_before_draining(temp_db):
+    async def scenario():
+        engine = create_async_engine(temp_db)
+        q = ingest.WriteBehindQueue(lambda: AsyncSession(engine), flush_ms=20)
+        ingest.queue = q
+        q.start()
+        await q.put(_rows(5))
+        stopping = asyncio.create_task(ingest.stop_queue())
+        await asyncio.sleep(0)
+        published = ingest.queue
+        await stopping
+        n = await _count(engine)
+        await engine.dispose()
+        return published, n
+
+    published, n = asyncio.run(scenario())
+    assert published is None
+    assert n == 5
@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app import latest
+from app.database import engine, init_db
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def test_latest_tracks_newest_write_per_entity():
+    prefix = f'latest-{uuid.uuid4().hex[:8]}'
+    ids = [f'{prefix}-{i}' for i in range(50)]
+    client.post('/risk/score/batch', json=[{'entity_id': e, 'risk_factors': {'market_volatility': 10}} for e in ids])
+    client.post('/risk/score', json={'entity_id': ids[3], 'label': 'watch', 'risk_factors': {'market_volatility': 90}})
+
+    r = client.post('/risk/latest', json={'entity_ids': [ids[3], 'nobody-' + prefix, *ids, ids[3]]})
+    assert r.status_code == 200
+    body = r.json()
+    assert [s['entity_id'] for s in body['scores']] == [ids[3]] + [e for e in ids if e != ids[3]]
+    assert body['missing'] == ['nobody-' + prefix]
+    latest_3 = body['scores'][0]
+    history = client.get('/history/timeseries', params={'entity_id': ids[3]}).json()
+    assert latest_3['score'] == history[-1]['score']
+    assert latest_3['label'] == 'watch'
+
+
+def test_late_record_does_not_replace_newer_one():
+    eid = f'latest-{uuid.uuid4().hex[:8]}'
+    client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'market_volatility': 20}})
+    current = client.post('/risk/latest', json={'entity_ids': [eid]}).json()['scores'][0]
+
+    old = {'entity_id': eid, 'score': 99.0, 'model': 'v1', 'label': None,
+           'created_at': datetime.utcnow() - timedelta(days=3)}
+    with Session(engine) as session:
+        latest.apply(session, [old])
+        session.commit()
+    assert client.post('/risk/latest', json={'entity_ids': [eid]}).json()['scores'][0] == current
+
+
+def test_lookup_is_a_primary_key_search():
+    sql = str(latest.lookup_query(['a', 'b']).compile(engine, compile_kwargs={'literal_binds': True}))
+    with engine.connect() as conn:
+        plan = [row[-1] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    assert any(step.startswith('SEARCH latestscore') for step in plan), plan
+
+
+def test_rebuild_matches_incremental_state():
+    eid = f'latest-{uuid.uuid4().hex[:8]}'
+    for v in (10, 70, 40):
+        client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'market_volatility': v}})
+    before = client.post('/risk/latest', json={'entity_ids': [eid]}).json()
+    with Session(engine) as session:
+        assert latest.rebuild(session) > 0
+    assert client.post('/risk/latest', json={'entity_ids': [eid]}).json() == before
+
+
+def test_too_many_ids_rejected():
+    r = client.post('/risk/latest', json={'entity_ids': ['x'] * 10_001})
+    assert r.status_code == 413
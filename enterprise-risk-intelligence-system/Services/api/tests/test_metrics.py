@@ -0,0 +1,129 @@
+import os
+import re
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.database import init_db
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def _sample(text, name, **labels):
+    want = ','.join(f'{k}="{v}"' for k, v in labels.items())
+    for line in text.splitlines():
+        if line.startswith(f'{name}{{{want}') or (not labels and line.startswith(f'{name} ')):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def test_metrics_record_route_latency_db_time_and_rows():
+    eid = f'metrics-{uuid.uuid4().hex[:8]}'
+    for _ in range(3):
+        assert client.post('/risk/score', json={'entity_id': eid}).status_code == 200
+    r = client.get('/history/timeseries', params={'entity_id': eid, 'limit': 10})
+    assert len(r.json()) == 3
+    client.get(f'/no/such/{eid}')
+
+    r = client.get('/metrics')
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('text/plain; version=0.0.4')
+    text = r.text
+    # route templates, never raw paths, become labels
+    assert eid not in text
+    assert 'route="<unmatched>"' in text
+    ts = {'method': 'GET', 'route': '/history/timeseries'}
+    assert _sample(text, 'eris_http_request_duration_seconds_count', **ts) >= 1
+    assert _sample(text, 'eris_http_request_duration_seconds_bucket', **ts, le='+Inf') >= 1
+    assert _sample(text, 'eris_http_request_db_seconds_sum', **ts) > 0
+    assert _sample(text, 'eris_http_db_queries_total', **ts) >= 1
+    assert _sample(text, 'eris_http_rows_returned_total', **ts) >= 3
+    assert _sample(text, 'eris_http_requests_total', method='POST', route='/risk/score', status=200) >= 3
+    # the request scraping /metrics is itself in flight
+    assert _sample(text, 'eris_http_requests_in_flight') == 1
+
+    buckets = [
+        float(v) for v in re.findall(
+            r'eris_http_request_duration_seconds_bucket\{method="GET",route="/history/timeseries",le="[^"]+"\} (\S+)',
+            text,
+        )
+    ]
+    assert buckets == sorted(buckets)
+
+
+def test_slowest_queries_group_statements_and_name_the_route():
+    metrics.registry.reset()
+    client.post('/risk/latest', json={'entity_ids': [f'q-{i}' for i in range(5)]})
+    client.post('/risk/latest', json={'entity_ids': [f'q-{i}' for i in range(50)]})
+    slow = client.get('/metrics/queries', params={'limit': 1000}).json()
+    assert slow == sorted(slow, key=lambda q: q['max_ms'], reverse=True)
+    lookups = [q for q in slow if 'FROM latestscore' in q['statement']]
+    # IN lists of different lengths are one statement
+    assert len(lookups) == 1
+    assert '(?...)' in lookups[0]['statement']
+    assert lookups[0]['count'] >= 2
+    assert lookups[0]['max_route'] == '/risk/latest'
+
+
+def test_health_reports_pool_and_db_latency():
+    body = client.get('/health').json()
+    assert body['status'] == 'ok'
+    assert body['db']['ok'] is True
+    assert body['db']['latency_ms'] >= 0
+    assert 'class' in body['pool']
+
+
+def test_profiler_dumps_collapsed_stacks_for_slow_requests(tmp_path, monkeypatch):
+    prof = metrics.Profiler(interval_s=0.001, slow_s=0.05, out_dir=str(tmp_path))
+    monkeypatch.setattr(metrics, 'profiler', prof)
+
+    @app.get('/_test/slow')
+    async def slow():
+        def busy():
+            end = time.perf_counter() + 0.2
+            while time.perf_counter() < end:
+                pass
+        busy()
+        return {}
+
+    try:
+        assert client.get('/_test/slow').status_code == 200
+        assert client.get('/health').status_code == 200
+    finally:
+        app.router.routes.pop()
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and files[0].endswith('.folded')
+    assert '-GET-test_slow-' in files[0]
+    lines = (tmp_path / files[0]).read_text().splitlines()
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 10
+    # root first, down to the busy loop
+    assert stack.split(';')[-1].startswith('busy (test_metrics.py:')
+
+
+def test_failed_statements_are_counted_and_release_their_start_time():
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    engine = create_engine('sqlite://')
+    metrics.instrument_engine(engine)
+    errors = metrics.registry.query_errors_total
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM no_such_table'))
+        conn.execute(text('SELECT 1'))
+        assert conn.connection.info['eris_query_start'] == []
+    engine.dispose()
+    assert metrics.registry.query_errors_total == errors + 3
+    assert _sample(client.get('/metrics').text, 'eris_db_query_errors_total') >= 3
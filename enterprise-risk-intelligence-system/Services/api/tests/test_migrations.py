@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel
+
+from app import models  # noqa: F401
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+# what init_db created before migrations existed (the committed app/risk.db)
+BASELINE_DDL = """
+CREATE TABLE riskrequest (
+    id INTEGER NOT NULL, client_id VARCHAR NOT NULL, request_time DATETIME NOT NULL,
+    risk_factors JSON NOT NULL, score FLOAT NOT NULL, PRIMARY KEY (id)
+);
+CREATE INDEX ix_riskrequest_client_id ON riskrequest (client_id);
+CREATE TABLE riskhistory (
+    id INTEGER NOT NULL, client_id VARCHAR NOT NULL, timestamp DATETIME NOT NULL,
+    score FLOAT NOT NULL, risk_factors JSON, PRIMARY KEY (id)
+);
+CREATE INDEX ix_riskhistory_client_id ON riskhistory (client_id);
+CREATE TABLE riskrecord (
+    id INTEGER NOT NULL, entity_id VARCHAR NOT NULL, score FLOAT NOT NULL,
+    model VARCHAR, label VARCHAR, created_at DATETIME NOT NULL, PRIMARY KEY (id)
+);
+CREATE INDEX ix_riskrecord_score ON riskrecord (score);
+CREATE INDEX ix_riskrecord_entity_id ON riskrecord (entity_id);
+CREATE INDEX ix_riskrecord_created_at ON riskrecord (created_at);
+"""
+
+
+def _schema(db):
+    with sqlite3.connect(db) as conn:
+        return set(conn.execute("select type, name from sqlite_master where tbl_name != 'alembic_version'"))
+
+
+def _config(url):
+    cfg = Config(str(API_DIR / 'alembic.ini'))
+    cfg.set_main_option('script_location', str(API_DIR / 'migrations'))
+    cfg.set_main_option('sqlalchemy.url', url)
+    return cfg
+
+
+def test_migrations_build_the_schema_the_models_declare(tmp_path):
+    url = f'sqlite:///{tmp_path}/migrated.db'
+    command.upgrade(_config(url), 'head')
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), SQLModel.metadata)
+    finally:
+        engine.dispose()
+    assert diff == []
+
+    command.downgrade(_config(url), 'base')
+    with sqlite3.connect(tmp_path / 'migrated.db') as conn:
+        tables = {r[0] for r in conn.execute("select name from sqlite_master where type = 'table'")}
+    assert tables == {'alembic_version'}
+
+
+def test_startup_runs_no_ddl(tmp_path):
+    db = tmp_path / 'fresh.db'
+    env = dict(os.environ, ERIS_DATABASE_URL=f'sqlite:///{db}')
+    env.pop('ERIS_INIT_DB', None)
+    code = (
+        'from fastapi.testclient import TestClient\n'
+        'from app.main import app\n'
+        'with TestClient(app) as c:\n'
+        '    assert c.get("/health").status_code == 200\n'
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=API_DIR, env=env, check=True)
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("select count(*) from sqlite_master").fetchone()[0] == 0
+
+
+def test_baseline_revision_matches_pre_migration_databases(tmp_path):
+    command.upgrade(_config(f'sqlite:///{tmp_path}/migrated.db'), '0001')
+    with sqlite3.connect(tmp_path / 'baseline.db') as conn:
+        conn.executescript(BASELINE_DDL)
+    assert _schema(tmp_path / 'migrated.db') == _schema(tmp_path / 'baseline.db')
+
+
+def test_stamped_baseline_database_upgrades_to_head(tmp_path):
+    db = tmp_path / 'baseline.db'
+    with sqlite3.connect(db) as conn:
+        conn.executescript(BASELINE_DDL)
+        conn.execute("insert into riskrecord (entity_id, score, created_at) values ('old', 10, '2024-01-01 00:00:00')")
+    url = f'sqlite:///{db}'
+    command.stamp(_config(url), '0001')
+    command.upgrade(_config(url), 'head')
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), SQLModel.metadata)
+    finally:
+        engine.dispose()
+    assert diff == []
+
+    env = dict(os.environ, ERIS_DATABASE_URL=url)
+    env.pop('ERIS_INIT_DB', None)
+    code = (
+        'from fastapi.testclient import TestClient\n'
+        'from app.main import app\n'
+        'with TestClient(app) as c:\n'
+        '    assert c.post("/risk/score", json={"entity_id": "new"}).status_code == 200\n'
+        '    days = c.get("/history/aggregate/day").json()\n'
+        '    assert [d["n"] for d in days] == [1], days\n'
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=API_DIR, env=env, check=True)
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import time
+import uuid
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import downsample as ds
+from app import offload, scoring
+from app.config import Settings
+from app.database import init_db
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+@pytest.fixture(scope='module')
+def pool():
+    asyncio.run(offload.start_pool(Settings(offload_workers=1, offload_min_rows=100)))
+    yield offload.pool
+    asyncio.run(offload.stop_pool())
+
+
+def _shm_blocks():
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+
+def test_offloaded_results_match_inline(pool):
+    rng = np.random.default_rng(0)
+    factors = rng.uniform(0, 100, (50_000, len(scoring.FACTORS)))
+    factors[::7, 1] = np.nan
+    x = np.cumsum(rng.integers(1, 1000, 20_000)).astype(np.int64)
+    y = rng.normal(50, 10, 20_000)
+    before = _shm_blocks()
+
+    async def run():
+        scores = await offload.score('v1', factors)
+        sampled = {m: await offload.downsample(x, y, 300, m) for m in ('lttb', 'minmax', 'avg')}
+        return scores, sampled
+
+    scores, sampled = asyncio.run(run())
+    np.testing.assert_array_equal(scores, scoring.get_model('v1').score(factors))
+    idx = ds.lttb(x, y, 300)
+    np.testing.assert_array_equal(sampled['lttb'][0], x[idx])
+    np.testing.assert_array_equal(sampled['lttb'][1], y[idx])
+    np.testing.assert_array_equal(sampled['minmax'][0], x[ds.minmax(x, y, 300)])
+    np.testing.assert_array_equal(sampled['avg'][1], ds.average(x, y, 300)[1])
+    # every shared memory block was unlinked
+    assert _shm_blocks() <= before
+    assert pool.stats()['offloaded_batches'] >= 4
+
+
+def test_small_batches_stay_inline(pool):
+    inline = pool.inline
+    scores = asyncio.run(offload.score('v1', np.full((10, len(scoring.FACTORS)), 50.0)))
+    assert scores.tolist() == [50.0] * 10
+    assert pool.inline == inline + 1
+
+
+def test_event_loop_keeps_running_while_a_batch_scores(pool):
+    factors = np.random.default_rng(1).uniform(0, 100, (3_000_000, len(scoring.FACTORS)))
+
+    async def longest_stall(work):
+        gaps, done = [], False
+
+        async def ticker():
+            last = time.perf_counter()
+            while not done:
+                await asyncio.sleep(0.001)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0.01)
+        await work()
+        done = True
+        await task
+        return max(gaps)
+
+    async def inline():
+        scoring.get_model('v1').score(factors)
+
+    async def offloaded():
+        await offload.score('v1', factors)
+
+    inline_stall = asyncio.run(longest_stall(inline))
+    offloaded_stall = asyncio.run(longest_stall(offloaded))
+    assert offloaded_stall < inline_stall, (inline_stall, offloaded_stall)
+
+
+def test_batch_endpoint_uses_the_pool(pool):
+    eid = f'offload-{uuid.uuid4().hex[:8]}'
+    offloaded = pool.offloaded
+    payloads = [{'entity_id': f'{eid}-{i}', 'risk_factors': {'market_volatility': i % 100}} for i in range(500)]
+    r = client.post('/risk/score/batch', json=payloads)
+    assert r.status_code == 200
+    lines = r.text.splitlines()
+    assert len(lines) == 500
+    assert client.get('/risk/offload/stats').json()['offloaded_batches'] == offloaded + 1
@@ -0,0 +1,95 @@
+import itertools
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import SQLModel, create_engine
+
+from app import models  # noqa: F401
+from app.routers.history import (
+    aggregate_query,
+    encode_cursor,
+    factor_aggregate_query,
+    timeseries_query,
+)
+
+# "SCAN riskrecord" without "USING ... INDEX" means SQLite reads every row
+FULL_SCAN = re.compile(r'SCAN (TABLE )?riskrecord(?! USING)')
+
+EQUALITY_FILTERS = {'entity_id': 'ent-1', 'label': 'watch', 'model': 'v1'}
+RANGE_FILTERS = {
+    'window': {'start': datetime(2024, 1, 1), 'end': datetime(2024, 2, 1)},
+    'score': {'min_score': 10.0, 'max_score': 90.0},
+    'cursor': {'cursor': encode_cursor(datetime(2024, 1, 1), 42)},
+}
+
+
+def _combinations():
+    for n_eq in range(len(EQUALITY_FILTERS) + 1):
+        for eq in itertools.combinations(EQUALITY_FILTERS, n_eq):
+            for n_rng in range(len(RANGE_FILTERS) + 1):
+                for rng in itertools.combinations(RANGE_FILTERS, n_rng):
+                    params = {k: EQUALITY_FILTERS[k] for k in eq}
+                    for k in rng:
+                        params.update(RANGE_FILTERS[k])
+                    yield pytest.param(params, id='+'.join(eq + rng) or 'unfiltered')
+
+
+@pytest.fixture(scope='module')
+def engine():
+    engine = create_engine('sqlite://')
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _plan(engine, sql, params=None):
+    with engine.connect() as conn:
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params or {}).all()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize('params', list(_combinations()))
+def test_timeseries_never_scans_table(engine, params):
+    stmt = timeseries_query(**params)
+    sql = str(stmt.compile(engine, compile_kwargs={'literal_binds': True}))
+    plan = _plan(engine, sql)
+    assert not any(FULL_SCAN.search(step) for step in plan), plan
+    if EQUALITY_FILTERS.keys() & params.keys():
+        # an equality filter must seek into its (column, created_at) index, not walk
+        # the whole created_at index and filter row by row
+        assert any(step.startswith('SEARCH riskrecord') for step in plan), plan
+
+
+def test_timeseries_by_entity_needs_no_sort(engine):
+    stmt = timeseries_query(entity_id='ent-1', start=datetime(2024, 1, 1))
+    sql = str(stmt.compile(engine, compile_kwargs={'literal_binds': True}))
+    plan = _plan(engine, sql)
+    assert any('ix_riskrecord_entity_time' in step for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+
+@pytest.mark.parametrize('period,month', [('day', False), ('week', False), ('day', True)])
+def test_aggregate_by_entity_reads_rollups_by_key(engine, period, month):
+    stmt = aggregate_query(period, 'ent-1', month)
+    sql = str(stmt.compile(engine, compile_kwargs={'literal_binds': True}))
+    plan = _plan(engine, sql)
+    assert not any('riskrecord' in step for step in plan), plan
+    assert any(step.startswith('SEARCH riskrollup') for step in plan), plan
+
+
+@pytest.mark.parametrize('params', [{}, {'entity_id': 'ent-1'}, {'start': datetime(2024, 1, 1)}])
+def test_factor_range_seeks_factor_index(engine, params):
+    stmt = timeseries_query(factor='market_volatility', factor_min=70.0, factor_max=90.0, **params)
+    sql = str(stmt.compile(engine, compile_kwargs={'literal_binds': True}))
+    plan = _plan(engine, sql)
+    assert not any(FULL_SCAN.search(step) for step in plan), plan
+    assert any('ix_riskfactorvalue_factor_value' in step for step in plan), plan
+
+
+def test_factor_aggregate_reads_values_from_index(engine):
+    sql = str(factor_aggregate_query().compile(engine, compile_kwargs={'literal_binds': True}))
+    plan = _plan(engine, sql)
+    assert not any('riskrecord' in step for step in plan), plan
+    assert any('COVERING INDEX ix_riskfactorvalue_factor_value' in step for step in plan), plan
@@ -0,0 +1,71 @@
+import json
+import statistics
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import rollups
+from app.database import init_db
+from app.main import app
+from app.models import RiskRecord, RiskRollup
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def test_aggregates_follow_writes():
+    eid = f'rollup-{uuid.uuid4().hex[:8]}'
+    scores = [client.post('/risk/score', json={'entity_id': eid}).json()['score'] for _ in range(3)]
+    r = client.post('/risk/score/batch', json=[{'entity_id': eid}] * 4)
+    scores += [json.loads(line)['score'] for line in r.text.splitlines()]
+
+    day = client.get('/history/aggregate/day', params={'entity_id': eid}).json()
+    assert len(day) == 1
+    assert day[0]['n'] == 7
+    assert day[0]['avg_score'] == pytest.approx(statistics.fmean(scores))
+    assert day[0]['min_score'] == pytest.approx(min(scores))
+    assert day[0]['max_score'] == pytest.approx(max(scores))
+    assert day[0]['std_score'] == pytest.approx(statistics.pstdev(scores), abs=1e-6)
+
+    week = client.get('/history/aggregate/week', params={'entity_id': eid}).json()
+    assert [w['n'] for w in week] == [7]
+    month = client.get('/history/aggregate/month', params={'entity_id': eid}).json()
+    assert [m['n'] for m in month] == [7]
+    assert month[0]['month'] == day[0]['day'][:7]
+
+
+def test_bucket_start_weeks_begin_on_monday():
+    # 2024-01-07 is a Sunday, 2024-01-08 a Monday
+    assert rollups.bucket_start('week', datetime(2024, 1, 7, 23)) == '2024-01-01'
+    assert rollups.bucket_start('week', datetime(2024, 1, 8, 0)) == '2024-01-08'
+    assert rollups.bucket_start('day', datetime(2024, 1, 7, 23)) == '2024-01-07'
+
+
+def test_rebuild_matches_incremental_updates():
+    engine = create_engine('sqlite://')
+    SQLModel.metadata.create_all(engine)
+    base = datetime(2024, 1, 1)
+    rows = [
+        {'entity_id': f'e{i % 3}', 'score': float(i % 17), 'created_at': base + timedelta(hours=7 * i)}
+        for i in range(200)
+    ]
+    with Session(engine) as session:
+        session.execute(insert(RiskRecord), rows)
+        for i in range(0, len(rows), 15):
+            rollups.apply(session, rows[i:i + 15])
+        session.commit()
+        incremental = sorted(session.exec(select(RiskRollup)).all(), key=lambda r: (r.period, r.entity_id, r.bucket))
+        incremental = [r.model_dump() for r in incremental]
+
+        assert rollups.rebuild(session) == len(rows)
+        rebuilt = sorted(session.exec(select(RiskRollup)).all(), key=lambda r: (r.period, r.entity_id, r.bucket))
+        assert [r.model_dump() for r in rebuilt] == pytest.approx(incremental)
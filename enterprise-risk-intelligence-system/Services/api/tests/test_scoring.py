@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import scoring
+from app.database import init_db
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def test_v1_scores_safe_and_risky_entities():
+    model = scoring.get_model('v1')
+    x = scoring.factor_matrix([
+        {'financial_health': 100, 'market_volatility': 0, 'compliance_score': 100, 'operational_risk': 0},
+        {'financial_health': 0, 'market_volatility': 100, 'compliance_score': 0, 'operational_risk': 100},
+        {},
+    ])
+    assert model.score(x).tolist() == pytest.approx([0.0, 100.0, 50.0])
+
+
+def test_batch_and_single_rows_score_identically():
+    rng = np.random.default_rng(7)
+    x = rng.uniform(0, 100, size=(1000, len(scoring.FACTORS)))
+    model = scoring.get_model('v1')
+    batch = model.score(x)
+    assert batch.shape == (1000,)
+    assert ((batch >= 0) & (batch <= 100)).all()
+    assert [model.score(x[i:i + 1])[0] for i in range(0, 1000, 97)] == pytest.approx(batch[::97].tolist())
+
+
+def test_models_are_cached():
+    assert scoring.get_model('v1') is scoring.get_model('v1')
+
+
+def test_unknown_model_and_bad_factors_are_rejected():
+    r = client.post('/risk/score', json={'entity_id': 'scoring-test', 'model': 'nope'})
+    assert r.status_code == 400
+    r = client.post('/risk/score', json={'entity_id': 'scoring-test', 'risk_factors': {'financial_health': 'high'}})
+    assert r.status_code == 400
+
+
+def test_endpoint_uses_registered_model():
+    factors = {'financial_health': 80, 'market_volatility': 20, 'compliance_score': 70, 'operational_risk': 40}
+    r = client.post('/risk/score', json={'entity_id': 'scoring-test', 'risk_factors': factors})
+    expected = scoring.get_model('v1').score(scoring.factor_matrix([factors]))[0]
+    assert r.json()['score'] == pytest.approx(expected)
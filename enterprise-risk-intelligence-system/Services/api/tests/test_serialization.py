@@ -0,0 +1,41 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import init_db
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def test_timeseries_rows_keep_their_wire_format():
+    eid = f'ser-{uuid.uuid4().hex[:8]}'
+    client.post('/risk/score', json={'entity_id': eid, 'label': 'watch', 'risk_factors': {'market_volatility': 33}})
+    scored = client.post('/risk/score', json={'client_id': eid}).json()
+    assert scored['client_id'] == eid
+    datetime.fromisoformat(scored['created_at'])
+
+    r = client.get('/history/timeseries', params={'entity_id': eid})
+    assert r.headers['content-type'] == 'application/json'
+    rows = r.json()
+    assert list(rows[0]) == ['id', 'entity_id', 'score', 'model', 'label', 'created_at']
+    assert rows[0]['label'] == 'watch' and rows[0]['model'] == 'v1'
+    assert rows[1]['created_at'] == scored['created_at']
+
+
+def test_score_request_is_typed():
+    r = client.post('/risk/score', json={'entity_id': ['not', 'a', 'string']})
+    assert r.status_code == 422
+    no_client_id = client.post('/risk/score', json={'entity_id': f'ser-{uuid.uuid4().hex[:8]}'}).json()
+    assert 'client_id' not in no_client_id
+
+    schemas = client.get('/openapi.json').json()['components']['schemas']
+    assert {'ScoreRequest', 'ScoreResponse', 'RiskRecordOut', 'LatestRequest'} <= schemas.keys()
@@ -1,7 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
-from app.main import app
+
 from app.database import init_db
+from app.main import app
 
 client = TestClient(app)
 
@@ -14,7 +15,7 @@ def test_health_and_risk_score():
     # Health
     r = client.get('/health')
     assert r.status_code == 200
-    assert r.json() == {'status': 'ok'}
+    assert r.json()['status'] == 'ok'
 
     # Risk score
     payload = {
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import pubsub
+from app.database import init_db
+from app.main import app
+from app.routers.risk import sse_events
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def _row(eid, model='v1', label=None):
+    return {'entity_id': eid, 'score': 42.0, 'model': model, 'label': label, 'created_at': datetime(2024, 1, 1)}
+
+
+def test_websocket_stream_filters_by_entity_and_model():
+    eid = f'stream-{uuid.uuid4().hex[:8]}'
+    with TestClient(app) as c:
+        with c.websocket_connect(f'/risk/stream/ws?entity_id={eid}') as ws, \
+                c.websocket_connect(f'/risk/stream/ws?label=stream-{eid}') as by_label:
+            c.post('/risk/score', json={'entity_id': f'other-{eid}', 'label': f'stream-{eid}'})
+            c.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'market_volatility': 70}})
+            event = ws.receive_json()
+            assert event['entity_id'] == eid
+            assert set(event) == {'entity_id', 'score', 'model', 'label', 'created_at'}
+            assert by_label.receive_json()['entity_id'] == f'other-{eid}'
+        assert c.get('/risk/stream/stats').json()['subscribers'] == 0
+
+
+def test_sse_events_keepalive_and_slow_subscriber_drop():
+    async def scenario():
+        broker = pubsub.Broker(buffer=2)
+        sub = broker.subscribe(model='v2')
+        events = sse_events(sub, keepalive_s=0.01)
+        assert await events.__anext__() == ': connected\n\n'
+        assert await events.__anext__() == ': keepalive\n\n'
+
+        broker.publish([_row('a'), _row('b', model='v2')])
+        chunk = await events.__anext__()
+        assert chunk.startswith('data: ') and chunk.endswith('\n\n')
+        assert json.loads(chunk[6:])['entity_id'] == 'b'
+
+        # a subscriber that stops reading is dropped once its buffer is full
+        for _ in range(3):
+            broker.publish([_row('c', model='v2')])
+        assert broker.subscribers == 0
+        assert broker.stats()['dropped_subscribers'] == 1
+        assert (await events.__anext__()).startswith('event: dropped')
+        with pytest.raises(StopAsyncIteration):
+            await events.__anext__()
+
+    asyncio.run(scenario())
+
+
+def test_thousand_subscribers_add_negligible_scoring_latency():
+    eid = f'stream-{uuid.uuid4().hex[:8]}'
+
+    def score_latency(c, n=40):
+        samples = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            assert c.post('/risk/score', json={'entity_id': eid}).status_code == 200
+            samples.append(time.perf_counter() - t0)
+        return statistics.median(samples)
+
+    with TestClient(app) as c:
+        score_latency(c, 5)  # warm-up
+        baseline = score_latency(c)
+        subs = [pubsub.broker.subscribe() for _ in range(500)]
+        subs += [pubsub.broker.subscribe(entity_id=f'{eid}-{i % 2}' if i % 2 else eid) for i in range(500)]
+        try:
+            loaded = score_latency(c)
+            delivered = [s.pending for s in subs]
+        finally:
+            for s in subs:
+                s.close()
+    # unfiltered and matching subscribers got every record, the others nothing
+    assert delivered.count(40) == 750
+    assert delivered.count(0) == 250
+    assert loaded < baseline * 1.5 + 0.005, (baseline, loaded)
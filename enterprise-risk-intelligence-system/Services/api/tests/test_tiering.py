@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import cache, rollups, tiering
+from app.database import get_session
+from app.main import app
+from app.models import RiskRecord
+
+pa = pytest.importorskip('pyarrow')
+
+BASE = datetime(2024, 1, 1)
+CUTOFF = datetime(2024, 3, 1)
+
+
+@pytest.fixture
+def tiered(monkeypatch):
+    tmp_dir = tempfile.mkdtemp()
+    db_file = os.path.join(tmp_dir, 'tiering.db')
+    engine = create_engine(f'sqlite:///{db_file}')
+    SQLModel.metadata.create_all(engine)
+    # 90 days of records for three entities, two sharing each timestamp
+    rows = [
+        {
+            'entity_id': f'tier-{i % 3}',
+            'score': float(i % 97),
+            'model': 'v1',
+            'label': 'odd' if i % 2 else None,
+            'created_at': BASE + timedelta(hours=(i // 2) * 3),
+        }
+        for i in range(1440)
+    ]
+    with Session(engine) as session:
+        session.exec(RiskRecord.__table__.insert(), params=rows)
+        rollups.apply(session, rows)
+        session.commit()
+
+    monkeypatch.setattr(cache, 'response_cache', None)
+    tier = tiering.ColdTier(os.path.join(tmp_dir, 'cold'))
+    async_engine = create_async_engine(f'sqlite+aiosqlite:///{db_file}')
+
+    async def get_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    with TestClient(app) as c:
+        yield c, engine, tier, monkeypatch
+    app.dependency_overrides.clear()
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+    shutil.rmtree(tmp_dir)
+
+
+def _snapshot(c):
+    """Every read path whose answer must not change when records move tiers."""
+    pages, cursor = [], None
+    while True:
+        params = {'limit': 250, **({'cursor': cursor} if cursor else {})}
+        r = c.get('/history/timeseries', params=params)
+        pages.extend(r.json())
+        cursor = r.headers.get('x-next-cursor')
+        if not cursor:
+            break
+    return {
+        'cursor_pages': pages,
+        'offset_page': c.get('/history/timeseries', params={'limit': 100, 'offset': 820}).json(),
+        'filtered': c.get(
+            '/history/timeseries',
+            params={'entity_id': 'tier-1', 'label': 'odd', 'min_score': 40, 'limit': 5000},
+        ).json(),
+        'range': c.get(
+            '/history/timeseries',
+            params={'start': '2024-02-20T00:00:00', 'end': '2024-03-05T00:00:00', 'limit': 5000},
+        ).json(),
+        'export': [json.loads(line) for line in c.get('/history/export').text.splitlines()],
+        'points': c.get('/history/timeseries', params={'entity_id': 'tier-2', 'points': 50}).json(),
+        'compare': c.get(
+            '/history/timeseries', params={'entity_id': ['tier-0', 'tier-2'], 'limit': 5000}
+        ).json(),
+        'compare_points': c.get(
+            '/history/timeseries', params={'entity_id': ['tier-0', 'tier-2'], 'points': 50}
+        ).json(),
+        'arrow': pa.ipc.open_stream(
+            c.get('/history/timeseries', params={'entity_id': 'tier-1', 'limit': 5000, 'format': 'arrow'}).content
+        ).read_all().to_pylist(),
+        'month': c.get('/history/aggregate/month').json(),
+    }
+
+
+def test_archive_is_transparent_to_reads(tiered):
+    c, engine, tier, monkeypatch = tiered
+    before = _snapshot(c)
+    assert len(before['cursor_pages']) == 1440
+    assert len(before['compare']) == 960
+    assert len(before['arrow']) == 480
+
+    with Session(engine) as session:
+        moved = tier.archive(session, CUTOFF)
+        hot = session.exec(select(func.count()).select_from(RiskRecord)).one()
+    assert moved == 960
+    assert hot == 480
+    assert tier.watermark == CUTOFF
+    # re-running with the same cutoff is a no-op
+    with Session(engine) as session:
+        assert tier.archive(session, CUTOFF) == 0
+
+    monkeypatch.setattr(tiering, 'cold_tier', tier)
+    assert _snapshot(c) == before
+
+
+def test_scan_prunes_months_and_rebuild_covers_cold_rows(tiered):
+    c, engine, tier, monkeypatch = tiered
+    before = c.get('/history/aggregate/week').json()
+    with Session(engine) as session:
+        tier.archive(session, CUTOFF)
+    monkeypatch.setattr(tiering, 'cold_tier', tier)
+
+    feb = list(tier.scan(('entity_id', 'created_at'), start=datetime(2024, 2, 1), end=datetime(2024, 2, 29)))
+    assert len(feb) == 1
+    assert {d.month for d in feb[0].column('created_at').to_pylist()} == {2}
+    one = list(tier.scan(('entity_id',), entity_id='tier-0'))
+    assert {e for t in one for e in t.column('entity_id').to_pylist()} == {'tier-0'}
+
+    with Session(engine) as session:
+        assert rollups.rebuild(session) == 1440
+    assert c.get('/history/aggregate/week').json() == before
@@ -0,0 +1,143 @@
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import trends
+from app.config import get_settings
+from app.database import engine, init_db
+from app.main import app
+from app.models import EntityTrend
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init_db()
+    yield
+
+
+def _trend(eid):
+    r = client.get('/history/trends', params={'entity_id': eid})
+    assert r.status_code == 200
+    return r.json()[0]
+
+
+def test_ingest_updates_trend_and_flags_spike():
+    eid = f'trend-{uuid.uuid4().hex[:8]}'
+    for i in range(10):
+        client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'market_volatility': 50 + 2 * (i % 2)}})
+    calm = _trend(eid)
+    assert calm['n'] == 10
+    assert calm['anomaly'] is False
+    assert calm['last_anomaly_at'] is None
+
+    client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'market_volatility': 100}})
+    spike = _trend(eid)
+    assert spike['n'] == 11
+    assert spike['anomaly'] is True
+    assert spike['zscore'] > get_settings().trend_z_threshold
+    assert spike['slope'] > 0
+    assert spike['last_anomaly_at'] == spike['last_at']
+    assert spike['ewma'] == pytest.approx(0.2 * spike['last_score'] + 0.8 * calm['ewma'])
+
+    flagged = client.get('/history/trends', params={'anomalous': 'true', 'limit': 10_000}).json()
+    assert eid in {t['entity_id'] for t in flagged}
+
+
+def test_trends_for_many_entities():
+    prefix = f'trend-{uuid.uuid4().hex[:8]}'
+    ids = [f'{prefix}-{i}' for i in range(30)]
+    client.post('/risk/score/batch', json=[{'entity_id': e} for e in ids] * 3)
+    r = client.get('/history/trends', params=[('entity_id', e) for e in ids])
+    body = r.json()
+    assert [t['entity_id'] for t in body] == sorted(ids)
+    assert {t['n'] for t in body} == {3}
+    assert client.get('/history/trends', params=[('entity_id', 'x')] * 2 + [('limit', 0)]).json() == []
+
+
+def test_trends_return_every_requested_entity_past_the_list_limit():
+    prefix = f'trend-{uuid.uuid4().hex[:8]}'
+    ids = [f'{prefix}-{i:04d}' for i in range(1500)]
+    client.post('/risk/score/batch', json=[{'entity_id': e} for e in ids])
+    body = client.get('/history/trends', params=[('entity_id', e) for e in ids]).json()
+    assert [t['entity_id'] for t in body] == ids
+    # listing mode still pages
+    assert len(client.get('/history/trends').json()) <= 1000
+
+
+def _replay(entities, stamps, scores):
+    settings = get_settings()
+    states = {}
+    for eid, ts, sc in sorted(zip(entities, stamps.tolist(), scores.tolist(), strict=True), key=lambda r: (r[0], r[1])):
+        state = states.get(eid) or {'entity_id': eid, 'n': 0, 'window': [], 'ewma': 0.0, 'last_anomaly_at': None}
+        states[eid] = trends._step(state, sc, ts, settings)
+    return states
+
+
+def test_vectorized_rebuild_matches_incremental_replay():
+    rng = np.random.default_rng(7)
+    n = 3000
+    entities = [f'e{i}' for i in rng.integers(0, 12, n)]
+    stamps = (np.datetime64('2024-01-01T00:00:00', 'us') + np.arange(n) * np.timedelta64(1, 'm'))
+    scores = rng.normal(50, 5, n)
+    scores[rng.integers(0, n, 15)] += 60  # spikes
+    entities += ['flat'] * 30 + ['single']
+    stamps = np.concatenate([stamps, stamps[:30], stamps[:1]])
+    scores = np.concatenate([scores, np.full(30, 42.0), [10.0]])
+
+    expected = _replay(entities, stamps, scores)
+    got = {s['entity_id']: s for s in trends.compute(entities, stamps, scores, get_settings())}
+    assert got.keys() == expected.keys()
+    assert any(s['last_anomaly_at'] for s in expected.values())
+    for eid, exp in expected.items():
+        g = got[eid]
+        for key in ('n', 'last_at', 'anomaly', 'last_anomaly_at'):
+            assert g[key] == exp[key], (eid, key)
+        for key in ('last_score', 'ewma', 'mean', 'std', 'slope', 'zscore'):
+            assert g[key] == pytest.approx(exp[key], abs=1e-9), (eid, key)
+        assert g['window'] == pytest.approx(exp['window'])
+
+
+def test_apply_across_batches_matches_single_batch():
+    mem = create_engine('sqlite://')
+    SQLModel.metadata.create_all(mem)
+    base = datetime(2024, 1, 1)
+    records = [
+        {'entity_id': f'e{i % 3}', 'score': float((i * 37) % 100), 'created_at': base + timedelta(minutes=i)}
+        for i in range(90)
+    ]
+    with Session(mem) as session:
+        for i in range(0, 90, 7):
+            trends.apply(session, records[i : i + 7])
+        session.commit()
+        incremental = {t.entity_id: t.model_dump() for t in session.exec(select(EntityTrend)).all()}
+    stamps = np.array([r['created_at'] for r in records], dtype='datetime64[us]')
+    scores = np.array([r['score'] for r in records])
+    batch = trends.compute([r['entity_id'] for r in records], stamps, scores, get_settings())
+    for state in batch:
+        inc = incremental[state['entity_id']]
+        assert inc['n'] == state['n']
+        assert inc['ewma'] == pytest.approx(state['ewma'])
+        assert inc['slope'] == pytest.approx(state['slope'])
+    mem.dispose()
+
+
+def test_rebuild_command_reproduces_ingest_state():
+    eid = f'trend-{uuid.uuid4().hex[:8]}'
+    for v in (10, 80, 30, 55, 20, 90, 40):
+        client.post('/risk/score', json={'entity_id': eid, 'risk_factors': {'market_volatility': v}})
+    before = _trend(eid)
+    with Session(engine) as session:
+        assert trends.rebuild(session) > 0
+    after = _trend(eid)
+    assert after.keys() == before.keys()
+    for key, value in before.items():
+        if isinstance(value, float):
+            assert after[key] == pytest.approx(value, abs=1e-9), key
+        else:
+            assert after[key] == value, key
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+from app import database
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_engines_are_created_lazily_per_process(monkeypatch):
+    first = database.get_engine()
+    assert database.get_engine() is first
+    # the legacy module attribute resolves to the same per-process engine
+    assert database.engine is first
+
+    # a forked worker sees a new pid and must not reuse the parent's pool
+    parent_pid = os.getpid()
+    monkeypatch.setattr(database.os, 'getpid', lambda: parent_pid + 1)
+    child = database.get_engine()
+    assert child is not first
+    assert all(pid == parent_pid + 1 for _, pid in database._engines)
+    child.dispose()
+
+
+def test_concurrent_workers_initialize_the_schema_once(tmp_path):
+    db = tmp_path / 'workers.db'
+    env = dict(os.environ, ERIS_DATABASE_URL=f'sqlite:///{db}', ERIS_INIT_DB='1')
+    code = 'from app.database import init_db_once; init_db_once()'
+    procs = [
+        subprocess.Popen([sys.executable, '-c', code], cwd=API_DIR, env=env, stderr=subprocess.PIPE)
+        for _ in range(4)
+    ]
+    for p in procs:
+        _, err = p.communicate(timeout=60)
+        assert p.returncode == 0, err.decode()
+    with sqlite3.connect(db) as conn:
+        tables = {r[0] for r in conn.execute("select name from sqlite_master where type = 'table'")}
+    assert {'riskrecord', 'riskrollup', 'latestscore', 'entitytrend'} <= tables
+
+
+def test_init_db_can_be_left_to_a_deploy_step(tmp_path):
+    db = tmp_path / 'skip.db'
+    env = dict(os.environ, ERIS_DATABASE_URL=f'sqlite:///{db}', ERIS_INIT_DB='0')
+    code = 'from app.database import init_db_once; init_db_once()'
+    subprocess.run([sys.executable, '-c', code], cwd=API_DIR, env=env, check=True)
+    assert not db.exists()
+    out = subprocess.run(
+        [sys.executable, '-m', 'app.database', 'init'], cwd=API_DIR, env=env,
+        check=True, capture_output=True, text=True,
+    )
+    assert 'initialized' in out.stdout
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("select count(*) from sqlite_master where name = 'riskrecord'").fetchone()[0] == 1
@@ -0,0 +1,138 @@
+"""Dashboard access to the ERIS API.
+
+Every call goes through one pooled ``requests.Session``, so reruns reuse open
+keep-alive connections instead of connecting per widget interaction. History
+is fetched as an Arrow IPC stream and decoded straight into pandas; the raw
+bodies are cached per query for 30 seconds, so reruns caused by other widgets
+neither refetch nor re-parse JSON. An API without pyarrow answers Arrow requests
+with 501, and history is then fetched as JSON instead.
+
+Score submissions carry an ``Idempotency-Key``, so retrying one after a timeout
+returns the first result instead of writing a second record.
+"""
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Optional, Sequence
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+# Configurable API URL (can be overridden with ERIS_API_URL env var)
+API_URL = os.getenv("ERIS_API_URL", "http://localhost:8000")
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+# the API answers 501 without pyarrow; 406 is the usual "format not acceptable"
+NO_ARROW = (406, 501)
+
+
+@st.cache_resource
+def session() -> requests.Session:
+    """The process-wide session; Streamlit keeps it across reruns and sessions."""
+    s = requests.Session()
+    # scripts for several browser sessions run on their own threads
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+@st.cache_data(ttl=30)
+def health(timeout: int = 3):
+    """Check backend /health endpoint and return a small status dict.
+
+    Cached for 30 seconds to avoid spamming the backend from the UI.
+    """
+    try:
+        r = session().get(f"{API_URL}/health", timeout=timeout)
+        r.raise_for_status()
+        data = r.json() if r.headers.get("content-type", "").startswith("application/json") else {}
+        return {"ok": True, "status_code": r.status_code, "data": data}
+    except RequestException as exc:
+        return {"ok": False, "error": str(exc)}
+
+
+def score(payload: dict, timeout: int = 5, retries: int = 2):
+    """POST to backend /risk/score and return parsed JSON or an error dict.
+
+    Timeouts and dropped connections are retried under the same idempotency key,
+    so the submission is scored and stored at most once.
+    """
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    for attempt in range(retries + 1):
+        try:
+            r = session().post(f"{API_URL}/risk/score", json=payload, headers=headers, timeout=timeout)
+            r.raise_for_status()
+            return r.json()
+        except (requests.Timeout, requests.ConnectionError) as exc:
+            if attempt == retries:
+                return {"error": str(exc)}
+        except RequestException as exc:
+            return {"error": str(exc)}
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _fetch(path: str, params: tuple, timeout: float) -> bytes:
+    # failed requests raise, so errors are never cached
+    r = session().get(f"{API_URL}{path}", params=list(params), timeout=timeout)
+    r.raise_for_status()
+    return r.content
+
+
+def _decode(body: bytes):
+    import pyarrow as pa
+
+    # the table's buffers point into ``body``, and split_blocks hands numeric
+    # columns to pandas as views instead of consolidating them into copies
+    table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def _decode_json(body: bytes, entity_ids: Sequence[str]):
+    import pandas as pd
+
+    frame = pd.DataFrame(json.loads(body))
+    if frame.empty:
+        return pd.DataFrame(columns=["entity_id", "created_at", "score"])
+    if "entity_id" not in frame:
+        # single-entity points are not tagged with their entity
+        frame.insert(0, "entity_id", entity_ids[0])
+    frame["created_at"] = pd.to_datetime(frame["created_at"])
+    return frame
+
+
+def timeseries(
+    entity_ids: Sequence[str],
+    points: Optional[int] = 500,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    timeout: int = 10,
+):
+    """Score history of ``entity_ids`` as ``{"ok": True, "frame": DataFrame}``.
+
+    All entities come back from one request. With ``points`` each entity is
+    downsampled to that many ``(entity_id, created_at, score)`` rows; without
+    it the first 5000 records are returned with every column.
+    """
+    params = [("entity_id", e) for e in entity_ids]
+    if points:
+        params.append(("points", points))
+    else:
+        params.append(("limit", 5000))
+    if start:
+        params.append(("start", start.isoformat()))
+    if end:
+        params.append(("end", end.isoformat()))
+    try:
+        try:
+            body = _fetch("/history/timeseries", tuple(params + [("format", "arrow")]), timeout)
+            return {"ok": True, "frame": _decode(body)}
+        except requests.HTTPError as exc:
+            if exc.response is None or exc.response.status_code not in NO_ARROW:
+                raise
+        body = _fetch("/history/timeseries", tuple(params), timeout)
+    except RequestException as exc:
+        return {"ok": False, "error": str(exc)}
+    return {"ok": True, "frame": _decode_json(body, entity_ids)}
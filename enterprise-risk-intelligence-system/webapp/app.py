@@ -1,13 +1,13 @@
 import streamlit as st
-import plotly.express as px
-import pandas as pd
-import requests
-import json
 from datetime import datetime, timedelta
 import os
-from requests.exceptions import RequestException
 from pathlib import Path
 
+import api_client
+
+# plotly and pandas take most of the script's import time, so each page imports
+# them only once it actually draws a chart
+
 st.set_page_config(
     page_title="ERIS Dashboard",
     page_icon="🎯",
@@ -15,8 +15,6 @@ st.set_page_config(
 )
 
 st.title("Enterprise Risk Intelligence System")
-# Configurable API URL (can be overridden with ERIS_API_URL env var)
-API_URL = os.getenv("ERIS_API_URL", "http://localhost:8000")
 
 # Simple navigation
 PAGES = ["Dashboard", "Historical Risk Scores"]
@@ -28,33 +26,8 @@ if repo_url:
     st.sidebar.markdown(f"[Repository]({repo_url})")
 
 
-@st.cache_data(ttl=30)
-def check_api_health(timeout: int = 3):
-    """Check backend /health endpoint and return a small status dict.
-
-    Cached for 30 seconds to avoid spamming the backend from the UI.
-    """
-    try:
-        r = requests.get(f"{API_URL}/health", timeout=timeout)
-        r.raise_for_status()
-        data = r.json() if r.headers.get("content-type", "").startswith("application/json") else {}
-        return {"ok": True, "status_code": r.status_code, "data": data}
-    except RequestException as exc:
-        return {"ok": False, "error": str(exc)}
-
-
-def call_risk_score(payload: dict, timeout: int = 5):
-    """POST to backend /risk/score and return parsed JSON or an error dict."""
-    try:
-        r = requests.post(f"{API_URL}/risk/score", json=payload, timeout=timeout)
-        r.raise_for_status()
-        return r.json()
-    except RequestException as exc:
-        return {"error": str(exc)}
-
-
 # API Health Check (display)
-health = check_api_health()
+health = api_client.health()
 if health.get("ok"):
     status_text = f"API Status: Healthy ✅ ({health.get('status_code')})"
     st.sidebar.success(status_text)
@@ -91,7 +64,7 @@ if selected_page == "Dashboard":
             }
             
             payload = {"client_id": client_id, "risk_factors": risk_factors}
-            result = call_risk_score(payload)
+            result = api_client.score(payload)
 
             if isinstance(result, dict) and result.get("error"):
                 st.error(f"Error calculating risk score: {result.get('error')}")
@@ -103,6 +76,9 @@ if selected_page == "Dashboard":
                 except Exception:
                     st.error("Invalid response from API: missing 'score'")
 
+                import pandas as pd
+                import plotly.express as px
+
                 # Radar Chart (use submitted risk_factors for visualization)
                 df = pd.DataFrame({
                     'Factor': list(risk_factors.keys()),
@@ -128,13 +104,31 @@ elif selected_page == "Historical Risk Scores":
             st.info("Coming soon: Historical risk score tracking and trend analysis")
     else:
         st.info("Coming soon: Historical risk score tracking and trend analysis")
-    # Placeholder area for future charts and filters
     st.write("")
-    st.warning("This feature is not implemented yet. We'll add time-series charts, filters, and storage-backed history soon.")
+    entity_input = st.text_input("Entity / client IDs (comma-separated to compare)")
+    entity_ids = list(dict.fromkeys(e.strip() for e in entity_input.split(",") if e.strip()))
+    if entity_ids:
+        result = api_client.timeseries(entity_ids)
+        if not result["ok"]:
+            st.error(f"Could not load history: {result['error']}")
+        elif result["frame"].empty:
+            st.info(f"No scores recorded for {', '.join(entity_ids)} yet.")
+        else:
+            import plotly.express as px
+
+            fig = px.line(
+                result["frame"], x="created_at", y="score", color="entity_id",
+                title=f"Historical risk scores — {', '.join(entity_ids)}",
+            )
+            fig.update_yaxes(range=[0, 100])
+            st.plotly_chart(fig, use_container_width=True)
 
     # Demo dataset (client-side) to preview the UI without backend history
-    if st.checkbox("Show demo data", value=True):
+    if not entity_ids and st.checkbox("Show demo data", value=True):
         import random
+        import pandas as pd
+        import plotly.express as px
+
         now = datetime.utcnow()
         dates = [now - timedelta(days=7 * i) for i in range(12)][::-1]
         clients = ["Demo Client A", "Demo Client B"]